@@ -3,7 +3,6 @@ from flask import Flask, jsonify
 from flask_cors import CORS
 from datetime import timedelta
 import os
-from flask_session import Session
 from dotenv import load_dotenv
 
 
@@ -15,6 +14,16 @@ from routes.auth import auth_bp
 from routes.doctors import doctors_bp
 from routes.appointments import appointments_bp
 from routes.prescriptions import prescriptions_bp
+from routes.admin import admin_bp
+from commands import register_commands
+from db.connection import connection_pool, router
+from db.pool import PoolTimeout
+from db.statements import statement_cache_stats
+from middleware.admission import init_admission
+from middleware.read_routing import init_read_routing
+from middleware.request_metrics import init_request_metrics
+from middleware.sessions import init_sessions
+from services.passwords import HasherBusy
 
 def create_app():
     print("✅ Flask is running with create_app() correctly")
@@ -23,11 +32,10 @@ def create_app():
     
     # Configuration
     app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'dev-secret-key-change-in-production')
-    app.config['SESSION_TYPE'] = 'filesystem'
     app.config['PERMANENT_SESSION_LIFETIME'] = timedelta(hours=24)
     app.config['SESSION_COOKIE_SAMESITE'] = 'None'
     app.config['SESSION_COOKIE_SECURE'] = False
-    Session(app)
+    init_sessions(app)
 
     
     # Enable CORS with credentials support
@@ -42,6 +50,20 @@ def create_app():
     app.register_blueprint(appointments_bp, url_prefix='/api')
     print("✅ Flask CORS Config: /api/* → http://localhost:3000")
     app.register_blueprint(prescriptions_bp, url_prefix='/api')
+    app.register_blueprint(admin_bp, url_prefix='/api')
+    
+    # Route/query latency instrumentation, served at /metrics
+    init_request_metrics(app)
+    
+    # Priority-based load shedding and per-client rate limits (after the timer,
+    # so rejected requests are still measured)
+    init_admission(app)
+    
+    # Reads of writing requests and recently-writing sessions stay on the primary
+    init_read_routing(app)
+    
+    # Maintenance CLI commands
+    register_commands(app)
     
     @app.route('/api/test')
     def test_cors():
@@ -61,6 +83,12 @@ def create_app():
     def health_check():
         return jsonify({"status": "healthy"}), 200
     
+    # Connection pool and prepared statement cache statistics, for sizing per worker
+    @app.route('/health/pool')
+    def pool_stats():
+        return jsonify({**connection_pool.stats(), "statement_cache": statement_cache_stats(),
+                        "replicas": router.stats()}), 200
+    
     # Error handlers
     @app.errorhandler(404)
     def not_found(error):
@@ -74,6 +102,13 @@ def create_app():
     def bad_request(error):
         return jsonify({"error": "Bad request"}), 400
     
+    @app.errorhandler(PoolTimeout)
+    @app.errorhandler(HasherBusy)
+    def server_busy(error):
+        response = jsonify({"error": "Server busy, please retry"})
+        response.headers['Retry-After'] = '1'
+        return response, 503
+    
     return app
 
 if __name__ == '__main__':
@@ -0,0 +1,128 @@
+"""
+Concurrency benchmark for the slot booking engine.
+
+Fires many parallel bookings at a single freshly created slot, repeated over
+several rounds, against the database configured in .env. Reports successful
+bookings per second, total attempts per second and the number of slots that
+ended up with more than one appointment (must be zero).
+
+Usage (from backend/):
+    python -m benchmarks.booking_contention --attempts 300 --rounds 20
+"""
+import argparse
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from config import POOL_CONFIG
+from db.connection import execute_query, get_db_connection
+from services.booking import book_slot, BookingError
+
+
+def create_slots(doctor_id, rounds):
+    """Create one open slot per round far in the future so it never clashes with real data"""
+    slot_ids = []
+    with get_db_connection() as connection:
+        cursor = connection.cursor()
+        for i in range(rounds):
+            cursor.execute(
+                """INSERT INTO time_slots (doctor_id, slot_date, start_time, end_time, is_available)
+                   VALUES (%s, DATE_ADD(CURDATE(), INTERVAL 3650 DAY),
+                           SEC_TO_TIME(%s), SEC_TO_TIME(%s), TRUE)""",
+                (doctor_id, i * 60, i * 60 + 30)
+            )
+            slot_ids.append(cursor.lastrowid)
+        connection.commit()
+        cursor.close()
+    return slot_ids
+
+
+def cleanup(slot_ids):
+    """Remove the appointments and slots created by the benchmark"""
+    placeholders = ', '.join(['%s'] * len(slot_ids))
+    with get_db_connection() as connection:
+        cursor = connection.cursor()
+        cursor.execute(f"DELETE FROM appointments WHERE slot_id IN ({placeholders})", tuple(slot_ids))
+        cursor.execute(f"DELETE FROM time_slots WHERE slot_id IN ({placeholders})", tuple(slot_ids))
+        connection.commit()
+        cursor.close()
+
+
+def run_round(slot_id, doctor_id, patient_ids, attempts, workers):
+    """Fire `attempts` concurrent bookings at one slot; returns (successes, conflicts, errors)"""
+    counts = {'success': 0, 'conflict': 0, 'error': 0}
+    lock = threading.Lock()
+    start = threading.Barrier(min(workers, attempts))
+    # Never hold more connections than the pool can hand out
+    pool_gate = threading.BoundedSemaphore(POOL_CONFIG['size'])
+
+    def attempt(i):
+        if i < start.parties:
+            start.wait()
+        try:
+            with pool_gate:
+                book_slot(patient_ids[i % len(patient_ids)], doctor_id, slot_id, 'benchmark')
+            outcome = 'success'
+        except BookingError:
+            outcome = 'conflict'
+        except Exception:
+            outcome = 'error'
+        with lock:
+            counts[outcome] += 1
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        list(executor.map(attempt, range(attempts)))
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--attempts', type=int, default=300, help='parallel bookings per slot')
+    parser.add_argument('--rounds', type=int, default=10, help='number of slots to contend on')
+    parser.add_argument('--workers', type=int, default=100, help='client threads')
+    parser.add_argument('--doctor-id', type=int, default=4)
+    parser.add_argument('--keep', action='store_true', help='keep benchmark rows afterwards')
+    args = parser.parse_args()
+
+    patients = execute_query("SELECT patient_id FROM patients", fetch_all=True)
+    if not patients:
+        raise SystemExit("No patients found; load sql/createdb.sql first")
+    patient_ids = [row['patient_id'] for row in patients]
+
+    slot_ids = create_slots(args.doctor_id, args.rounds)
+    totals = {'success': 0, 'conflict': 0, 'error': 0}
+    started = time.perf_counter()
+    try:
+        for slot_id in slot_ids:
+            counts = run_round(slot_id, args.doctor_id, patient_ids, args.attempts, args.workers)
+            for key in totals:
+                totals[key] += counts[key]
+        elapsed = time.perf_counter() - started
+
+        placeholders = ', '.join(['%s'] * len(slot_ids))
+        double_booked = execute_query(
+            f"""SELECT COUNT(*) AS slots FROM (
+                    SELECT slot_id FROM appointments
+                    WHERE slot_id IN ({placeholders}) AND status = 'scheduled'
+                    GROUP BY slot_id HAVING COUNT(*) > 1
+                ) AS dupes""",
+            tuple(slot_ids),
+            fetch_one=True
+        )
+    finally:
+        if not args.keep:
+            cleanup(slot_ids)
+
+    attempts = args.attempts * args.rounds
+    print(f"rounds:              {args.rounds}")
+    print(f"attempts:            {attempts}")
+    print(f"successful bookings: {totals['success']}")
+    print(f"409 conflicts:       {totals['conflict']}")
+    print(f"errors:              {totals['error']}")
+    print(f"elapsed:             {elapsed:.3f}s")
+    print(f"bookings/sec:        {totals['success'] / elapsed:.1f}")
+    print(f"attempts/sec:        {attempts / elapsed:.1f}")
+    print(f"double bookings:     {double_booked['slots'] if double_booked else 'unknown'}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,330 @@
+"""
+Scale-factor synthetic data for load tests.
+
+At scale 1 the generator creates 8 departments, 24 specializations, 150
+medicines, 40 doctors and 2000 patients, scaled linearly. It then creates:
+
+- --years of past slots from each doctor's available days, with skewed
+  booking. Popular doctors (Zipf rank) fill most of their days. Past
+  appointments are about 80% completed, 10% cancelled and 10% no-show,
+  and a few patients account for most visits.
+- Prescriptions with 1-3 medicines (popular medicines dominate) for 60% of
+  completed visits, and reviews for 30%, rated around each doctor's
+  quality.
+- --weeks of future slots through the regular slot generator, part of them
+  already booked.
+
+Rows go in with multi-row INSERT batches, one doctor per transaction. The
+rollup triggers keep the analytics tables current, and rating summaries are
+rebuilt at the end. Generated users share the @loadtest.example domain and
+the password LOAD_TEST_PASSWORD. Reference rows are prefixed "LT ".
+--cleanup removes everything again.
+
+Usage (from backend/):
+    python -m benchmarks.datagen --scale 1 --years 1 --weeks 4
+    python -m benchmarks.datagen --cleanup
+"""
+import argparse
+import itertools
+import random
+import time
+from datetime import date, timedelta
+from db.connection import get_db_connection
+from db.versions import bump_versions
+from services.availability import slots_cache_key
+from services.passwords import password_hasher
+from services.ratings import rebuild_rating_summaries
+from services.schedule import day_template, generate_slots, parse_available_days
+
+EMAIL_DOMAIN = 'loadtest.example'
+LOAD_TEST_PASSWORD = 'LoadTest#2025'
+NAME_PREFIX = 'LT '
+BATCH_SIZE = 2000
+
+PER_SCALE = {'departments': 8, 'specializations': 24, 'medicines': 150, 'doctors': 40, 'patients': 2000}
+WEEKDAY_NAMES = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat']
+PAST_STATUSES = (['completed'] * 8) + ['cancelled', 'no-show']
+DIAGNOSES = ['Hypertension', 'Type 2 diabetes', 'Seasonal allergies', 'Lower back pain', 'Migraine',
+             'Upper respiratory infection', 'Anxiety', 'Sprained ankle', 'Gastritis', 'Dermatitis']
+REASONS = ['Routine checkup', 'Follow-up visit', 'Persistent headache', 'Chest discomfort',
+           'Joint pain', 'Skin rash', 'Fever and cough', 'Medication review']
+
+
+def zipf_weights(count, exponent):
+    """Cumulative Zipf weights for rng.choices (rank 0 is the most popular)"""
+    return list(itertools.accumulate(1 / (rank + 1) ** exponent for rank in range(count)))
+
+
+def chunks(rows, size=BATCH_SIZE):
+    for start in range(0, len(rows), size):
+        yield rows[start:start + size]
+
+
+def insert_rows(cursor, sql, rows):
+    for batch in chunks(rows):
+        cursor.executemany(sql, batch)
+
+
+def select_ids(cursor, sql, params=()):
+    cursor.execute(sql, params)
+    return [row[0] for row in cursor.fetchall()]
+
+
+def generated_user_count(cursor):
+    cursor.execute("SELECT COUNT(*) FROM users WHERE email LIKE %s", (f"%@{EMAIL_DOMAIN}",))
+    return cursor.fetchone()[0]
+
+
+def create_reference_data(cursor, counts, rng):
+    """Departments, specializations and medicines; returns their id lists"""
+    insert_rows(cursor, "INSERT INTO departments (department_name, description, location, phone) VALUES (%s, %s, %s, %s)",
+                [(f"{NAME_PREFIX}Department {i}", 'Synthetic department', f"Building {chr(65 + i % 6)}, Floor {i % 5 + 1}",
+                  f"555-{2000 + i}") for i in range(counts['departments'])])
+    insert_rows(cursor, "INSERT INTO specializations (specialization_name, description) VALUES (%s, %s)",
+                [(f"{NAME_PREFIX}Specialization {i}", 'Synthetic specialization')
+                 for i in range(counts['specializations'])])
+    insert_rows(cursor, "INSERT INTO medicines (medicine_name, generic_name, manufacturer, medicine_type) VALUES (%s, %s, %s, %s)",
+                [(f"{NAME_PREFIX}Medicine {i} {rng.choice([5, 10, 20, 50, 100, 250, 500])}mg", f"Generic {i}",
+                  f"Maker {i % 20}", rng.choice(['tablet', 'capsule', 'syrup', 'injection']))
+                 for i in range(counts['medicines'])])
+    prefix = (f"{NAME_PREFIX}%",)
+    return (select_ids(cursor, "SELECT department_id FROM departments WHERE department_name LIKE %s ORDER BY department_id", prefix),
+            select_ids(cursor, "SELECT specialization_id FROM specializations WHERE specialization_name LIKE %s ORDER BY specialization_id", prefix),
+            select_ids(cursor, "SELECT medicine_id FROM medicines WHERE medicine_name LIKE %s ORDER BY medicine_id", prefix))
+
+
+def create_users(cursor, kind, count, password_hash):
+    """Insert users of one type; returns their ids in creation order"""
+    insert_rows(cursor, """INSERT INTO users (email, password_hash, user_type, first_name, last_name, phone)
+                           VALUES (%s, %s, %s, %s, %s, %s)""",
+                [(f"{kind}{i}@{EMAIL_DOMAIN}", password_hash, kind, kind.capitalize(), f"Synthetic{i}",
+                  f"555-{i % 10000:04d}") for i in range(count)])
+    return select_ids(cursor, "SELECT user_id FROM users WHERE email LIKE %s AND user_type = %s ORDER BY user_id",
+                      (f"{kind}%@{EMAIL_DOMAIN}", kind))
+
+
+def create_people(cursor, counts, department_ids, specialization_ids, rng):
+    """Doctors (with specializations) and patients; returns (doctors, patient_ids)"""
+    password_hash = password_hasher.hash(LOAD_TEST_PASSWORD)
+    doctor_ids = create_users(cursor, 'doctor', counts['doctors'], password_hash)
+    patient_ids = create_users(cursor, 'patient', counts['patients'], password_hash)
+
+    doctors = []
+    for number, doctor_id in enumerate(doctor_ids):
+        days = ','.join(sorted(rng.sample(WEEKDAY_NAMES, rng.randint(3, 6)), key=WEEKDAY_NAMES.index))
+        doctors.append({'doctor_id': doctor_id, 'available_days': days,
+                        'quality': rng.uniform(2.8, 4.9), 'rank': number})
+    insert_rows(cursor, """INSERT INTO doctors (doctor_id, department_id, license_number, qualification,
+                               experience_years, consultation_fee, bio, available_days)
+                           VALUES (%s, %s, %s, %s, %s, %s, %s, %s)""",
+                [(doctor['doctor_id'], rng.choice(department_ids), f"LT-{doctor['doctor_id']:08d}", 'MD',
+                  rng.randint(1, 35), f"{rng.randint(60, 400)}.00", 'Synthetic doctor', doctor['available_days'])
+                 for doctor in doctors])
+    insert_rows(cursor, "INSERT INTO doctor_specializations (doctor_id, specialization_id) VALUES (%s, %s)",
+                [(doctor['doctor_id'], specialization_id) for doctor in doctors
+                 for specialization_id in rng.sample(specialization_ids, rng.randint(1, 2))])
+    insert_rows(cursor, """INSERT INTO patients (patient_id, date_of_birth, gender, blood_group)
+                           VALUES (%s, %s, %s, %s)""",
+                [(patient_id, date(1940, 1, 1) + timedelta(days=rng.randint(0, 80 * 365)),
+                  rng.choice(['M', 'F', 'Other']), rng.choice(['A+', 'A-', 'B+', 'O+', 'O-', 'AB+']))
+                 for patient_id in patient_ids])
+    return doctors, patient_ids
+
+
+def create_history(connection, cursor, doctor, fill, first_day, days, template, patients, medicines, rng):
+    """Past slots, appointments, prescriptions and reviews of one doctor; returns row counts"""
+    weekdays = parse_available_days(doctor['available_days'])
+    doctor_id = doctor['doctor_id']
+    slots = [(doctor_id, first_day + timedelta(days=offset), start, end)
+             for offset in range(days) if (first_day + timedelta(days=offset)).weekday() in weekdays
+             for start, end in template]
+    insert_rows(cursor, """INSERT INTO time_slots (doctor_id, slot_date, start_time, end_time, is_available)
+                           VALUES (%s, %s, %s, %s, FALSE)""", slots)
+    cursor.execute("""SELECT slot_id, slot_date, start_time FROM time_slots
+                      WHERE doctor_id = %s AND slot_date BETWEEN %s AND %s""",
+                   (doctor_id, first_day, first_day + timedelta(days=days - 1)))
+    booked = [slot for slot in cursor.fetchall() if rng.random() < fill]
+    patient_ids, patient_weights = patients
+    chosen = rng.choices(patient_ids, cum_weights=patient_weights, k=len(booked))
+    insert_rows(cursor, """INSERT INTO appointments
+                           (patient_id, doctor_id, slot_id, appointment_date, appointment_time, status, reason_for_visit)
+                           VALUES (%s, %s, %s, %s, %s, %s, %s)""",
+                [(patient_id, doctor_id, slot_id, slot_date, start_time, rng.choice(PAST_STATUSES), rng.choice(REASONS))
+                 for patient_id, (slot_id, slot_date, start_time) in zip(chosen, booked)])
+    connection.commit()
+
+    cursor.execute("""SELECT appointment_id, patient_id FROM appointments
+                      WHERE doctor_id = %s AND status = 'completed' AND appointment_date BETWEEN %s AND %s""",
+                   (doctor_id, first_day, first_day + timedelta(days=days - 1)))
+    completed = cursor.fetchall()
+    prescribed = [appointment_id for appointment_id, _ in completed if rng.random() < 0.6]
+    insert_rows(cursor, "INSERT INTO prescriptions (appointment_id, diagnosis, instructions) VALUES (%s, %s, %s)",
+                [(appointment_id, rng.choice(DIAGNOSES), 'Synthetic prescription') for appointment_id in prescribed])
+    line_items = 0
+    if prescribed:
+        medicine_ids, medicine_weights = medicines
+        cursor.execute("""SELECT p.prescription_id FROM prescriptions p
+                          INNER JOIN appointments a ON p.appointment_id = a.appointment_id
+                          WHERE a.doctor_id = %s AND a.appointment_date BETWEEN %s AND %s""",
+                       (doctor_id, first_day, first_day + timedelta(days=days - 1)))
+        rows = []
+        for (prescription_id,) in cursor.fetchall():
+            for medicine_id in set(rng.choices(medicine_ids, cum_weights=medicine_weights, k=rng.randint(1, 3))):
+                rows.append((prescription_id, medicine_id, '1 unit', rng.choice(['Once daily', 'Twice daily', '3 times daily']),
+                             rng.choice(['5 days', '7 days', '14 days', '30 days']), rng.randint(5, 90)))
+        insert_rows(cursor, """INSERT INTO prescription_medicines
+                               (prescription_id, medicine_id, dosage, frequency, duration, quantity)
+                               VALUES (%s, %s, %s, %s, %s, %s)""", rows)
+        line_items = len(rows)
+
+    reviews = [(patient_id, doctor_id, appointment_id,
+                min(5, max(1, round(rng.gauss(doctor['quality'], 0.9)))), 'Synthetic review')
+               for appointment_id, patient_id in completed if rng.random() < 0.3]
+    insert_rows(cursor, """INSERT INTO reviews (patient_id, doctor_id, appointment_id, rating, review_text)
+                           VALUES (%s, %s, %s, %s, %s)""", reviews)
+    connection.commit()
+    return {'slots': len(slots), 'appointments': len(booked), 'prescriptions': len(prescribed),
+            'line_items': line_items, 'reviews': len(reviews)}
+
+
+def book_future(connection, cursor, doctor, fill, patients, rng):
+    """Book part of a doctor's generated future slots; returns the number booked"""
+    cursor.execute("""SELECT slot_id, slot_date, start_time FROM time_slots
+                      WHERE doctor_id = %s AND slot_date > CURDATE() AND is_available = TRUE""",
+                   (doctor['doctor_id'],))
+    booked = [slot for slot in cursor.fetchall() if rng.random() < fill]
+    patient_ids, patient_weights = patients
+    chosen = rng.choices(patient_ids, cum_weights=patient_weights, k=len(booked))
+    insert_rows(cursor, """INSERT INTO appointments
+                           (patient_id, doctor_id, slot_id, appointment_date, appointment_time, status, reason_for_visit)
+                           VALUES (%s, %s, %s, %s, %s, 'scheduled', %s)""",
+                [(patient_id, doctor['doctor_id'], slot_id, slot_date, start_time, rng.choice(REASONS))
+                 for patient_id, (slot_id, slot_date, start_time) in zip(chosen, booked)])
+    for batch in chunks([slot_id for slot_id, _, _ in booked]):
+        cursor.execute(f"UPDATE time_slots SET is_available = FALSE WHERE slot_id IN ({', '.join(['%s'] * len(batch))})",
+                       tuple(batch))
+    connection.commit()
+    return len(booked)
+
+
+def generate(scale, years, weeks, seed):
+    """Create the synthetic data set; returns row counts"""
+    rng = random.Random(seed)
+    counts = {name: per_scale * scale for name, per_scale in PER_SCALE.items()}
+    template = day_template('09:00', '17:00', 30)
+    first_day = date.today() - timedelta(days=365 * years)
+    totals = dict.fromkeys(['slots', 'appointments', 'prescriptions', 'line_items', 'reviews', 'future_booked'], 0)
+
+    with get_db_connection() as connection:
+        cursor = connection.cursor()
+        try:
+            if generated_user_count(cursor):
+                raise SystemExit("Synthetic data already present; run with --cleanup first")
+            department_ids, specialization_ids, medicine_ids = create_reference_data(cursor, counts, rng)
+            doctors, patient_ids = create_people(cursor, counts, department_ids, specialization_ids, rng)
+            connection.commit()
+
+            rng.shuffle(patient_ids)  # popularity rank independent of id order
+            patients = (patient_ids, zipf_weights(len(patient_ids), 0.8))
+            medicines = (medicine_ids, zipf_weights(len(medicine_ids), 1.2))
+            doctor_weights = [1 / (doctor['rank'] + 1) ** 1.1 for doctor in doctors]
+            top = max(doctor_weights)
+            for doctor, weight in zip(doctors, doctor_weights):
+                doctor['fill'] = 0.25 + 0.7 * weight / top
+                counts_for_doctor = create_history(connection, cursor, doctor, doctor['fill'], first_day,
+                                                   365 * years, template, patients, medicines, rng)
+                for name, value in counts_for_doctor.items():
+                    totals[name] += value
+        finally:
+            cursor.close()
+
+    doctor_ids = [doctor['doctor_id'] for doctor in doctors]
+    totals['future_slots'] = generate_slots(weeks, doctor_ids=doctor_ids)['created']
+    with get_db_connection() as connection:
+        cursor = connection.cursor()
+        try:
+            for doctor in doctors:
+                totals['future_booked'] += book_future(connection, cursor, doctor, doctor['fill'] / 2, patients, rng)
+            bump_versions(cursor, [slots_cache_key(doctor_id) for doctor_id in doctor_ids])
+            connection.commit()
+        finally:
+            cursor.close()
+
+    rebuild_rating_summaries()
+    return {**counts, **totals}
+
+
+def delete_in_batches(connection, cursor, sql, params):
+    deleted = 0
+    while True:
+        cursor.execute(sql + f" LIMIT {BATCH_SIZE}", params)
+        connection.commit()
+        deleted += cursor.rowcount
+        if cursor.rowcount < BATCH_SIZE:
+            return deleted
+
+
+def cleanup():
+    """
+    Delete every generated row, hot and archived.
+
+    The triggers take hot rows back out of the rollups; rollup rows of
+    archived history go with the cascading user delete.
+    """
+    users = "SELECT user_id FROM users WHERE email LIKE %s"
+    params = (f"%@{EMAIL_DOMAIN}",)
+    prefix = (f"{NAME_PREFIX}%",)
+    with get_db_connection() as connection:
+        cursor = connection.cursor()
+        try:
+            owned = f"patient_id IN ({users}) OR doctor_id IN ({users})"
+            appointments = (f"SELECT appointment_id FROM appointments WHERE {owned} "
+                            f"UNION ALL SELECT appointment_id FROM appointments_archive WHERE {owned}")
+            removed = {
+                'prescriptions': delete_in_batches(
+                    connection, cursor, f"DELETE FROM prescriptions WHERE appointment_id IN ({appointments})",
+                    params * 4),
+                'reviews': delete_in_batches(
+                    connection, cursor, f"DELETE FROM reviews WHERE patient_id IN ({users}) OR doctor_id IN ({users})",
+                    params * 2),
+                'appointments': delete_in_batches(
+                    connection, cursor, f"DELETE FROM appointments WHERE patient_id IN ({users}) OR doctor_id IN ({users})",
+                    params * 2),
+                'time_slots': delete_in_batches(
+                    connection, cursor, f"DELETE FROM time_slots WHERE doctor_id IN ({users})", params),
+                'appointments_archive': delete_in_batches(
+                    connection, cursor, f"DELETE FROM appointments_archive WHERE {owned}", params * 2),
+                'time_slots_archive': delete_in_batches(
+                    connection, cursor, f"DELETE FROM time_slots_archive WHERE doctor_id IN ({users})", params),
+            }
+            # Patients, doctors, specializations links and rollup rows cascade
+            cursor.execute("DELETE FROM users WHERE email LIKE %s", params)
+            removed['users'] = cursor.rowcount
+            cursor.execute("DELETE FROM departments WHERE department_name LIKE %s", prefix)
+            cursor.execute("DELETE FROM specializations WHERE specialization_name LIKE %s", prefix)
+            cursor.execute("DELETE FROM medicines WHERE medicine_name LIKE %s", prefix)
+            connection.commit()
+        finally:
+            cursor.close()
+    return removed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scale', type=int, default=1, help='Scale factor (40 doctors, 2000 patients each)')
+    parser.add_argument('--years', type=int, default=1, help='Years of appointment history')
+    parser.add_argument('--weeks', type=int, default=4, help='Weeks of future slots')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--cleanup', action='store_true', help='Delete the generated data instead')
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    if args.cleanup:
+        print(f"Removed {cleanup()} in {time.perf_counter() - started:.1f}s")
+    else:
+        print(f"Generated {generate(args.scale, args.years, args.weeks, args.seed)} "
+              f"in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""
+Doctor detail assembly: one query per section vs the composed profile loader.
+
+Loads the profile of every doctor (or --doctor-id ...) --repeat times with:
+
+    legacy   doctor row, specializations and review histogram as three
+             separate execute_query calls (three pool checkouts)
+    batched  load_doctor_profiles(single_query=False): two statements on one
+             borrowed connection
+    json     load_doctor_profiles(): one statement, specializations
+             aggregated with JSON_ARRAYAGG
+
+and reports median / p95 latency per profile and pool checkouts per profile.
+Response caching is bypassed; this measures the database path only.
+
+Usage (from backend/):
+    python -m benchmarks.doctor_profile --repeat 200
+"""
+import argparse
+import statistics
+import time
+from db.connection import connection_pool, execute_query
+from services.profiles import DETAIL_QUERY, PROFILE_FROM, load_doctor_profiles
+from services.ratings import SUMMARY_FIELDS
+
+
+def load_legacy(doctor_id):
+    doctor = execute_query(DETAIL_QUERY + PROFILE_FROM + " WHERE d.doctor_id = %s", (doctor_id,), fetch_one=True)
+    doctor['specializations'] = execute_query(
+        """SELECT s.specialization_name, s.description
+           FROM doctor_specializations ds
+           INNER JOIN specializations s ON ds.specialization_id = s.specialization_id
+           WHERE ds.doctor_id = %s""",
+        (doctor_id,),
+        fetch_all=True
+    )
+    doctor['reviews'] = {field: doctor.pop(field) for field in SUMMARY_FIELDS}
+    doctor['reviews']['histogram'] = execute_query(
+        "SELECT rating, COUNT(*) AS count FROM reviews WHERE doctor_id = %s GROUP BY rating",
+        (doctor_id,),
+        fetch_all=True
+    )
+    return doctor
+
+
+MODES = {
+    'legacy': load_legacy,
+    'batched': lambda doctor_id: load_doctor_profiles([doctor_id], single_query=False)[0],
+    'json': lambda doctor_id: load_doctor_profiles([doctor_id])[0],
+}
+
+
+def run(mode, doctor_ids, repeat):
+    load = MODES[mode]
+    for doctor_id in doctor_ids:
+        load(doctor_id)  # warm up connections and the server's statement cache
+    checkouts = connection_pool.stats()['checkouts']
+    timings = []
+    for _ in range(repeat):
+        for doctor_id in doctor_ids:
+            started = time.perf_counter()
+            load(doctor_id)
+            timings.append(time.perf_counter() - started)
+    checkouts = connection_pool.stats()['checkouts'] - checkouts
+    timings.sort()
+    return (statistics.median(timings), timings[int(len(timings) * 0.95)],
+            checkouts / len(timings))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=100, help='Passes over the doctors')
+    parser.add_argument('--doctor-id', type=int, action='append', dest='doctor_ids',
+                        help='Only these doctors (repeatable)')
+    parser.add_argument('--mode', choices=sorted(MODES), action='append', dest='modes')
+    args = parser.parse_args()
+
+    doctor_ids = args.doctor_ids or [row['doctor_id'] for row in
+                                     execute_query("SELECT doctor_id FROM doctors", fetch_all=True)]
+    print(f"{len(doctor_ids)} doctors x {args.repeat} passes")
+    print(f"{'mode':<8} {'median ms':>10} {'p95 ms':>8} {'checkouts':>10}")
+    for mode in args.modes or ['legacy', 'batched', 'json']:
+        median, p95, checkouts = run(mode, doctor_ids, args.repeat)
+        print(f"{mode:<8} {median * 1000:>10.3f} {p95 * 1000:>8.3f} {checkouts:>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
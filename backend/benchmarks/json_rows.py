@@ -0,0 +1,112 @@
+"""
+Dict rows + jsonify vs compact tuple rows + db.rows.dumps on a large payload.
+
+Builds --rows rows shaped like the doctors directory and the time slot
+listing (DECIMAL, DATE and TIME columns included) and serializes them --repeat
+times both ways, reporting median CPU time and peak traced memory per run.
+With --from-db the rows are fetched from time_slots instead (dictionary
+cursor vs compact cursor), so the fetch is part of the measurement.
+
+Usage (from backend/):
+    python -m benchmarks.json_rows --rows 10000
+    python -m benchmarks.json_rows --from-db --rows 10000
+"""
+import argparse
+import random
+import statistics
+import time
+import tracemalloc
+from datetime import date, timedelta
+from decimal import Decimal
+from flask import Flask, jsonify
+from mysql.connector import FieldType
+from db.rows import Rows, dumps, orjson
+
+DOCTOR_COLUMNS = [
+    ('doctor_id', FieldType.LONG), ('doctor_name', FieldType.VAR_STRING), ('email', FieldType.VAR_STRING),
+    ('department_name', FieldType.VAR_STRING), ('consultation_fee', FieldType.NEWDECIMAL),
+    ('average_rating', FieldType.NEWDECIMAL), ('review_count', FieldType.LONGLONG),
+]
+SLOT_COLUMNS = [
+    ('slot_id', FieldType.LONG), ('doctor_id', FieldType.LONG), ('slot_date', FieldType.DATE),
+    ('start_time', FieldType.TIME), ('end_time', FieldType.TIME),
+]
+SLOTS_QUERY = """SELECT slot_id, doctor_id, slot_date, start_time, end_time
+                 FROM time_slots ORDER BY slot_date, start_time LIMIT %s"""
+
+
+def synthetic(count, seed):
+    rng = random.Random(seed)
+    doctors = [
+        (i, f"Doctor {i}", f"doctor{i}@clinic.test", 'Cardiology',
+         Decimal(f"{rng.randint(50, 300)}.00"), Decimal(f"{rng.uniform(1, 5):.4f}"), rng.randint(0, 500))
+        for i in range(count // 2)
+    ]
+    slots = [
+        (i, i % 50, date(2025, 1, 1) + timedelta(days=i % 60),
+         timedelta(minutes=540 + (i % 16) * 30), timedelta(minutes=570 + (i % 16) * 30))
+        for i in range(count - count // 2)
+    ]
+    return doctors, slots
+
+
+def measure(run, repeat):
+    cpu, peak = [], []
+    for _ in range(repeat):
+        tracemalloc.start()
+        started = time.process_time()
+        run()
+        cpu.append(time.process_time() - started)
+        peak.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    return statistics.median(cpu), max(peak)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--from-db', action='store_true', help='Fetch time_slots rows from the database')
+    args = parser.parse_args()
+
+    app = Flask(__name__)
+    if args.from_db:
+        from db.connection import execute_query
+
+        def current():
+            jsonify({"slots": execute_query(SLOTS_QUERY, (args.rows,), fetch_all=True)}).get_data()
+
+        def compact():
+            dumps({"slots": execute_query(SLOTS_QUERY, (args.rows,), fetch_all=True, compact=True)})
+    else:
+        doctors, slots = synthetic(args.rows, args.seed)
+        doctor_names, doctor_types = zip(*DOCTOR_COLUMNS)
+        slot_names, slot_types = zip(*SLOT_COLUMNS)
+
+        def current():
+            # The dictionary cursor builds one dict per row; jsonify cannot encode
+            # timedelta, so the routes str() TIME columns first
+            payload = {
+                "doctors": [dict(zip(doctor_names, row)) for row in doctors],
+                "slots": [dict(zip(slot_names, row[:3]), start_time=str(row[3]), end_time=str(row[4]))
+                          for row in slots],
+            }
+            jsonify(payload).get_data()
+
+        def compact():
+            dumps({"doctors": Rows(doctor_names, doctors, doctor_types),
+                   "slots": Rows(slot_names, slots, slot_types)})
+
+    print(f"{args.rows} rows, encoder: {'orjson' if orjson else 'json (stdlib)'}")
+    print(f"{'mode':<8} {'cpu ms':>9} {'peak KiB':>10}")
+    with app.app_context():
+        results = {mode: measure(run, args.repeat) for mode, run in (('current', current), ('compact', compact))}
+    for mode, (cpu, peak) in results.items():
+        print(f"{mode:<8} {cpu * 1000:>9.2f} {peak / 1024:>10.0f}")
+    (cpu_current, peak_current), (cpu_compact, peak_compact) = results['current'], results['compact']
+    print(f"speedup {cpu_current / cpu_compact:.1f}x, peak memory {peak_compact / peak_current:.0%} of current")
+
+
+if __name__ == '__main__':
+    main()
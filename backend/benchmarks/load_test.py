@@ -0,0 +1,232 @@
+"""
+End-to-end mixed-workload load test against create_app().
+
+Replays a weighted mix of browsing, slot lookups, bookings, logins and
+prescription/appointment lists from --users concurrent virtual users for
+--seconds. Each user logs in as a generated patient (python -m
+benchmarks.datagen must have run first) and picks doctors with a Zipf skew.
+Requests go through the full Flask stack in-process, so sessions, caches,
+admission control and the connection pool are all exercised.
+
+Writes a JSON report with per-operation throughput, status counts and
+p50/p95/p99 latency. With --baseline, each operation's p99 and throughput are
+compared against an earlier report, and the exit status is 1 if any p99 got
+worse by more than --tolerance.
+
+Bookings use real generated future slots; run datagen --cleanup and
+regenerate to reset.
+
+Usage (from backend/):
+    python -m benchmarks.load_test --users 16 --seconds 60 --output report.json
+    python -m benchmarks.load_test --baseline report.json --output new.json
+"""
+import argparse
+import itertools
+import json
+import platform
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from config import ADMISSION_CONFIG, POOL_CONFIG
+from db.connection import execute_query
+from benchmarks.datagen import EMAIL_DOMAIN, LOAD_TEST_PASSWORD
+from app import create_app
+
+# Operation -> relative weight in the workload mix
+DEFAULT_MIX = {
+    'browse': 25,
+    'doctor_details': 15,
+    'earliest_slots': 10,
+    'timeslots': 20,
+    'book': 8,
+    'login': 4,
+    'prescriptions': 10,
+    'appointments': 8,
+}
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
+class VirtualUser:
+    def __init__(self, app, email, doctors, rng):
+        self.client = app.test_client()
+        self.email = email
+        self.doctor_ids, self.doctor_weights = doctors
+        self.rng = rng
+
+    def doctor(self):
+        return self.rng.choices(self.doctor_ids, cum_weights=self.doctor_weights)[0]
+
+    def login(self):
+        return self.client.post('/api/login', json={'email': self.email, 'password': LOAD_TEST_PASSWORD})
+
+    def browse(self):
+        return self.client.get('/api/doctors')
+
+    def doctor_details(self):
+        return self.client.get(f"/api/doctors/{self.doctor()}")
+
+    def earliest_slots(self):
+        return self.client.get('/api/slots/earliest?days=14&limit=20')
+
+    def timeslots(self):
+        return self.client.get(f"/api/doctors/{self.doctor()}/timeslots?days=14")
+
+    def book(self):
+        doctor_id = self.doctor()
+        slots = self.client.get(f"/api/doctors/{doctor_id}/timeslots?days=28").get_json() or {}
+        open_slots = [slot['slot_id'] for day in (slots.get('slots') or {}).values() for slot in day]
+        if not open_slots:
+            return None
+        return self.client.post('/api/appointments', json={
+            'doctor_id': doctor_id, 'slot_id': self.rng.choice(open_slots), 'reason_for_visit': 'Load test'
+        })
+
+    def prescriptions(self):
+        return self.client.get('/api/prescriptions?limit=20')
+
+    def appointments(self):
+        return self.client.get('/api/appointments?limit=20')
+
+
+def run(app, emails, doctors, mix, users, seconds, seed):
+    operations = list(mix)
+    weights = list(itertools.accumulate(mix[operation] for operation in operations))
+    samples = {operation: [] for operation in operations}
+    lock = threading.Lock()
+    start = threading.Barrier(users + 1)
+    stop_at = [None]
+
+    def worker(number):
+        rng = random.Random(seed + number)
+        user = VirtualUser(app, emails[number % len(emails)], doctors, rng)
+        local = {operation: [] for operation in operations}
+        user.login()
+        start.wait()
+        while time.monotonic() < stop_at[0]:
+            operation = rng.choices(operations, cum_weights=weights)[0]
+            started = time.perf_counter()
+            try:
+                response = getattr(user, operation)()
+                status = response.status_code if response is not None else None
+            except Exception:
+                status = 'exception'
+            if status is not None:
+                local[operation].append((time.perf_counter() - started, status))
+        with lock:
+            for operation, values in local.items():
+                samples[operation].extend(values)
+
+    threads = [threading.Thread(target=worker, args=(number,)) for number in range(users)]
+    for thread in threads:
+        thread.start()
+    stop_at[0] = time.monotonic() + seconds
+    start.wait()
+    began = time.monotonic()
+    for thread in threads:
+        thread.join()
+    return samples, time.monotonic() - began
+
+
+def summarize(samples, elapsed):
+    report = {}
+    for operation, values in samples.items():
+        latencies = sorted(latency * 1000 for latency, _ in values)
+        statuses = Counter(str(status) for _, status in values)
+        errors = sum(count for status, count in statuses.items() if status == 'exception' or status.startswith('5'))
+        report[operation] = {
+            'requests': len(values),
+            'throughput': round(len(values) / elapsed, 2),
+            'errors': errors,
+            'statuses': dict(statuses),
+            'p50_ms': round(percentile(latencies, 0.50), 2) if latencies else None,
+            'p95_ms': round(percentile(latencies, 0.95), 2) if latencies else None,
+            'p99_ms': round(percentile(latencies, 0.99), 2) if latencies else None,
+        }
+    return report
+
+
+def compare(report, baseline, tolerance):
+    """Print per-operation changes; returns the operations whose p99 regressed"""
+    regressions = []
+    print(f"{'operation':<16} {'p99 ms':>9} {'baseline':>9} {'change':>8} {'req/s':>8} {'baseline':>9}")
+    for operation, current in report['operations'].items():
+        previous = baseline['operations'].get(operation)
+        if not previous or not current['p99_ms'] or not previous['p99_ms']:
+            continue
+        change = current['p99_ms'] / previous['p99_ms'] - 1
+        flag = ' !' if change > tolerance else ''
+        if flag:
+            regressions.append(operation)
+        print(f"{operation:<16} {current['p99_ms']:>9.1f} {previous['p99_ms']:>9.1f} {change:>+7.0%}{flag:<2}"
+              f"{current['throughput']:>7.1f} {previous['throughput']:>9.1f}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=16, help='Concurrent virtual users')
+    parser.add_argument('--seconds', type=float, default=60)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--mix', type=json.loads, default=DEFAULT_MIX,
+                        help='JSON object of operation weights, e.g. \'{"browse": 5, "book": 1}\'')
+    parser.add_argument('--rate-scale', type=float, default=1000.0,
+                        help='Multiplier for per-client rate limits (default: effectively off)')
+    parser.add_argument('--output', help='Write the JSON report here (default: stdout)')
+    parser.add_argument('--baseline', help='Earlier report to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='Allowed p99 regression (0.2 = 20%%)')
+    args = parser.parse_args()
+
+    unknown = set(args.mix) - set(DEFAULT_MIX)
+    if unknown:
+        parser.error(f"Unknown operations in --mix: {', '.join(sorted(unknown))}")
+
+    ADMISSION_CONFIG['rate_scale'] = args.rate_scale
+    app = create_app()
+    emails = [row['email'] for row in execute_query(
+        "SELECT email FROM users WHERE email LIKE %s AND user_type = 'patient' ORDER BY user_id",
+        (f"%@{EMAIL_DOMAIN}",), fetch_all=True) or []]
+    doctor_ids = [row['user_id'] for row in execute_query(
+        "SELECT user_id FROM users WHERE email LIKE %s AND user_type = 'doctor' ORDER BY user_id",
+        (f"%@{EMAIL_DOMAIN}",), fetch_all=True) or []]
+    if not emails or not doctor_ids:
+        sys.exit("No synthetic data found; run python -m benchmarks.datagen first")
+    doctors = (doctor_ids, list(itertools.accumulate(1 / (rank + 1) ** 1.1 for rank in range(len(doctor_ids)))))
+
+    samples, elapsed = run(app, emails, doctors, args.mix, args.users, args.seconds, args.seed)
+    report = {
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'config': {'users': args.users, 'seconds': args.seconds, 'seed': args.seed, 'mix': args.mix,
+                   'rate_scale': args.rate_scale, 'pool_size': POOL_CONFIG['size'],
+                   'patients': len(emails), 'doctors': len(doctor_ids)},
+        'elapsed_seconds': round(elapsed, 2),
+        'total_throughput': round(sum(len(values) for values in samples.values()) / elapsed, 2),
+        'operations': summarize(samples, elapsed),
+    }
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Report written to {args.output} ({report['total_throughput']} req/s)")
+    else:
+        print(json.dumps(report, indent=2))
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.tolerance)
+        if regressions:
+            print(f"p99 regressed beyond {args.tolerance:.0%}: {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+"""
+Critical-endpoint latency while the directory overloads the connection pool.
+
+Runs the app in-process twice, with admission control off and on. --flood
+threads hammer GET /api/slots/earliest (browse priority, uncached) from
+distinct client addresses, enough to keep every pooled connection busy, while
+--probe threads send POST /api/login for an unknown email (login priority:
+one user lookup, no bcrypt). Reports status counts and p50/p99 latency per
+class. Rate limits are scaled by --rate-scale (default: effectively off) so
+the comparison isolates load shedding.
+
+Usage (from backend/):
+    python -m benchmarks.overload --seconds 10 --flood 32 --probe 4
+"""
+import argparse
+import threading
+import time
+from collections import Counter
+from config import ADMISSION_CONFIG
+from app import create_app
+
+
+def percentile(latencies, fraction):
+    return latencies[min(len(latencies) - 1, int(len(latencies) * fraction))] * 1000
+
+
+def run(enabled, seconds, flood, probe):
+    ADMISSION_CONFIG['enabled'] = enabled
+    app = create_app()
+    deadline = time.monotonic() + seconds
+    results = {'browse': [], 'login': []}
+    lock = threading.Lock()
+
+    def worker(kind, address):
+        client = app.test_client()
+        environ = {'REMOTE_ADDR': address}
+        samples = []
+        while time.monotonic() < deadline:
+            started = time.perf_counter()
+            if kind == 'browse':
+                response = client.get('/api/slots/earliest?days=60&limit=50', environ_base=environ)
+            else:
+                response = client.post('/api/login', json={'email': 'overload@benchmark.test', 'password': 'x'},
+                                       environ_base=environ)
+            samples.append((time.perf_counter() - started, response.status_code))
+        with lock:
+            results[kind].extend(samples)
+
+    threads = [threading.Thread(target=worker, args=('browse', f"10.0.0.{i % 250 + 1}")) for i in range(flood)]
+    threads += [threading.Thread(target=worker, args=('login', f"10.0.1.{i % 250 + 1}")) for i in range(probe)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--flood', type=int, default=32, help='Directory threads')
+    parser.add_argument('--probe', type=int, default=4, help='Login threads')
+    parser.add_argument('--rate-scale', type=float, default=1000.0, help='Multiplier for per-client rates')
+    args = parser.parse_args()
+
+    ADMISSION_CONFIG['rate_scale'] = args.rate_scale
+    print(f"{'admission':<10} {'class':<7} {'requests':>9} {'p50 ms':>8} {'p99 ms':>8}  statuses")
+    for enabled in (False, True):
+        results = run(enabled, args.seconds, args.flood, args.probe)
+        for kind, samples in results.items():
+            latencies = sorted(latency for latency, _ in samples)
+            statuses = Counter(status for _, status in samples)
+            if not latencies:
+                continue
+            print(f"{'on' if enabled else 'off':<10} {kind:<7} {len(latencies):>9} "
+                  f"{percentile(latencies, 0.5):>8.1f} {percentile(latencies, 0.99):>8.1f}  {dict(statuses)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,176 @@
+"""
+Replica routing checks against stand-in pools (no database needed).
+
+Drives db.routing.ReplicaRouter with fake pools whose SHOW REPLICA STATUS
+result, connect errors and busy state are scripted, and asserts where reads
+and writes are routed: round-robin over fresh replicas, lagging, stopped,
+non-replicating and failed replicas skipped, primary-read stickiness, and
+fallback to the primary when no replica is usable.
+
+Usage (from backend/):
+    python -m benchmarks.replica_routing
+"""
+import time
+from mysql.connector import Error
+from db.pool import PoolTimeout
+from db.routing import ReplicaRouter, primary_reads, replica_fallbacks
+
+MAX_LAG = 2
+CHECK_INTERVAL = 0.05
+RETRY_INTERVAL = 0.1
+
+
+class StandInCursor:
+    def __init__(self, pool):
+        self.pool = pool
+
+    def execute(self, sql, params=None):
+        if self.pool.execute_error:
+            raise self.pool.execute_error
+
+    def fetchall(self):
+        return self.pool.status_rows
+
+    def close(self):
+        pass
+
+
+class StandInConnection:
+    def __init__(self, pool):
+        self.pool = pool
+
+    def cursor(self, dictionary=False):
+        return StandInCursor(self.pool)
+
+
+class StandInPool:
+    """Pool whose replica status and failures are set by the test"""
+
+    def __init__(self, name, lag=0):
+        self.name = name
+        self.status_rows = [{'Seconds_Behind_Source': lag}]
+        self.acquire_error = None
+        self.execute_error = None
+        self.checkouts = 0
+
+    def set_lag(self, lag):
+        self.status_rows = [{'Seconds_Behind_Source': lag}]
+
+    def acquire(self):
+        if self.acquire_error:
+            raise self.acquire_error
+        self.checkouts += 1
+        return StandInConnection(self)
+
+    def release(self, connection):
+        pass
+
+    def stats(self):
+        return {'name': self.name}
+
+
+def make_router(*lags):
+    primary = StandInPool('primary')
+    replicas = [StandInPool(f'replica{number}', lag) for number, lag in enumerate(lags, 1)]
+    return ReplicaRouter(primary, replicas, MAX_LAG, CHECK_INTERVAL, RETRY_INTERVAL), primary, replicas
+
+
+def recheck():
+    """Let every replica's lag sample expire"""
+    time.sleep(CHECK_INTERVAL * 1.5)
+
+
+def targets(router, sql="SELECT 1", count=4):
+    return [router.pool_for(sql).name for _ in range(count)]
+
+
+def check_statement_routing():
+    router, primary, (replica,) = make_router(0)
+    assert router.pool_for("SELECT * FROM doctors") is replica
+    assert router.pool_for("  (SELECT 1) UNION ALL (SELECT 2)") is replica
+    assert router.pool_for("/* hint */ SHOW TABLES") is replica
+    assert router.pool_for("SELECT * FROM time_slots WHERE slot_id = 1 FOR UPDATE") is primary
+    assert router.pool_for("SELECT * FROM time_slots LOCK IN SHARE MODE") is primary
+    assert router.pool_for("UPDATE time_slots SET is_available = TRUE") is primary
+    assert router.pool_for("INSERT INTO reviews VALUES (1)") is primary
+    assert router.pool_for("SELECT 1", replica=False) is primary
+    assert router.pool_for(None, replica=True) is replica
+
+
+def check_round_robin():
+    router, _, _ = make_router(0, 1)
+    assert sorted(set(targets(router))) == ['replica1', 'replica2']
+
+
+def check_lagging_replica():
+    router, _, (fresh, lagging) = make_router(0, MAX_LAG + 5)
+    assert set(targets(router)) == {'replica1'}
+    lagging.set_lag(MAX_LAG)
+    fresh.set_lag(MAX_LAG + 1)
+    recheck()
+    assert set(targets(router)) == {'replica2'}
+
+
+def check_stopped_and_non_replicating():
+    router, _, (stopped, standalone) = make_router(0, 0)
+    stopped.set_lag(None)  # Seconds_Behind_Source is NULL: replication threads stopped
+    standalone.status_rows = []  # SHOW REPLICA STATUS is empty: not a replica at all
+    assert set(targets(router)) == {'primary'}
+    standalone.set_lag(0)
+    recheck()
+    assert set(targets(router)) == {'replica2'}
+
+
+def check_failures():
+    router, _, (replica,) = make_router(0)
+    assert router.pool_for("SELECT 1") is replica
+    router.mark_failed(replica, Error(msg="lost connection"))
+    assert router.pool_for("SELECT 1").name == 'primary'
+    time.sleep(RETRY_INTERVAL * 1.5)
+    assert router.pool_for("SELECT 1") is replica
+
+    router, _, (replica,) = make_router(0)
+    replica.acquire_error = Error(msg="connection refused")
+    assert router.pool_for("SELECT 1").name == 'primary'
+
+    router, _, (replica,) = make_router(0)
+    replica.execute_error = Error(msg="execute failed")
+    assert router.pool_for("SELECT 1").name == 'primary'
+
+
+def check_busy_replica_keeps_last_sample():
+    router, _, (replica,) = make_router(0)
+    assert router.pool_for("SELECT 1") is replica
+    replica.acquire_error = PoolTimeout("busy")
+    recheck()
+    assert router.pool_for("SELECT 1") is replica
+
+
+def check_primary_reads():
+    router, primary, _ = make_router(0)
+    before = replica_fallbacks.value('sticky')
+    with primary_reads():
+        assert router.pool_for("SELECT 1") is primary
+    assert replica_fallbacks.value('sticky') == before + 1
+    assert router.pool_for("SELECT 1") is not primary
+
+
+def check_no_replicas():
+    router, primary, _ = make_router()
+    assert router.pool_for("SELECT 1") is primary
+
+
+CHECKS = [check_statement_routing, check_round_robin, check_lagging_replica,
+          check_stopped_and_non_replicating, check_failures, check_busy_replica_keeps_last_sample,
+          check_primary_reads, check_no_replicas]
+
+
+def main():
+    for check in CHECKS:
+        check()
+        print(f"ok  {check.__name__}")
+    print(f"{len(CHECKS)} routing checks passed")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,184 @@
+"""
+Original reporting SQL (sql/q1.sql, q3.sql, q4.sql, q6.sql) vs the rollup-backed reports.
+
+Generates a year of appointment history for the existing doctors, patients
+and medicines (in year 2000, so it never overlaps real data); the rollup
+triggers maintain the analytics tables as the rows are inserted. Each query
+is then run --repeat times and the median latency and speedup are reported.
+The generated rows are removed afterwards unless --keep is given.
+
+Usage (from backend/):
+    python -m benchmarks.report_rollups --days 365 --per-day 20
+"""
+import argparse
+import os
+import random
+import statistics
+import time
+from datetime import date, timedelta
+from db.connection import get_db_connection
+from services.reports import run_report
+
+START_DATE = date(2000, 1, 1)
+MARKER = 'benchmark:reports'
+SQL_DIR = os.path.join(os.path.dirname(__file__), '..', '..', 'sql')
+COMPARISONS = [('q1', 'top-doctors'), ('q3', 'revenue'), ('q4', 'chronic-patients'), ('q6', 'medicine-stats')]
+STATUSES = ['completed'] * 8 + ['cancelled', 'no-show']
+
+
+def load_sql(name):
+    with open(os.path.join(SQL_DIR, f"{name}.sql")) as f:
+        return f.read().strip().rstrip(';')
+
+
+def chunks(rows, size=1000):
+    for start in range(0, len(rows), size):
+        yield rows[start:start + size]
+
+
+def generate(days, per_day, seed):
+    """Insert slots, appointments, prescriptions and line items; returns row counts"""
+    rng = random.Random(seed)
+    end_date = START_DATE + timedelta(days=days - 1)
+    with get_db_connection() as connection:
+        cursor = connection.cursor()
+        cursor.execute("SELECT doctor_id FROM doctors")
+        doctor_ids = [row[0] for row in cursor.fetchall()]
+        cursor.execute("SELECT patient_id FROM patients")
+        patient_ids = [row[0] for row in cursor.fetchall()]
+        cursor.execute("SELECT medicine_id FROM medicines")
+        medicine_ids = [row[0] for row in cursor.fetchall()]
+
+        slots = []
+        for day in range(days):
+            slot_date = START_DATE + timedelta(days=day)
+            for doctor_id in doctor_ids:
+                for i in range(per_day):
+                    minutes = 8 * 60 + i * 20
+                    slots.append((doctor_id, slot_date, f"{minutes // 60:02d}:{minutes % 60:02d}:00",
+                                  f"{(minutes + 20) // 60:02d}:{(minutes + 20) % 60:02d}:00"))
+        for batch in chunks(slots):
+            cursor.executemany(
+                """INSERT INTO time_slots (doctor_id, slot_date, start_time, end_time, is_available)
+                   VALUES (%s, %s, %s, %s, FALSE)""",
+                batch
+            )
+        cursor.execute(
+            """SELECT slot_id, doctor_id, slot_date, start_time FROM time_slots
+               WHERE slot_date BETWEEN %s AND %s""",
+            (START_DATE, end_date)
+        )
+        appointments = [
+            (rng.choice(patient_ids), doctor_id, slot_id, slot_date, start_time, rng.choice(STATUSES), MARKER)
+            for slot_id, doctor_id, slot_date, start_time in cursor.fetchall()
+        ]
+        for batch in chunks(appointments):
+            cursor.executemany(
+                """INSERT INTO appointments
+                   (patient_id, doctor_id, slot_id, appointment_date, appointment_time, status, reason_for_visit)
+                   VALUES (%s, %s, %s, %s, %s, %s, %s)""",
+                batch
+            )
+        connection.commit()
+
+        cursor.execute(
+            """SELECT appointment_id FROM appointments
+               WHERE appointment_date BETWEEN %s AND %s AND status = 'completed' AND reason_for_visit = %s""",
+            (START_DATE, end_date, MARKER)
+        )
+        prescribed = [row[0] for row in cursor.fetchall() if rng.random() < 0.6]
+        for batch in chunks([(appointment_id, 'Benchmark diagnosis') for appointment_id in prescribed]):
+            cursor.executemany("INSERT INTO prescriptions (appointment_id, diagnosis) VALUES (%s, %s)", batch)
+        cursor.execute(
+            """SELECT p.prescription_id FROM prescriptions p
+               INNER JOIN appointments a ON p.appointment_id = a.appointment_id
+               WHERE a.appointment_date BETWEEN %s AND %s AND a.reason_for_visit = %s""",
+            (START_DATE, end_date, MARKER)
+        )
+        line_items = []
+        for (prescription_id,) in cursor.fetchall():
+            for medicine_id in rng.sample(medicine_ids, rng.randint(1, min(3, len(medicine_ids)))):
+                line_items.append((prescription_id, medicine_id, '1 unit', 'Once daily', '7 days', rng.randint(5, 60)))
+        for batch in chunks(line_items):
+            cursor.executemany(
+                """INSERT INTO prescription_medicines
+                   (prescription_id, medicine_id, dosage, frequency, duration, quantity)
+                   VALUES (%s, %s, %s, %s, %s, %s)""",
+                batch
+            )
+        connection.commit()
+        cursor.close()
+    return {'slots': len(slots), 'appointments': len(appointments),
+            'prescriptions': len(prescribed), 'line_items': len(line_items)}
+
+
+def cleanup(days):
+    """Delete the generated rows; the triggers take them back out of the rollups"""
+    end_date = START_DATE + timedelta(days=days - 1)
+    generated = """SELECT appointment_id FROM appointments
+                   WHERE appointment_date BETWEEN %s AND %s AND reason_for_visit = %s"""
+    params = (START_DATE, end_date, MARKER)
+    with get_db_connection() as connection:
+        cursor = connection.cursor()
+        cursor.execute(
+            f"""DELETE p FROM prescriptions p
+                INNER JOIN ({generated}) g ON p.appointment_id = g.appointment_id""",
+            params
+        )
+        cursor.execute(
+            "DELETE FROM appointments WHERE appointment_date BETWEEN %s AND %s AND reason_for_visit = %s",
+            params
+        )
+        cursor.execute("DELETE FROM time_slots WHERE slot_date BETWEEN %s AND %s", (START_DATE, end_date))
+        connection.commit()
+        cursor.close()
+
+
+def time_sql(sql, repeat):
+    timings = []
+    with get_db_connection() as connection:
+        cursor = connection.cursor()
+        for _ in range(repeat):
+            started = time.perf_counter()
+            cursor.execute(sql)
+            cursor.fetchall()
+            timings.append(time.perf_counter() - started)
+        cursor.close()
+    return statistics.median(timings)
+
+
+def time_report(name, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        run_report(name, {})
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--days', type=int, default=365, help='Days of history to generate')
+    parser.add_argument('--per-day', type=int, default=20, help='Appointments per doctor per day')
+    parser.add_argument('--repeat', type=int, default=5, help='Runs per query')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--keep', action='store_true', help='Keep the generated rows')
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    counts = generate(args.days, args.per_day, args.seed)
+    print(f"Generated {counts} in {time.perf_counter() - started:.1f}s")
+    try:
+        print(f"{'query':<6} {'report':<18} {'original ms':>12} {'rollup ms':>10} {'speedup':>8}")
+        for query, report in COMPARISONS:
+            original = time_sql(load_sql(query), args.repeat)
+            rollup = time_report(report, args.repeat)
+            print(f"{query:<6} {report:<18} {original * 1000:>12.2f} {rollup * 1000:>10.2f} "
+                  f"{original / rollup:>7.1f}x")
+    finally:
+        if not args.keep:
+            cleanup(args.days)
+
+
+if __name__ == '__main__':
+    main()
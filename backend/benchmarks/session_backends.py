@@ -0,0 +1,77 @@
+"""
+Throughput of GET /api/me under each session backend.
+
+Builds the app once per backend, logs every worker's client in as the same
+user through the session interface itself (so the sql backend really writes
+its session row), then hammers /api/me from parallel clients in-process.
+Reports requests/sec and p50/p99 latency per backend. /api/me also runs one
+user lookup, which is identical across backends.
+
+Usage (from backend/):
+    python -m benchmarks.session_backends --requests 5000 --workers 8 --user-id 1
+"""
+import argparse
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from config import SESSION_CONFIG
+from app import create_app
+
+BACKENDS = ['signed', 'sql', 'filesystem']
+
+
+def logged_in_client(app, user_id):
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['user_id'] = user_id
+        session['user_type'] = 'patient'
+    return client
+
+
+def run_backend(backend, user_id, requests, workers):
+    SESSION_CONFIG['backend'] = backend
+    app = create_app()
+    clients = [logged_in_client(app, user_id) for _ in range(workers)]
+    per_worker = requests // workers
+
+    def worker(client):
+        latencies = []
+        for _ in range(per_worker):
+            started = time.perf_counter()
+            response = client.get('/api/me')
+            latencies.append(time.perf_counter() - started)
+            if response.status_code != 200:
+                raise RuntimeError(f"{backend}: /api/me returned {response.status_code}")
+        return latencies
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        results = list(executor.map(worker, clients))
+    elapsed = time.perf_counter() - started
+
+    latencies = sorted(latency for result in results for latency in result)
+    return {
+        'requests': len(latencies),
+        'req_per_sec': len(latencies) / elapsed,
+        'p50_ms': statistics.median(latencies) * 1000,
+        'p99_ms': latencies[int(len(latencies) * 0.99) - 1] * 1000
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=5000, help='Requests per backend')
+    parser.add_argument('--workers', type=int, default=8, help='Concurrent clients')
+    parser.add_argument('--user-id', type=int, default=1, help='Existing user to log in as')
+    parser.add_argument('--backends', nargs='+', default=BACKENDS, choices=BACKENDS)
+    args = parser.parse_args()
+
+    print(f"{'backend':<12} {'requests':>9} {'req/s':>10} {'p50 ms':>8} {'p99 ms':>8}")
+    for backend in args.backends:
+        result = run_backend(backend, args.user_id, args.requests, args.workers)
+        print(f"{backend:<12} {result['requests']:>9} {result['req_per_sec']:>10.1f} "
+              f"{result['p50_ms']:>8.2f} {result['p99_ms']:>8.2f}")
+
+
+if __name__ == '__main__':
+    main()
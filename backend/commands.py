@@ -0,0 +1,56 @@
+"""Maintenance commands, run with `flask --app app <command>` from backend/"""
+import click
+from services.ratings import rebuild_rating_summaries
+from config import ARCHIVE_CONFIG, SCHEDULE_CONFIG
+from services.archive import archive_cutoff, archive_history
+from services.reports import rebuild_rollups
+from services.schedule import generate_slots, prune_expired_slots
+
+
+def register_commands(app):
+    """Attach the maintenance commands to the app's CLI"""
+
+    @app.cli.command('rebuild-ratings')
+    @click.option('--doctor-id', type=int, default=None, help='Only rebuild this doctor')
+    def rebuild_ratings(doctor_id):
+        """Recompute doctor_rating_summary from the reviews table"""
+        rows = rebuild_rating_summaries(doctor_id)
+        click.echo(f"Rating summaries rebuilt ({rows} rows affected)")
+
+    @app.cli.command('rebuild-reports')
+    def rebuild_reports():
+        """Recompute the analytics rollup tables from appointments and prescriptions"""
+        counts = rebuild_rollups()
+        for table, rows in counts.items():
+            click.echo(f"{table}: {rows} rows")
+
+    @app.cli.command('generate-slots')
+    @click.option('--weeks', type=int, default=SCHEDULE_CONFIG['weeks'], show_default=True,
+                  help='Weeks ahead to fill')
+    @click.option('--doctor-id', 'doctor_ids', type=int, multiple=True, help='Only these doctors (repeatable)')
+    @click.option('--day-start', default=None, help='Working day start, HH:MM')
+    @click.option('--day-end', default=None, help='Working day end, HH:MM')
+    @click.option('--slot-minutes', type=int, default=None, help='Slot length')
+    @click.option('--prune/--no-prune', default=True, help='Delete expired unbooked slots')
+    def generate_slots_command(weeks, doctor_ids, day_start, day_end, slot_minutes, prune):
+        """Create time slots from doctors.available_days"""
+        result = generate_slots(weeks, doctor_ids=list(doctor_ids) or None, day_start=day_start,
+                                day_end=day_end, slot_minutes=slot_minutes)
+        click.echo(f"Created {result['created']} slots for {result['doctors']} doctors")
+        if prune:
+            click.echo(f"Pruned {prune_expired_slots()} expired slots")
+
+    @app.cli.command('archive-history')
+    @click.option('--after-days', type=int, default=ARCHIVE_CONFIG['after_days'], show_default=True,
+                  help='Archive finished appointments older than this many days')
+    @click.option('--batch-size', type=int, default=ARCHIVE_CONFIG['batch_size'], show_default=True,
+                  help='Slots moved per transaction')
+    @click.option('--prune/--no-prune', default=True, help='Delete expired unbooked slots')
+    def archive_history_command(after_days, batch_size, prune):
+        """Move finished appointments and their slots to the archive tables"""
+        before = archive_cutoff(after_days)
+        moved = archive_history(before, batch_size=batch_size)
+        click.echo(f"Archived {moved['appointments']} appointments and {moved['time_slots']} slots "
+                   f"dated before {before}")
+        if prune:
+            click.echo(f"Pruned {prune_expired_slots()} expired slots")
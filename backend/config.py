@@ -9,9 +9,39 @@ DB_CONFIG = {
     'user': os.getenv('DB_USER', 'root'),
     'password': os.getenv('DB_PASSWORD', 'ROOTROOT'),
     'database': os.getenv('DB_NAME', 'clinic_booking_system'),
-    'autocommit': False,  # Explicit transaction control
-    'pool_name': 'clinic_pool',
-    'pool_size': 5
+    'autocommit': False  # Explicit transaction control
+}
+
+# Connection pool sizing (db/pool.py); size is per worker process
+POOL_CONFIG = {
+    'name': os.getenv('DB_POOL_NAME', 'clinic_pool'),
+    'size': int(os.getenv('DB_POOL_SIZE', 5)),
+    'timeout': float(os.getenv('DB_POOL_TIMEOUT', 2.0)),
+    'recycle': float(os.getenv('DB_POOL_RECYCLE', 3600)),
+    'ping_after': float(os.getenv('DB_POOL_PING_AFTER', 30))
+}
+
+# Read replicas: comma-separated host[:port] list, same credentials as DB_CONFIG.
+# Each gets its own pool sized like POOL_CONFIG; empty means primary only.
+REPLICA_CONFIG = {
+    'hosts': [host.strip() for host in os.getenv('DB_REPLICA_HOSTS', '').split(',') if host.strip()],
+    'max_lag': float(os.getenv('DB_REPLICA_MAX_LAG', 2)),
+    'check_interval': float(os.getenv('DB_REPLICA_CHECK_INTERVAL', 5)),
+    'retry_interval': float(os.getenv('DB_REPLICA_RETRY_INTERVAL', 30)),
+    # Reads of a session that wrote stay on the primary this long
+    'sticky_seconds': float(os.getenv('DB_REPLICA_STICKY_SECONDS', 5))
+}
+
+# Prepared statements kept open per pooled connection
+STATEMENT_CACHE_CONFIG = {
+    'size': int(os.getenv('DB_STATEMENT_CACHE_SIZE', 64))
+}
+
+# Unit-of-work transactions: attempts after deadlocks / lock wait timeouts and
+# the base backoff in seconds (doubled per attempt, with jitter)
+TRANSACTION_CONFIG = {
+    'attempts': int(os.getenv('DB_TRANSACTION_ATTEMPTS', 3)),
+    'backoff': float(os.getenv('DB_TRANSACTION_BACKOFF', 0.05))
 }
 
 # Application configuration
@@ -19,4 +49,84 @@ APP_CONFIG = {
     'SECRET_KEY': os.getenv('SECRET_KEY', 'dev-secret-key'),
     'DEBUG': os.getenv('DEBUG', 'True').lower() == 'true',
     'PORT': int(os.getenv('PORT', 5000))
-}
\ No newline at end of file
+}
+
+# Shared settings for in-process caches kept coherent through cache_versions
+CACHE_CONFIG = {
+    'version_poll_interval': float(os.getenv('CACHE_VERSION_POLL_INTERVAL', 1.0)),
+    'response_ttl': float(os.getenv('RESPONSE_CACHE_TTL', 300)),
+    'response_max_entries': int(os.getenv('RESPONSE_CACHE_MAX_ENTRIES', 1024))
+}
+
+# In-memory slot availability index (services/availability.py)
+AVAILABILITY_CONFIG = {
+    'horizon_days': int(os.getenv('AVAILABILITY_HORIZON_DAYS', 60))
+}
+
+# Server-sent slot change streams (services/slot_events.py)
+SLOT_STREAM_CONFIG = {
+    'max_subscribers': int(os.getenv('SLOT_STREAM_MAX_SUBSCRIBERS', 1000)),
+    'heartbeat': float(os.getenv('SLOT_STREAM_HEARTBEAT', 15)),
+    'max_seconds': float(os.getenv('SLOT_STREAM_MAX_SECONDS', 300)),
+    'buffer': int(os.getenv('SLOT_STREAM_BUFFER', 256))
+}
+
+# Slot generator defaults (services/schedule.py)
+SCHEDULE_CONFIG = {
+    'day_start': os.getenv('SCHEDULE_DAY_START', '09:00'),
+    'day_end': os.getenv('SCHEDULE_DAY_END', '17:00'),
+    'slot_minutes': int(os.getenv('SCHEDULE_SLOT_MINUTES', 30)),
+    'weeks': int(os.getenv('SCHEDULE_WEEKS', 4)),
+    'batch_size': int(os.getenv('SCHEDULE_BATCH_SIZE', 2000))
+}
+
+# History archiver (services/archive.py)
+ARCHIVE_CONFIG = {
+    'after_days': int(os.getenv('ARCHIVE_AFTER_DAYS', 365)),
+    'batch_size': int(os.getenv('ARCHIVE_BATCH_SIZE', 500)),
+    'pause_ms': int(os.getenv('ARCHIVE_PAUSE_MS', 50))
+}
+
+# Request/query instrumentation exposed on /metrics
+METRICS_CONFIG = {
+    'slow_query_ms': float(os.getenv('SLOW_QUERY_MS', 200)),
+    'max_query_series': int(os.getenv('METRICS_MAX_QUERY_SERIES', 500)),
+    'max_fingerprint_length': int(os.getenv('METRICS_MAX_FINGERPRINT_LENGTH', 300))
+}
+
+# Login session backend (middleware/sessions.py): signed, sql or filesystem
+SESSION_CONFIG = {
+    'backend': os.getenv('SESSION_BACKEND', 'signed'),
+    'cache_size': int(os.getenv('SESSION_CACHE_SIZE', 10000)),
+    'cache_ttl': float(os.getenv('SESSION_CACHE_TTL', 30)),
+    'flush_interval': float(os.getenv('SESSION_FLUSH_INTERVAL', 10))
+}
+
+# Admission control (middleware/admission.py). Pool load is (checked out + waiting)
+# connections / pool size; each priority is shed above its threshold.
+# Rates are per client (user, or IP when anonymous): (tokens per second, burst).
+ADMISSION_CONFIG = {
+    'enabled': os.getenv('ADMISSION_CONTROL', 'on').lower() not in ('off', 'false', '0'),
+    'shed_load': {
+        'booking': float(os.getenv('ADMISSION_SHED_BOOKING', 4.0)),
+        'login': float(os.getenv('ADMISSION_SHED_LOGIN', 2.0)),
+        'default': float(os.getenv('ADMISSION_SHED_DEFAULT', 1.5)),
+        'browse': float(os.getenv('ADMISSION_SHED_BROWSE', 1.0))
+    },
+    'rates': {
+        'booking': (float(os.getenv('ADMISSION_RATE_BOOKING', 1.0)), int(os.getenv('ADMISSION_BURST_BOOKING', 5))),
+        'login': (float(os.getenv('ADMISSION_RATE_LOGIN', 0.5)), int(os.getenv('ADMISSION_BURST_LOGIN', 5))),
+        'default': (10.0, 30),
+        'browse': (20.0, 50)
+    },
+    'rate_scale': float(os.getenv('ADMISSION_RATE_SCALE', 1.0)),
+    'max_clients': int(os.getenv('ADMISSION_MAX_CLIENTS', 10000))
+}
+
+# Password hashing (services/passwords.py); workers=0 hashes inline
+PASSWORD_CONFIG = {
+    'bcrypt_rounds': int(os.getenv('BCRYPT_ROUNDS', 12)),
+    'workers': int(os.getenv('PASSWORD_HASH_WORKERS', 2)),
+    'max_pending': int(os.getenv('PASSWORD_HASH_MAX_PENDING', 16)),
+    'timeout': float(os.getenv('PASSWORD_HASH_TIMEOUT', 5.0))
+}
@@ -1,44 +1,116 @@
-import mysql.connector
-from mysql.connector import Error, pooling
+from mysql.connector import Error, InterfaceError, OperationalError, errorcode
+from collections import deque
 from contextlib import contextmanager
-from config import DB_CONFIG
+from contextvars import ContextVar
+from config import DB_CONFIG, POOL_CONFIG, REPLICA_CONFIG, TRANSACTION_CONFIG
+from db.instrumentation import instrument_connection
+from db.pool import ConnectionPool, PoolTimeout
+from db.routing import ReplicaRouter, replica_fallbacks
+from db.rows import Rows
+from db.statements import attach_statement_cache
+from metrics import Counter
 import logging
+import random
+import time
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Create connection pool
-try:
-    connection_pool = mysql.connector.pooling.MySQLConnectionPool(**DB_CONFIG)
-    logger.info("Database connection pool created successfully")
-except Error as e:
-    logger.error(f"Error creating connection pool: {e}")
-    connection_pool = None
+def create_pool(name, connect_args):
+    pool = ConnectionPool(connect_args=connect_args, **{**POOL_CONFIG, 'name': name})
+    pool.connect_hooks.append(instrument_connection)
+    pool.connect_hooks.append(attach_statement_cache)
+    logger.info(f"Database connection pool '{pool.name}' configured with size {pool.size}")
+    return pool
+
+def replica_connect_args(address):
+    host, _, port = address.partition(':')
+    return {**DB_CONFIG, 'host': host, **({'port': int(port)} if port else {})}
+
+# Create connection pools (connections are opened lazily on first checkout)
+connection_pool = create_pool(POOL_CONFIG['name'], DB_CONFIG)
+replica_pools = [
+    create_pool(f"{POOL_CONFIG['name']}_replica{number}", replica_connect_args(address))
+    for number, address in enumerate(REPLICA_CONFIG['hosts'], 1)
+]
+router = ReplicaRouter(connection_pool, replica_pools, REPLICA_CONFIG['max_lag'],
+                       REPLICA_CONFIG['check_interval'], REPLICA_CONFIG['retry_interval'])
+
+def _acquire(pool):
+    """Check out from pool, falling back to the primary when a replica is busy or down"""
+    try:
+        return pool, pool.acquire()
+    except PoolTimeout:
+        if pool is connection_pool:
+            raise
+        replica_fallbacks.inc('busy')
+    except Error as e:
+        if pool is connection_pool:
+            logger.error(f"Database connection error: {e}")
+            raise
+        router.mark_failed(pool, e)
+    return connection_pool, connection_pool.acquire()
 
 @contextmanager
-def get_db_connection():
+def get_db_connection(read_only=False):
     """
     Context manager for database connections.
-    Ensures connections are properly closed even if an error occurs.
+    Waits up to the pool timeout for a free connection and always returns it
+    to the pool (rolled back if a transaction was left open).
+
+    Args:
+        read_only: The block only reads and tolerates replica lag, so it may
+                   be served by a replica (writes always need the primary)
+
+    Raises:
+        PoolTimeout: the pool stayed exhausted for the whole wait timeout
     """
-    connection = None
+    pool, connection = _acquire(router.pool_for(replica=read_only))
     try:
-        if connection_pool:
-            connection = connection_pool.get_connection()
-            yield connection
-        else:
-            raise Exception("Connection pool not available")
+        yield connection
+    except (InterfaceError, OperationalError) as e:
+        if pool is not connection_pool:
+            router.mark_failed(pool, e)
+        logger.error(f"Database connection error: {e}")
+        raise
     except Error as e:
         logger.error(f"Database connection error: {e}")
-        if connection:
-            connection.rollback()
         raise
     finally:
-        if connection and connection.is_connected():
-            connection.close()
+        pool.release(connection)
+
+def _run_query(pool, query, params, fetch_one, fetch_all, commit, compact, cached):
+    pool, connection = _acquire(pool)
+    cursor = None
+    try:
+        if cached:
+            # Prepared once per connection and kept open, so the cursor is not closed
+            cursor = connection.statement_cache.execute(query, params or (), dictionary=not compact)
+        else:
+            cursor = connection.cursor(dictionary=not compact)
+            cursor.execute(query, params or ())
+        
+        if compact and fetch_all:
+            return Rows.from_cursor(cursor, cursor.fetchall())
+        if fetch_one:
+            # Read the whole result so the cached cursor can run again
+            rows = cursor.fetchall()
+            return rows[0] if rows else None
+        if fetch_all:
+            return cursor.fetchall()
+        if cursor.with_rows:
+            cursor.fetchall()
+        if commit:
+            connection.commit()
+        return cursor.lastrowid
+    finally:
+        if cursor is not None and not cached:
+            cursor.close()
+        pool.release(connection)
 
-def execute_query(query, params=None, fetch_one=False, fetch_all=False, commit=True):
+def execute_query(query, params=None, fetch_one=False, fetch_all=False, commit=True, compact=False,
+                  replica=None, cached=True):
     """
     Execute a query with proper error handling and connection management.
     
@@ -48,31 +120,32 @@ def execute_query(query, params=None, fetch_one=False, fetch_all=False, commit=T
         fetch_one: Return single result
         fetch_all: Return all results
         commit: Whether to commit the transaction
+        compact: With fetch_all, return a Rows object (tuple rows and one
+                 shared column index) instead of a list of dicts
+        replica: Routing hint; None sends plain reads to a replica and
+                 everything else to the primary, True/False force the choice
+        cached: False for SQL that varies with its input (IN lists), which
+                would only churn the prepared statement cache
     
     Returns:
         Query results or None on error
+
+    Raises:
+        PoolTimeout: propagated so the app can answer 503 instead of treating
+                     an exhausted pool as an empty result
     """
+    pool = router.pool_for(query, replica)
     try:
-        with get_db_connection() as connection:
-            cursor = connection.cursor(dictionary=True, prepared=True)
-            
-            # Log query for debugging (remove in production)
-            logger.debug(f"Executing query: {query[:100]}...")
-            
-            cursor.execute(query, params or ())
-            
-            if fetch_one:
-                result = cursor.fetchone()
-            elif fetch_all:
-                result = cursor.fetchall()
-            else:
-                if commit:
-                    connection.commit()
-                result = cursor.lastrowid
-            
-            cursor.close()
-            return result
-            
+        try:
+            return _run_query(pool, query, params, fetch_one, fetch_all, commit, compact, cached)
+        except (InterfaceError, OperationalError) as e:
+            if pool is connection_pool:
+                raise
+            # Lost or unreachable replica: retry the read once on the primary
+            router.mark_failed(pool, e)
+            return _run_query(connection_pool, query, params, fetch_one, fetch_all, commit, compact, cached)
+    except PoolTimeout:
+        raise
     except Error as e:
         logger.error(f"Database error: {e}")
         return None
@@ -80,27 +153,224 @@ def execute_query(query, params=None, fetch_one=False, fetch_all=False, commit=T
         logger.error(f"Unexpected error: {e}")
         return None
 
+# Lock errors after which the whole transaction can simply be run again
+RETRYABLE_ERRORS = (errorcode.ER_LOCK_WAIT_TIMEOUT, errorcode.ER_LOCK_DEADLOCK)
+
+transaction_retries = Counter('db_transaction_retries_total', 'Transactions re-run after a lock error',
+                              labels=('reason',))
+
+class _LastId:
+    """Statement parameter standing for the id generated by the latest INSERT"""
+    def __repr__(self):
+        return 'LAST_ID'
+
+LAST_ID = _LastId()
+
+# Unit of work open in the current thread / task, joined by nested ones
+_current_unit = ContextVar('unit_of_work', default=None)
+
+class UnitOfWork:
+    """
+    One transaction on one borrowed primary connection, used like a cursor.
+
+    execute() runs through the connection's statement cache and buffers the
+    result, so fetchone()/fetchall(), rowcount and lastrowid work as on a
+    plain cursor and helpers that take a cursor (bump_version, apply_review)
+    accept a unit as well. lastrowid keeps the id of the latest statement that
+    generated one; LAST_ID in params stands for it, so dependent inserts chain
+    without reading the id back in between.
+    """
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.lastrowid = None
+        self.rowcount = -1
+        self._rows = deque()
+        self._cursor = None
+        self._savepoints = 0
+
+    def execute(self, query, params=None, cached=True):
+        """
+        Run one statement in the transaction.
+
+        Args:
+            query: SQL query string
+            params: Query parameters (tuple or dict), may contain LAST_ID
+            cached: False for SQL that varies with its input (IN lists), which
+                    would only churn the prepared statement cache
+
+        Returns:
+            The unit, positioned on the statement's rows
+        """
+        params = self._bind(params)
+        if cached:
+            cursor = self.connection.statement_cache.execute(query, params, dictionary=False)
+        else:
+            cursor = self._plain_cursor()
+            cursor.execute(query, params)
+        return self._finish(cursor)
+
+    def executemany(self, query, rows):
+        """Run a statement once per row; an INSERT is sent as one multi-row statement"""
+        cursor = self._plain_cursor()
+        cursor.executemany(query, [self._bind(row) for row in rows])
+        return self._finish(cursor)
+
+    def fetchone(self):
+        return self._rows.popleft() if self._rows else None
+
+    def fetchall(self):
+        rows = list(self._rows)
+        self._rows.clear()
+        return rows
+
+    @contextmanager
+    def savepoint(self):
+        """
+        Run the block so that, if it raises, only its own statements are undone.
+
+        The exception still propagates and the transaction stays open. A
+        deadlock has already rolled back the whole transaction, so it is left
+        to the retry in run_in_transaction().
+        """
+        self._savepoints += 1
+        name = f"uow_{self._savepoints}"
+        self._plain_cursor().execute(f"SAVEPOINT {name}")
+        try:
+            yield self
+        except Exception as e:
+            if not (isinstance(e, Error) and e.errno == errorcode.ER_LOCK_DEADLOCK):
+                self._plain_cursor().execute(f"ROLLBACK TO SAVEPOINT {name}")
+            raise
+        else:
+            self._plain_cursor().execute(f"RELEASE SAVEPOINT {name}")
+        finally:
+            self._savepoints -= 1
+
+    def close(self):
+        if self._cursor is not None:
+            self._cursor.close()
+            self._cursor = None
+
+    def _bind(self, params):
+        if isinstance(params, dict):
+            return {name: self.lastrowid if value is LAST_ID else value for name, value in params.items()}
+        return tuple(self.lastrowid if value is LAST_ID else value for value in params or ())
+
+    def _finish(self, cursor):
+        # Read the whole result so the cursor (cached or not) can run again
+        self._rows = deque(cursor.fetchall() if cursor.with_rows else ())
+        self.rowcount = cursor.rowcount
+        if cursor.lastrowid:
+            self.lastrowid = cursor.lastrowid
+        return self
+
+    def _plain_cursor(self):
+        if self._cursor is None:
+            self._cursor = self.connection.cursor()
+        return self._cursor
+
+@contextmanager
+def unit_of_work():
+    """
+    Run the block as one transaction on one primary connection.
+
+    Commits when the block finishes and rolls back if it raises. Inside
+    another unit of work it joins that transaction under a savepoint instead
+    of checking out a second connection, so services called from one request
+    share a single checkout and commit.
+
+    Yields:
+        The UnitOfWork
+
+    Raises:
+        PoolTimeout: the pool stayed exhausted for the whole wait timeout
+    """
+    outer = _current_unit.get()
+    if outer is not None:
+        with outer.savepoint():
+            yield outer
+        return
+
+    with get_db_connection() as connection:
+        unit = UnitOfWork(connection)
+        token = _current_unit.set(unit)
+        try:
+            yield unit
+            connection.commit()
+        except BaseException:
+            try:
+                connection.rollback()
+            except Error as e:
+                logger.error(f"Rollback failed: {e}")
+            raise
+        finally:
+            _current_unit.reset(token)
+            unit.close()
+
+def run_in_transaction(work, description="Transaction", attempts=None):
+    """
+    Call work(unit) in a unit of work and commit, re-running it after lock errors.
+
+    Deadlocks and lock wait timeouts roll back and re-run all of work after a
+    jittered exponential backoff, so work must only change the database
+    through its unit and leave other side effects (cache updates) to the
+    caller. Any other exception rolls back and propagates at once. Inside an
+    enclosing unit of work, work joins it and the outermost caller retries.
+
+    Args:
+        work: Callable taking the UnitOfWork
+        description: What the transaction does, for the retry log
+        attempts: Runs before giving up (default TRANSACTION_CONFIG['attempts'])
+
+    Returns:
+        What work returned
+
+    Raises:
+        mysql.connector.Error: a non-retryable error, or a lock error on the last attempt
+    """
+    if _current_unit.get() is not None:
+        with unit_of_work() as unit:
+            return work(unit)
+
+    attempts = attempts or TRANSACTION_CONFIG['attempts']
+    for attempt in range(1, attempts + 1):
+        try:
+            with unit_of_work() as unit:
+                return work(unit)
+        except Error as e:
+            if e.errno not in RETRYABLE_ERRORS or attempt == attempts:
+                raise
+            transaction_retries.inc('deadlock' if e.errno == errorcode.ER_LOCK_DEADLOCK else 'lock_wait')
+            logger.warning(f"{description} hit {e.errno}, retrying ({attempt}/{attempts})")
+        time.sleep(TRANSACTION_CONFIG['backoff'] * (2 ** (attempt - 1)) * (1 + random.random()))
+
 def execute_transaction(queries):
     """
-    Execute multiple queries in a transaction.
+    Execute multiple queries in one transaction, retrying deadlocks and lock waits.
     
     Args:
-        queries: List of (query, params) tuples
+        queries: List of (query, params) tuples; LAST_ID in params stands for
+                 the id generated by the latest INSERT before it
     
     Returns:
-        True if successful, False otherwise
+        List of the latest generated id after each statement if successful,
+        False otherwise
+
+    Raises:
+        ValueError: queries is empty, so there is no result to tell apart from failure
+        PoolTimeout: propagated so the app can answer 503
     """
+    if not queries:
+        raise ValueError("execute_transaction needs at least one query")
+
+    def run(unit):
+        return [unit.execute(query, params).lastrowid for query, params in queries]
+
     try:
-        with get_db_connection() as connection:
-            cursor = connection.cursor(dictionary=True, prepared=True)
-            
-            for query, params in queries:
-                cursor.execute(query, params)
-            
-            connection.commit()
-            cursor.close()
-            return True
-            
+        return run_in_transaction(run)
+    except PoolTimeout:
+        raise
     except Error as e:
         logger.error(f"Transaction error: {e}")
-        return False
\ No newline at end of file
+        return False
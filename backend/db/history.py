@@ -0,0 +1,33 @@
+"""
+Queries over appointment history split between hot and archive tables.
+
+services/archive.py moves finished appointments out of `appointments` into
+`appointments_archive` (same columns, same ids). Queries that must see the
+whole history are written once with an {appointments} placeholder for the
+table name and expanded into one branch per table; db.pagination runs the
+branches as a UNION ALL, each branch an index range scan of its own table.
+"""
+
+HOT_TABLE = 'appointments'
+ARCHIVE_TABLE = 'appointments_archive'
+
+
+def history_queries(template, include_archive=True):
+    """
+    Expand a query template into one query per appointment table.
+
+    Args:
+        template: SQL with an {appointments} placeholder for the table name
+        include_archive: False for queries that only concern live appointments
+                         (e.g. scheduled ones, which are never archived)
+
+    Returns:
+        List of queries, hot table first
+    """
+    tables = (HOT_TABLE, ARCHIVE_TABLE) if include_archive else (HOT_TABLE,)
+    return [template.format(appointments=table) for table in tables]
+
+
+def union_all(queries, params):
+    """Combine branch queries sharing the same params into one statement and its params"""
+    return " UNION ALL ".join(f"({query})" for query in queries), tuple(params) * len(queries)
@@ -0,0 +1,136 @@
+"""
+Query timing for every pooled connection.
+
+instrument_connection() wraps the connection's command methods (text queries
+and prepared statement executions), so all SQL is measured no matter which
+helper or cursor class issued it. Each statement is reduced to a fingerprint
+(literals and placeholders replaced by ?, IN lists and multi-row VALUES
+collapsed) that labels the latency histogram and the slow-query log, and the
+time is also added to the current request's totals when one is being tracked.
+"""
+import contextvars
+import logging
+import re
+import time
+from functools import lru_cache
+from config import METRICS_CONFIG
+from metrics import Counter, Histogram
+
+slow_query_logger = logging.getLogger('db.slow_query')
+
+OTHER_FINGERPRINT = 'other'
+
+query_duration = Histogram('db_query_duration_seconds', 'SQL statement execution time', labels=('query',))
+slow_queries = Counter('db_slow_queries_total', 'Statements slower than the slow-query threshold', labels=('query',))
+
+_STRING = re.compile(r"'(?:[^'\\]|\\.|'')*'|\"(?:[^\"\\]|\\.|\"\")*\"")
+_PARAM = re.compile(r"%\(\w+\)s|%s")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)", re.IGNORECASE)
+_ROW = r"\(\s*\?(?:\s*,\s*\?)*\s*\)"
+_ROWS = re.compile(rf"({_ROW})(?:\s*,\s*{_ROW})+")
+_WHITESPACE = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=2048)
+def fingerprint(sql):
+    """Normalize a statement so that executions differing only in values group together"""
+    if isinstance(sql, (bytes, bytearray)):
+        sql = bytes(sql).decode('utf-8', errors='replace')
+    sql = _STRING.sub('?', sql)
+    sql = _PARAM.sub('?', sql)
+    sql = _NUMBER.sub('?', sql)
+    sql = _IN_LIST.sub('IN (...)', sql)
+    sql = _ROWS.sub(r'\1, ...', sql)
+    sql = _WHITESPACE.sub(' ', sql).strip()
+    return sql[:METRICS_CONFIG['max_fingerprint_length']]
+
+
+class RequestStats:
+    __slots__ = ('db_seconds', 'queries')
+
+    def __init__(self):
+        self.db_seconds = 0.0
+        self.queries = 0
+
+
+_request_stats = contextvars.ContextVar('request_db_stats', default=None)
+
+
+def start_request_stats():
+    """Begin accumulating DB time and query count for the current request"""
+    stats = RequestStats()
+    _request_stats.set(stats)
+    return stats
+
+
+def finish_request_stats():
+    """Stop accumulating and return the current request's RequestStats (or None)"""
+    stats = _request_stats.get()
+    _request_stats.set(None)
+    return stats
+
+
+def record_query(sql, seconds):
+    label = fingerprint(sql)
+    if (not query_duration.has_series(label)
+            and query_duration.series_count() >= METRICS_CONFIG['max_query_series']):
+        label = OTHER_FINGERPRINT
+    query_duration.observe(seconds, label)
+
+    if seconds * 1000 >= METRICS_CONFIG['slow_query_ms']:
+        slow_queries.inc(label)
+        slow_query_logger.warning(f"Slow query ({seconds * 1000:.1f} ms): {fingerprint(sql)}")
+
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.db_seconds += seconds
+        stats.queries += 1
+
+
+def _statement_key(statement):
+    """Prepared statement handle: a dict (pure Python driver), an int id, or a C extension object"""
+    if isinstance(statement, dict):
+        return statement.get('statement_id')
+    if isinstance(statement, int):
+        return statement
+    return id(statement)
+
+
+def instrument_connection(connection):
+    """Time every statement sent on this connection (pool connect hook)"""
+    statements = {}
+    cmd_query = connection.cmd_query
+    cmd_stmt_prepare = connection.cmd_stmt_prepare
+    cmd_stmt_execute = connection.cmd_stmt_execute
+    cmd_stmt_close = connection.cmd_stmt_close
+
+    def timed_query(query, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return cmd_query(query, *args, **kwargs)
+        finally:
+            record_query(query, time.perf_counter() - started)
+
+    def prepare(statement, *args, **kwargs):
+        result = cmd_stmt_prepare(statement, *args, **kwargs)
+        statements[_statement_key(result)] = statement
+        return result
+
+    def timed_execute(statement_id, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return cmd_stmt_execute(statement_id, *args, **kwargs)
+        finally:
+            sql = statements.get(_statement_key(statement_id), 'prepared statement')
+            record_query(sql, time.perf_counter() - started)
+
+    def close(statement_id, *args, **kwargs):
+        statements.pop(_statement_key(statement_id), None)
+        return cmd_stmt_close(statement_id, *args, **kwargs)
+
+    connection.cmd_query = timed_query
+    connection.cmd_stmt_prepare = prepare
+    connection.cmd_stmt_execute = timed_execute
+    connection.cmd_stmt_close = close
+    return connection
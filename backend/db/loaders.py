@@ -0,0 +1,112 @@
+"""
+Batched loaders that fetch related rows for many parents in one query.
+
+Each loader takes a list of ids and issues a single IN (...) query, then groups
+the rows in Python, so building N records costs a fixed number of round trips
+instead of 1 + N.
+"""
+from db.connection import execute_query
+from db.history import history_queries, union_all
+
+PRESCRIPTION_QUERY = """
+    SELECT
+        p.prescription_id,
+        p.diagnosis,
+        p.instructions,
+        p.follow_up_date,
+        p.created_at,
+        a.appointment_date,
+        a.patient_id,
+        a.doctor_id,
+        CONCAT(doc_user.first_name, ' ', doc_user.last_name) AS doctor_name,
+        doc.qualification,
+        dept.department_name,
+        CONCAT(pat_user.first_name, ' ', pat_user.last_name) AS patient_name,
+        pat.date_of_birth,
+        pat.gender
+    FROM prescriptions p
+    INNER JOIN {appointments} a ON p.appointment_id = a.appointment_id
+    INNER JOIN doctors doc ON a.doctor_id = doc.doctor_id
+    INNER JOIN users doc_user ON doc.doctor_id = doc_user.user_id
+    INNER JOIN departments dept ON doc.department_id = dept.department_id
+    INNER JOIN patients pat ON a.patient_id = pat.patient_id
+    INNER JOIN users pat_user ON pat.patient_id = pat_user.user_id
+"""
+
+
+def placeholders(values):
+    return ', '.join(['%s'] * len(values))
+
+
+def load_prescriptions(prescription_ids, owner_column=None, owner_id=None):
+    """
+    Load prescription headers by id.
+
+    Args:
+        prescription_ids: Ids to load
+        owner_column: Optional "a.patient_id" / "a.doctor_id" restriction
+        owner_id: Value for owner_column
+
+    Returns:
+        List of prescription dicts in the order of prescription_ids (missing or
+        inaccessible ids are skipped), or None on database error
+    """
+    if not prescription_ids:
+        return []
+    query = PRESCRIPTION_QUERY + f" WHERE p.prescription_id IN ({placeholders(prescription_ids)})"
+    params = list(prescription_ids)
+    if owner_column:
+        query += f" AND {owner_column} = %s"
+        params.append(owner_id)
+    # The appointment is in exactly one of the hot and archive tables
+    query, params = union_all(history_queries(query), params)
+
+    rows = execute_query(query, tuple(params), fetch_all=True, cached=False)
+    if rows is None:
+        return None
+    by_id = {row['prescription_id']: row for row in rows}
+    return [by_id[prescription_id] for prescription_id in prescription_ids if prescription_id in by_id]
+
+
+def load_prescription_medicines(prescription_ids):
+    """
+    Load the medicines of many prescriptions with one query.
+
+    Returns:
+        {prescription_id: [medicine dicts]} with an entry for every requested id,
+        or None on database error
+    """
+    medicines = {prescription_id: [] for prescription_id in prescription_ids}
+    if not prescription_ids:
+        return medicines
+    rows = execute_query(
+        f"""SELECT
+            pm.prescription_id,
+            m.medicine_name,
+            m.generic_name,
+            m.medicine_type,
+            pm.dosage,
+            pm.frequency,
+            pm.duration,
+            pm.quantity,
+            pm.instructions
+        FROM prescription_medicines pm
+        INNER JOIN medicines m ON pm.medicine_id = m.medicine_id
+        WHERE pm.prescription_id IN ({placeholders(prescription_ids)})""",
+        tuple(prescription_ids),
+        fetch_all=True,
+        cached=False
+    )
+    if rows is None:
+        return None
+    for row in rows:
+        medicines[row.pop('prescription_id')].append(row)
+    return medicines
+
+
+def attach_medicines(prescriptions):
+    """Set prescription['medicines'] on every dict in the list using one query"""
+    medicines = load_prescription_medicines([p['prescription_id'] for p in prescriptions]) or {}
+    for prescription in prescriptions:
+        prescription['medicines'] = medicines.get(prescription['prescription_id'], [])
+    return prescriptions
@@ -0,0 +1,152 @@
+"""
+Keyset pagination and streamed result sets for list endpoints.
+
+Pages are ordered by a fixed tuple of columns ending in a unique id, and the
+opaque cursor is the ordering values of the last row returned. The next page
+continues strictly after that row, so results stay stable while rows are
+inserted and each page is an index range scan instead of an OFFSET.
+"""
+import base64
+import json
+from db.connection import get_db_connection, execute_query
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+STREAM_CHUNK_SIZE = 500
+
+
+def page_size(raw_limit):
+    """Clamp a ?limit= value to [1, MAX_PAGE_SIZE]"""
+    if raw_limit is None:
+        return DEFAULT_PAGE_SIZE
+    return max(1, min(int(raw_limit), MAX_PAGE_SIZE))
+
+
+def encode_cursor(row, order_columns):
+    values = []
+    for _, key in order_columns:
+        value = row[key]
+        values.append(value if isinstance(value, int) else str(value))
+    return base64.urlsafe_b64encode(json.dumps(values).encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor, order_columns):
+    """Raises ValueError for malformed cursors"""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+    except Exception:
+        raise ValueError("Invalid cursor")
+    if not isinstance(values, list) or len(values) != len(order_columns):
+        raise ValueError("Invalid cursor")
+    # Values become bind parameters: only scalars the encoder can have produced
+    if any(isinstance(value, bool) or not isinstance(value, (str, int, float)) for value in values):
+        raise ValueError("Invalid cursor")
+    return values
+
+
+def keyset_condition(order_columns, descending):
+    """
+    Build "row after cursor" for a (leading, id) ordering, expanded so the
+    optimizer can use a range scan on the leading column.
+    """
+    (leading, _), (unique, _) = order_columns
+    op = '<' if descending else '>'
+    return f"({leading} {op} %s OR ({leading} = %s AND {unique} {op} %s))"
+
+
+def order_by(order_columns, descending):
+    direction = 'DESC' if descending else 'ASC'
+    return " ORDER BY " + ", ".join(f"{column} {direction}" for column, _ in order_columns)
+
+
+def keyset_query(query, params, order_columns, cursor=None, descending=False, suffix='', limit=None):
+    """
+    Append the cursor condition, ordering and optional LIMIT to a query.
+
+    query may also be a list of branch queries sharing params (see
+    db.history.history_queries): each branch is ordered and limited on its
+    own, and their UNION ALL is ordered again by the result keys.
+
+    Returns:
+        (sql, params)
+    """
+    if not isinstance(query, str):
+        if len(query) == 1:
+            query = query[0]
+        else:
+            branches = [keyset_query(branch, params, order_columns, cursor, descending, suffix, limit)
+                        for branch in query]
+            sql = " UNION ALL ".join(f"({branch})" for branch, _ in branches)
+            sql += order_by([(key, key) for _, key in order_columns], descending)
+            params = [value for _, branch_params in branches for value in branch_params]
+            if limit is not None:
+                sql += " LIMIT %s"
+                params.append(limit)
+            return sql, params
+
+    params = list(params)
+    if cursor:
+        leading, unique = decode_cursor(cursor, order_columns)
+        query += " AND " + keyset_condition(order_columns, descending)
+        params.extend([leading, leading, unique])
+    query += suffix + order_by(order_columns, descending)
+    if limit is not None:
+        query += " LIMIT %s"
+        params.append(limit)
+    return query, params
+
+
+def fetch_page(query, params, order_columns, cursor=None, limit=DEFAULT_PAGE_SIZE,
+               descending=False, suffix=''):
+    """
+    Fetch one page of a keyset-ordered query.
+
+    Args:
+        query: SELECT ending in a WHERE clause (conditions are appended with AND),
+               or a list of such queries to merge
+        params: Parameters for query
+        order_columns: [(sql expression, result key), ...] for the leading
+                       ordering column and a unique tie-breaker
+        cursor: Opaque cursor from a previous page
+        limit: Page size
+        descending: Newest first
+        suffix: SQL placed between the keyset condition and ORDER BY (e.g. GROUP BY)
+
+    Returns:
+        (rows, next_cursor) where next_cursor is None on the last page, or
+        (None, None) on database error
+    """
+    query, params = keyset_query(query, params, order_columns, cursor=cursor, descending=descending,
+                                 suffix=suffix, limit=limit + 1)
+    rows = execute_query(query, tuple(params), fetch_all=True)
+    if rows is None:
+        return None, None
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(rows[-1], order_columns)
+
+
+def stream_rows(query, params, order_columns, serialize, cursor=None, descending=False,
+                chunk_size=STREAM_CHUNK_SIZE):
+    """
+    Yield a query's rows as JSON lines, fetched in chunks from an unbuffered cursor.
+
+    Only one chunk is held in memory at a time, whatever the result size.
+    """
+    query, params = keyset_query(query, params, order_columns, cursor=cursor, descending=descending)
+
+    with get_db_connection(read_only=True) as connection:
+        db_cursor = connection.cursor(dictionary=True)
+        try:
+            db_cursor.execute(query, tuple(params))
+            while True:
+                rows = db_cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                yield ''.join(serialize(row) + '\n' for row in rows)
+        finally:
+            # Drain unread rows if the client went away mid-stream
+            if connection.unread_result:
+                connection.consume_results()
+            db_cursor.close()
@@ -0,0 +1,199 @@
+"""
+Connection pool with a bounded wait queue and checkout statistics.
+
+Unlike mysql.connector's MySQLConnectionPool, which raises as soon as every
+connection is in use, acquire() waits up to `timeout` seconds for a connection
+to be returned. Connections are opened lazily up to `size`, pinged before reuse
+when they have been idle for a while, and replaced once they reach `recycle`
+seconds of age so server-side timeouts never hand out a dead connection.
+"""
+import logging
+import threading
+import time
+from collections import deque
+import mysql.connector
+from mysql.connector import Error
+from mysql.connector.errors import PoolError
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds (seconds) of the checkout wait-time histogram buckets
+WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+class PoolTimeout(PoolError):
+    """No connection became available within the pool's wait timeout"""
+
+
+class PooledConnection:
+    """Bookkeeping for one physical connection owned by the pool"""
+
+    __slots__ = ('connection', 'created_at', 'last_used')
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+
+
+class ConnectionPool:
+    def __init__(self, name, size, timeout, recycle, ping_after, connect_args):
+        self.name = name
+        self.size = size
+        self.timeout = timeout
+        self.recycle = recycle
+        self.ping_after = ping_after
+        self.connect_args = connect_args
+        self.connect_hooks = []  # called with each newly opened connection
+
+        self._idle = deque()
+        self._checked_out = {}  # id(connection) -> PooledConnection
+        self._opened = 0
+        self._waiting = 0
+        self._cond = threading.Condition()
+
+        # Statistics
+        self.checkouts = 0
+        self.timeouts = 0
+        self.connects = 0
+        self.recycled = 0
+        self.failed_pings = 0
+        self.wait_seconds_total = 0.0
+        self.wait_histogram = [0] * (len(WAIT_BUCKETS) + 1)
+
+    def acquire(self):
+        """
+        Check out a connection, waiting up to self.timeout seconds.
+
+        Raises:
+            PoolTimeout: the pool stayed exhausted for the whole timeout
+            mysql.connector.Error: a new connection could not be opened
+        """
+        started = time.monotonic()
+        deadline = started + self.timeout
+        with self._cond:
+            while True:
+                if self._idle:
+                    entry = self._idle.pop()  # LIFO keeps recently used connections warm
+                    break
+                if self._opened < self.size:
+                    self._opened += 1
+                    entry = None
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.timeouts += 1
+                    raise PoolTimeout(f"Pool '{self.name}' exhausted: no connection within {self.timeout}s")
+                self._waiting += 1
+                try:
+                    self._cond.wait(remaining)
+                finally:
+                    self._waiting -= 1
+            self._record_wait(time.monotonic() - started)
+
+        try:
+            entry = self._prepare(entry)
+        except Exception:
+            with self._cond:
+                self._opened -= 1
+                self._cond.notify()
+            raise
+
+        with self._cond:
+            self._checked_out[id(entry.connection)] = entry
+        return entry.connection
+
+    def release(self, connection):
+        """Return a connection; it is rolled back, or closed if it is broken"""
+        with self._cond:
+            entry = self._checked_out.pop(id(connection), None)
+        if entry is None:
+            return
+
+        healthy = True
+        try:
+            if connection.in_transaction:
+                connection.rollback()
+            healthy = connection.is_connected()
+        except Error:
+            healthy = False
+
+        with self._cond:
+            if healthy:
+                entry.last_used = time.monotonic()
+                self._idle.append(entry)
+            else:
+                self._opened -= 1
+            self._cond.notify()
+        if not healthy:
+            self._close(connection)
+
+    def load(self):
+        """(checked out + waiting) / size; above 1.0 requests are queueing for a connection"""
+        return (len(self._checked_out) + self._waiting) / self.size
+
+    def stats(self):
+        with self._cond:
+            return {
+                "name": self.name,
+                "size": self.size,
+                "open": self._opened,
+                "idle": len(self._idle),
+                "checked_out": len(self._checked_out),
+                "waiting": self._waiting,
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "connects": self.connects,
+                "recycled": self.recycled,
+                "failed_pings": self.failed_pings,
+                "wait_seconds_total": round(self.wait_seconds_total, 6),
+                "wait_histogram": {
+                    **{str(bound): count for bound, count in zip(WAIT_BUCKETS, self._cumulative_wait())},
+                    "+Inf": self.checkouts
+                }
+            }
+
+    def _cumulative_wait(self):
+        total = 0
+        for count in self.wait_histogram[:-1]:
+            total += count
+            yield total
+
+    def _record_wait(self, waited):
+        self.checkouts += 1
+        self.wait_seconds_total += waited
+        for i, bound in enumerate(WAIT_BUCKETS):
+            if waited <= bound:
+                self.wait_histogram[i] += 1
+                return
+        self.wait_histogram[-1] += 1
+
+    def _prepare(self, entry):
+        """Open, recycle or ping a connection before handing it out"""
+        now = time.monotonic()
+        if entry is not None and now - entry.created_at > self.recycle:
+            self.recycled += 1
+            self._close(entry.connection)
+            entry = None
+        elif entry is not None and now - entry.last_used > self.ping_after:
+            try:
+                entry.connection.ping(reconnect=False)
+            except Error:
+                self.failed_pings += 1
+                self._close(entry.connection)
+                entry = None
+
+        if entry is None:
+            connection = mysql.connector.connect(**self.connect_args)
+            for hook in self.connect_hooks:
+                hook(connection)
+            entry = PooledConnection(connection)
+            self.connects += 1
+        return entry
+
+    @staticmethod
+    def _close(connection):
+        try:
+            connection.close()
+        except Error as e:
+            logger.debug(f"Error closing pooled connection: {e}")
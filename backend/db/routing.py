@@ -0,0 +1,183 @@
+"""
+Read/write routing between the primary and replica connection pools.
+
+Writes, locking reads and transactions always use the primary. A plain read
+(SELECT/SHOW/EXPLAIN, or an explicit hint) goes to the next healthy replica
+in round-robin order, unless the current context asked for primary reads:
+requests that modify data and sessions that recently wrote
+(read-your-writes), or fills of version-keyed caches that must not capture
+replica lag.
+
+Replica lag is sampled from SHOW REPLICA STATUS (MySQL 8.0.22+) at most once per
+check_interval. A replica more than max_lag seconds behind, whose
+replication threads are stopped, or which is not configured as a replica at
+all, is skipped until a later check. A replica
+that fails to connect or execute is skipped for retry_interval seconds. When
+no replica is usable, reads fall back to the primary.
+"""
+import contextvars
+import itertools
+import logging
+import re
+import threading
+import time
+from contextlib import contextmanager
+from functools import lru_cache
+from mysql.connector import Error
+from db.pool import PoolTimeout
+from metrics import Counter
+
+logger = logging.getLogger(__name__)
+
+routed_statements = Counter('db_routed_total', 'Checkouts by routing target', labels=('target',))
+replica_fallbacks = Counter('db_replica_fallback_total', 'Reads sent to the primary instead of a replica',
+                            labels=('reason',))
+
+_READ = re.compile(r"^\s*(?:/\*.*?\*/\s*)*\(?\s*(SELECT|SHOW|EXPLAIN|DESCRIBE)\b", re.IGNORECASE | re.DOTALL)
+_LOCKING = re.compile(r"\bFOR\s+(?:UPDATE|SHARE)\b|\bLOCK\s+IN\s+SHARE\s+MODE\b", re.IGNORECASE)
+
+_primary_reads = contextvars.ContextVar('primary_reads', default=False)
+
+
+@lru_cache(maxsize=2048)
+def is_read_statement(sql):
+    """True for statements a replica can answer (plain, non-locking reads)"""
+    if isinstance(sql, (bytes, bytearray)):
+        sql = bytes(sql).decode('utf-8', errors='replace')
+    return bool(_READ.match(sql)) and not _LOCKING.search(sql)
+
+
+def set_primary_reads(enabled):
+    """Route this context's reads to the primary; returns a token for reset_primary_reads"""
+    return _primary_reads.set(enabled)
+
+
+def reset_primary_reads(token):
+    _primary_reads.reset(token)
+
+
+@contextmanager
+def primary_reads():
+    """Read from the primary inside the block (e.g. while filling a version-keyed cache)"""
+    token = _primary_reads.set(True)
+    try:
+        yield
+    finally:
+        _primary_reads.reset(token)
+
+
+class ReplicaState:
+    __slots__ = ('pool', 'lag', 'checked_at', 'down_until')
+
+    def __init__(self, pool):
+        self.pool = pool
+        self.lag = None
+        self.checked_at = 0.0
+        self.down_until = 0.0
+
+
+class ReplicaRouter:
+    def __init__(self, primary, replicas, max_lag, check_interval, retry_interval):
+        self.primary = primary
+        self.replicas = [ReplicaState(pool) for pool in replicas]
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self.retry_interval = retry_interval
+        self._next = itertools.count()
+        self._check_lock = threading.Lock()
+
+    @property
+    def pools(self):
+        return [self.primary] + [replica.pool for replica in self.replicas]
+
+    def pool_for(self, sql=None, replica=None):
+        """
+        Pick the pool for a statement.
+
+        Args:
+            sql: Statement text, classified when replica is None
+            replica: Explicit hint; True allows a replica, False forces the primary
+        """
+        if replica is None:
+            replica = sql is not None and is_read_statement(sql)
+        if not replica or not self.replicas:
+            routed_statements.inc('primary')
+            return self.primary
+        if _primary_reads.get():
+            replica_fallbacks.inc('sticky')
+            routed_statements.inc('primary')
+            return self.primary
+
+        now = time.monotonic()
+        self._maybe_check_lag(now)
+        count = len(self.replicas)
+        start = next(self._next)
+        for offset in range(count):
+            state = self.replicas[(start + offset) % count]
+            if state.down_until <= now and state.lag is not None and state.lag <= self.max_lag:
+                routed_statements.inc('replica')
+                return state.pool
+        replica_fallbacks.inc('unavailable')
+        routed_statements.inc('primary')
+        return self.primary
+
+    def mark_failed(self, pool, error):
+        """Skip a replica for retry_interval after a connection or execution error"""
+        for state in self.replicas:
+            if state.pool is pool:
+                state.down_until = time.monotonic() + self.retry_interval
+                replica_fallbacks.inc('failure')
+                logger.warning(f"Replica pool '{pool.name}' failed, reading from the primary: {error}")
+
+    def is_replica(self, pool):
+        return pool is not self.primary
+
+    def stats(self):
+        now = time.monotonic()
+        return [
+            {**state.pool.stats(), "lag_seconds": state.lag, "down": state.down_until > now}
+            for state in self.replicas
+        ]
+
+    def _maybe_check_lag(self, now):
+        if all(now - state.checked_at < self.check_interval for state in self.replicas):
+            return
+        if not self._check_lock.acquire(blocking=False):
+            return  # another thread is already checking
+        try:
+            for state in self.replicas:
+                if now - state.checked_at >= self.check_interval and state.down_until <= now:
+                    state.checked_at = now
+                    state.lag = self._measure_lag(state)
+        finally:
+            self._check_lock.release()
+
+    def _measure_lag(self, state):
+        """Seconds behind the source, or None if the server is broken or not replicating"""
+        try:
+            connection = state.pool.acquire()
+        except PoolTimeout:
+            return state.lag  # busy, not broken: keep the last sample
+        except Error as e:
+            self.mark_failed(state.pool, e)
+            return None
+        try:
+            cursor = connection.cursor(dictionary=True)
+            try:
+                cursor.execute("SHOW REPLICA STATUS")
+                rows = cursor.fetchall()
+            finally:
+                cursor.close()
+        except Error as e:
+            self.mark_failed(state.pool, e)
+            return None
+        finally:
+            state.pool.release(connection)
+        if not rows:
+            # Not a replica: its data could be arbitrarily old
+            logger.warning(f"Replica pool '{state.pool.name}': server has no replica status")
+            return None
+        lag = rows[0].get('Seconds_Behind_Source')
+        if lag is None:
+            logger.warning(f"Replica pool '{state.pool.name}': replication is not running")
+        return lag
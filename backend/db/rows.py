@@ -0,0 +1,122 @@
+"""
+Compact result sets for hot read paths.
+
+execute_query(..., compact=True) returns a Rows object instead of a list of
+dicts: plain tuples from the cursor plus one shared column index, with a
+converter per column chosen once from the cursor description. json_response()
+encodes payloads containing Rows straight to JSON bytes, with orjson when it
+is installed and the standard library encoder otherwise.
+
+DECIMAL, DATE and TIME values are rendered the way the routes already
+return them, so switching a route to compact rows does not change its
+response. DATETIME and TIMESTAMP become ISO 8601 instead of jsonify's
+RFC 822 dates:
+    DECIMAL             "150.00" (string, as jsonify does)
+    DATE                "2025-01-31"
+    TIME                "9:30:00" (str() of the connector's timedelta)
+    DATETIME/TIMESTAMP  "2025-01-31T09:30:00"
+"""
+import json
+from datetime import date, timedelta
+from decimal import Decimal
+from flask import Response
+from mysql.connector import FieldType
+
+try:
+    import orjson
+except ImportError:  # optional speedup
+    orjson = None
+
+
+def _isoformat(value):
+    return value.isoformat()
+
+
+CONVERTERS = {
+    FieldType.DECIMAL: str,
+    FieldType.NEWDECIMAL: str,
+    FieldType.DATE: _isoformat,
+    FieldType.NEWDATE: _isoformat,
+    FieldType.TIME: str,
+    FieldType.DATETIME: _isoformat,
+    FieldType.TIMESTAMP: _isoformat,
+}
+
+
+class Rows:
+    """Tuple rows sharing one column index"""
+
+    __slots__ = ('columns', 'index', 'rows', 'converters')
+
+    def __init__(self, columns, rows, type_codes=None):
+        self.columns = tuple(columns)
+        self.index = {name: position for position, name in enumerate(self.columns)}
+        self.rows = rows
+        # (position, converter) for the columns that are not JSON-native
+        self.converters = [
+            (position, CONVERTERS[type_code])
+            for position, type_code in enumerate(type_codes or ())
+            if type_code in CONVERTERS
+        ]
+
+    @classmethod
+    def from_cursor(cls, cursor, rows):
+        return cls(cursor.column_names, rows, [column[1] for column in cursor.description])
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __iter__(self):
+        return iter(self.rows)
+
+    def value(self, row, name):
+        return row[self.index[name]]
+
+    def column(self, name):
+        position = self.index[name]
+        return [row[position] for row in self.rows]
+
+    def dicts(self):
+        """Rows as dicts with the raw driver values"""
+        columns = self.columns
+        return [dict(zip(columns, row)) for row in self.rows]
+
+    def json_rows(self):
+        """Rows as dicts with every value converted to its JSON representation"""
+        columns = self.columns
+        converters = self.converters
+        if not converters:
+            return [dict(zip(columns, row)) for row in self.rows]
+        result = []
+        for row in self.rows:
+            row = list(row)
+            for position, convert in converters:
+                if row[position] is not None:
+                    row[position] = convert(row[position])
+            result.append(dict(zip(columns, row)))
+        return result
+
+
+def _default(value):
+    """Fallback for values that are neither JSON-native nor typed by a cursor"""
+    if isinstance(value, Rows):
+        return value.json_rows()
+    if isinstance(value, (Decimal, timedelta)):
+        return str(value)
+    if isinstance(value, date):  # datetime included
+        return _isoformat(value)
+    if isinstance(value, (bytes, bytearray)):
+        return value.decode('utf-8')
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(payload):
+    """Encode a payload (which may contain Rows) to JSON bytes"""
+    if orjson is not None:
+        return orjson.dumps(payload, default=_default)
+    return json.dumps(payload, default=_default, separators=(',', ':')).encode('utf-8')
+
+
+def json_response(payload, status=200):
+    """jsonify() for payloads built from compact rows"""
+    return Response(dumps(payload), status=status, mimetype='application/json')
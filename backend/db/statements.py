@@ -0,0 +1,113 @@
+"""
+Per-connection cache of server-side prepared statements.
+
+A fresh prepared cursor costs a PREPARE round trip and a deallocation for
+every statement. attach_statement_cache() (a pool connect hook) gives each
+pooled connection an LRU of open prepared cursors keyed by SQL text, so a
+statement is prepared once per connection and re-executed on later checkouts.
+
+mysql.connector only skips the PREPARE when execute() receives the very str
+object it prepared, so each entry keeps the SQL object it was created with and
+passes that back. Prepared statements do not survive a reconnect; the cache
+remembers the server connection id and starts over when it changes.
+
+SQL whose text depends on its input (IN lists of varying length) would turn
+every distinct length into a PREPARE that evicts a hot statement; callers pass
+cached=False to execute_query() or UnitOfWork.execute() to run it on a plain
+cursor instead.
+"""
+import logging
+from collections import OrderedDict
+from mysql.connector import Error
+from config import STATEMENT_CACHE_CONFIG
+from metrics import Counter
+
+logger = logging.getLogger(__name__)
+
+statement_cache_hits = Counter('db_statement_cache_hits_total', 'Executions that reused a prepared statement')
+statement_cache_misses = Counter('db_statement_cache_misses_total', 'Executions that prepared a new statement')
+statement_cache_evictions = Counter('db_statement_cache_evictions_total',
+                                    'Prepared statements closed to make room or after an error')
+statement_cache_invalidations = Counter('db_statement_cache_invalidations_total',
+                                        'Caches dropped because the connection reconnected')
+
+
+class StatementCache:
+    """LRU of prepared cursors for one connection"""
+
+    def __init__(self, connection, size):
+        self.connection = connection
+        self.size = max(1, size)
+        self._cursors = OrderedDict()  # (sql, dictionary) -> (sql object, cursor)
+        self._connection_id = connection.connection_id
+
+    def execute(self, sql, params=(), dictionary=False):
+        """
+        Execute sql on a cached prepared cursor.
+
+        Returns:
+            The cursor, positioned on the result. Fetch every row before the
+            next execute; do not close it.
+        """
+        if self.connection.connection_id != self._connection_id:
+            # The old statement ids mean nothing (or something else) on the new session
+            self.clear(close=False)
+            self._connection_id = self.connection.connection_id
+            statement_cache_invalidations.inc()
+
+        key = (sql, dictionary)
+        entry = self._cursors.get(key)
+        if entry is None:
+            statement_cache_misses.inc()
+            entry = (sql, self.connection.cursor(dictionary=dictionary, prepared=True))
+            self._cursors[key] = entry
+            if len(self._cursors) > self.size:
+                self._close(self._cursors.popitem(last=False)[1][1])
+        else:
+            statement_cache_hits.inc()
+            self._cursors.move_to_end(key)
+
+        sql, cursor = entry
+        try:
+            cursor.execute(sql, params)
+        except Error:
+            # The statement may be gone server-side or half-read; prepare it afresh next time
+            self._cursors.pop(key, None)
+            self._close(cursor)
+            raise
+        return cursor
+
+    def clear(self, close=True):
+        """Forget every statement, deallocating them server-side unless close is False"""
+        cursors = [cursor for _, cursor in self._cursors.values()]
+        self._cursors.clear()
+        if close:
+            for cursor in cursors:
+                self._close(cursor)
+
+    def __len__(self):
+        return len(self._cursors)
+
+    @staticmethod
+    def _close(cursor):
+        statement_cache_evictions.inc()
+        try:
+            cursor.close()
+        except Error as e:
+            logger.debug(f"Error closing cached statement: {e}")
+
+
+def attach_statement_cache(connection):
+    """Give a newly opened connection its statement cache (pool connect hook)"""
+    connection.statement_cache = StatementCache(connection, STATEMENT_CACHE_CONFIG['size'])
+    return connection
+
+
+def statement_cache_stats():
+    return {
+        "size": STATEMENT_CACHE_CONFIG['size'],
+        "hits": statement_cache_hits.value(),
+        "misses": statement_cache_misses.value(),
+        "evictions": statement_cache_evictions.value(),
+        "invalidations": statement_cache_invalidations.value()
+    }
@@ -0,0 +1,128 @@
+import logging
+import threading
+import time
+from config import CACHE_CONFIG
+from db.connection import get_db_connection
+
+logger = logging.getLogger(__name__)
+
+# Commits can land after a later timestamp was already observed; re-read this window
+POLL_OVERLAP_SECONDS = 5
+
+
+def bump_version(cursor, cache_key):
+    """
+    Increment the shared version of a cache key inside the caller's transaction.
+
+    Call this as the last statement before commit to keep the row lock short.
+    """
+    cursor.execute(
+        """INSERT INTO cache_versions (cache_key, version) VALUES (%s, 1)
+           ON DUPLICATE KEY UPDATE version = version + 1""",
+        (cache_key,)
+    )
+
+
+def bump_versions(cursor, cache_keys):
+    """bump_version for many keys with one multi-row statement"""
+    if cache_keys:
+        cursor.executemany(
+            """INSERT INTO cache_versions (cache_key, version) VALUES (%s, 1)
+               ON DUPLICATE KEY UPDATE version = version + 1""",
+            [(cache_key,) for cache_key in cache_keys]
+        )
+
+
+class VersionWatcher:
+    """
+    Process-local view of the cache_versions table.
+
+    Polls for changed keys at most once per interval, so callers can check
+    versions on every request without a database round trip.
+    """
+
+    def __init__(self, poll_interval):
+        self.poll_interval = poll_interval
+        # Incremented on every poll that observed a changed key
+        self.generation = 0
+        self._versions = {}
+        # cache_key -> generation in which it last changed
+        self._changed_in = {}
+        # key namespace ("doctor" for "doctor:4") -> generation of its latest change
+        self._namespace_generation = {}
+        self._last_seen = None
+        self._last_poll = 0.0
+        self._lock = threading.Lock()
+
+    def version(self, cache_key):
+        """Return the latest known version of a key (0 if never bumped)"""
+        self._maybe_poll()
+        return self._versions.get(cache_key, 0)
+
+    def namespace_generation(self, namespace):
+        """Return the generation in which any key of a namespace last changed"""
+        self._maybe_poll()
+        return self._namespace_generation.get(namespace, 0)
+
+    def changed_since(self, generation, prefix=''):
+        """
+        Return (current generation, {cache_key: version}) for keys starting
+        with prefix that changed after the given generation.
+        """
+        self._maybe_poll()
+        current = self.generation
+        if generation >= current:
+            return current, {}
+        changed = {
+            key: self._versions[key]
+            for key, changed_in in list(self._changed_in.items())
+            if changed_in > generation and key.startswith(prefix)
+        }
+        return current, changed
+
+    def _maybe_poll(self):
+        now = time.monotonic()
+        if now - self._last_poll < self.poll_interval:
+            return
+        if not self._lock.acquire(blocking=False):
+            return  # another thread is already polling
+        try:
+            self._last_poll = now
+            self._poll()
+        finally:
+            self._lock.release()
+
+    def _poll(self):
+        query = "SELECT cache_key, version, updated_at FROM cache_versions"
+        params = ()
+        if self._last_seen is not None:
+            query += " WHERE updated_at >= %s - INTERVAL %s SECOND"
+            params = (self._last_seen, POLL_OVERLAP_SECONDS)
+        try:
+            with get_db_connection() as connection:
+                cursor = connection.cursor(prepared=True)
+                cursor.execute(query, params)
+                rows = cursor.fetchall()
+                cursor.close()
+        except Exception as e:
+            logger.error(f"Version poll failed: {e}")
+            return
+        changed = []
+        for cache_key, version, updated_at in rows:
+            if isinstance(cache_key, (bytes, bytearray)):
+                cache_key = cache_key.decode('utf-8')
+            if self._versions.get(cache_key) != version:
+                self._versions[cache_key] = version
+                changed.append(cache_key)
+            if self._last_seen is None or updated_at > self._last_seen:
+                self._last_seen = updated_at
+        if changed:
+            generation = self.generation + 1
+            for cache_key in changed:
+                self._changed_in[cache_key] = generation
+                self._namespace_generation[cache_key.split(':', 1)[0]] = generation
+            self.generation = generation
+
+
+# Shared by every in-process cache so the table is polled once per interval
+version_watcher = VersionWatcher(CACHE_CONFIG['version_poll_interval'])
@@ -0,0 +1,141 @@
+"""
+Minimal in-process metrics rendered in the Prometheus text exposition format.
+
+Metrics are module-level objects registered in REGISTRY when created; the
+/metrics endpoint renders every registered metric plus the output of any
+collectors (callables returning exposition lines, used for values that are
+read on demand such as connection pool state).
+"""
+import threading
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+INF_LABEL = 'le="+Inf"'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def format_labels(names, values, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def register_collector(self, collector):
+        with self._lock:
+            self._collectors.append(collector)
+        return collector
+
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics)
+            collectors = list(self._collectors)
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        for collector in collectors:
+            lines.extend(collector())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+
+class Counter:
+    def __init__(self, name, help_text, labels=(), registry=REGISTRY):
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+        registry.register(self)
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def value(self, *label_values):
+        with self._lock:
+            return self._values.get(label_values, 0)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for label_values, value in self._values.items():
+                lines.append(f"{self.name}{format_labels(self.labels, label_values)} {format_value(value)}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS, registry=REGISTRY):
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self._series = {}  # label values -> [per-bucket counts..., overflow, sum]
+        self._lock = threading.Lock()
+        registry.register(self)
+
+    def observe(self, value, *label_values):
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+                    break
+            else:
+                series[-2] += 1
+            series[-1] += value
+
+    def series_count(self):
+        with self._lock:
+            return len(self._series)
+
+    def has_series(self, *label_values):
+        with self._lock:
+            return label_values in self._series
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = {key: list(values) for key, values in self._series.items()}
+        for label_values, values in series.items():
+            lines.extend(render_histogram(self.name, self.labels, label_values, self.buckets,
+                                          values[:-2], values[-2], values[-1]))
+        return lines
+
+
+def render_histogram(name, label_names, label_values, buckets, bucket_counts, overflow, total):
+    """Exposition lines for one histogram series from non-cumulative bucket counts"""
+    lines = []
+    cumulative = 0
+    for bound, count in zip(buckets, bucket_counts):
+        cumulative += count
+        le = f'le="{format_value(bound)}"'
+        lines.append(f"{name}_bucket{format_labels(label_names, label_values, le)} {cumulative}")
+    cumulative += overflow
+    lines.append(f"{name}_bucket{format_labels(label_names, label_values, INF_LABEL)} {cumulative}")
+    lines.append(f"{name}_sum{format_labels(label_names, label_values)} {format_value(float(total))}")
+    lines.append(f"{name}_count{format_labels(label_names, label_values)} {cumulative}")
+    return lines
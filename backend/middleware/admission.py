@@ -0,0 +1,129 @@
+"""
+Admission control: per-route priorities, per-client rate limits and load shedding.
+
+Every /api request is put in a priority class by endpoint (booking > login >
+default > browse). Before the view runs:
+
+- the client's token bucket for that class must have a token, otherwise the
+  request is answered 429 with the seconds until the next token;
+- the connection pool load ((checked out + waiting) / size) must be below the
+  class's shed threshold, otherwise the request is answered 503 at once
+  instead of queueing for a connection it would likely time out waiting for.
+
+Lower priorities have lower thresholds, so when the database saturates the
+directory stops first and booking keeps its connections.
+"""
+import math
+import threading
+import time
+from collections import OrderedDict
+from flask import jsonify, request, session
+from config import ADMISSION_CONFIG
+from db.connection import connection_pool
+from metrics import Counter
+
+BOOKING = 'booking'
+LOGIN = 'login'
+DEFAULT = 'default'
+BROWSE = 'browse'
+
+# endpoint -> priority; unlisted /api endpoints are DEFAULT
+ROUTE_PRIORITIES = {
+    'appointments.book_appointment': BOOKING,
+    'appointments.update_appointment': BOOKING,
+    'appointments.delete_appointment': BOOKING,
+    'appointments.bulk_cancel_appointments': BOOKING,
+    'auth.login': LOGIN,
+    'auth.register': LOGIN,
+    'auth.logout': LOGIN,
+    'doctors.get_doctors': BROWSE,
+    'doctors.get_doctor_details': BROWSE,
+    'doctors.get_doctor_timeslots': BROWSE,
+    'doctors.stream_doctor_timeslots': BROWSE,
+    'doctors.get_earliest_slots': BROWSE,
+}
+
+rejected_requests = Counter('http_requests_rejected_total', 'Requests refused by admission control',
+                            labels=('priority', 'reason'))
+
+
+def route_priority(endpoint):
+    return ROUTE_PRIORITIES.get(endpoint, DEFAULT)
+
+
+class TokenBucket:
+    __slots__ = ('rate', 'burst', 'tokens', 'updated')
+
+    def __init__(self, rate, burst, now):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = now
+
+    def take(self, now):
+        """Consume a token; returns 0 on success, else seconds until one is available"""
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0
+        return (1 - self.tokens) / self.rate
+
+
+class RateLimiter:
+    """Token buckets per (client, priority), the least recently seen clients evicted first"""
+
+    def __init__(self, rates, scale, max_clients):
+        self.rates = {priority: (rate * scale, burst) for priority, (rate, burst) in rates.items()}
+        self.max_clients = max_clients
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def check(self, client, priority):
+        """Returns 0 if the request may proceed, else the Retry-After delay in seconds"""
+        now = time.monotonic()
+        key = (client, priority)
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = TokenBucket(*self.rates[priority], now)
+                self._buckets[key] = bucket
+                if len(self._buckets) > self.max_clients:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(key)
+            return bucket.take(now)
+
+
+def _client_key():
+    user_id = session.get('user_id')
+    return f"user:{user_id}" if user_id is not None else f"ip:{request.remote_addr}"
+
+
+def init_admission(app, pool=connection_pool):
+    """Register the admission check for /api requests (no-op when disabled)"""
+    if not ADMISSION_CONFIG['enabled']:
+        return
+    limiter = RateLimiter(ADMISSION_CONFIG['rates'], ADMISSION_CONFIG['rate_scale'],
+                          ADMISSION_CONFIG['max_clients'])
+    shed_load = ADMISSION_CONFIG['shed_load']
+
+    @app.before_request
+    def admit():
+        if request.method == 'OPTIONS' or not request.path.startswith('/api/'):
+            return None
+        priority = route_priority(request.endpoint)
+
+        if pool.load() >= shed_load[priority]:
+            rejected_requests.inc(priority, 'overload')
+            response = jsonify({"error": "Server busy, please retry"})
+            response.headers['Retry-After'] = '1'
+            return response, 503
+
+        retry_after = limiter.check(_client_key(), priority)
+        if retry_after:
+            rejected_requests.inc(priority, 'rate_limit')
+            response = jsonify({"error": "Too many requests, please retry later"})
+            response.headers['Retry-After'] = str(math.ceil(retry_after))
+            return response, 429
+        return None
@@ -0,0 +1,66 @@
+"""
+Per-request replica routing policy.
+
+Requests that may modify data (anything but GET/HEAD/OPTIONS) read from the
+primary, so they see their own writes and lock the rows they are about to
+change. A successful one also pins the client to the primary for
+sticky_seconds, long enough for the replicas to catch up, so the booking a
+user just made shows up on their next page load.
+
+The pin is a short-lived signed cookie of its own rather than a session key:
+modifying the session on every write would make server-side session backends
+rewrite (and rotate) the session each time.
+"""
+import math
+from flask import g, request
+from itsdangerous import BadSignature, TimestampSigner
+from config import REPLICA_CONFIG
+from db.connection import router
+from db.routing import reset_primary_reads, set_primary_reads
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+PRIMARY_COOKIE = 'primary_reads'
+
+
+def init_read_routing(app):
+    """Register the routing hooks (no-op without replicas)"""
+    if not router.replicas:
+        return
+    sticky_seconds = REPLICA_CONFIG['sticky_seconds']
+
+    def signer():
+        return TimestampSigner(app.secret_key, salt='primary-reads')
+
+    def recently_wrote():
+        cookie = request.cookies.get(PRIMARY_COOKIE)
+        if not cookie:
+            return False
+        try:
+            signer().unsign(cookie, max_age=sticky_seconds)
+            return True
+        except BadSignature:  # includes an expired timestamp
+            return False
+
+    @app.before_request
+    def route_reads():
+        primary = request.method not in SAFE_METHODS or recently_wrote()
+        g.primary_reads_token = set_primary_reads(primary)
+
+    @app.after_request
+    def stick_to_primary(response):
+        if request.method not in SAFE_METHODS and response.status_code < 400:
+            response.set_cookie(
+                PRIMARY_COOKIE,
+                signer().sign('1').decode('ascii'),
+                max_age=math.ceil(sticky_seconds),
+                httponly=True,
+                secure=app.config['SESSION_COOKIE_SECURE'],
+                samesite=app.config['SESSION_COOKIE_SAMESITE']
+            )
+        return response
+
+    @app.teardown_request
+    def reset_routing(error=None):
+        token = g.pop('primary_reads_token', None)
+        if token is not None:
+            reset_primary_reads(token)
@@ -0,0 +1,82 @@
+"""
+Per-route latency, per-request DB time and query counts, served at /metrics.
+
+Routes are labelled by their URL rule (e.g. /api/doctors/<int:doctor_id>), not
+the concrete path, so the number of series stays bounded.
+"""
+import time
+from flask import Response, g, request
+from db.connection import router
+from db.instrumentation import finish_request_stats, start_request_stats
+from metrics import REGISTRY, Histogram, format_labels
+
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+request_duration = Histogram('http_request_duration_seconds', 'Wall time per request',
+                             labels=('method', 'route', 'status'))
+request_db_time = Histogram('http_request_db_seconds', 'Time spent in SQL per request',
+                            labels=('route',))
+request_queries = Histogram('http_request_db_queries', 'SQL statements per request',
+                            labels=('route',), buckets=QUERY_COUNT_BUCKETS)
+
+
+def _route_label():
+    return request.url_rule.rule if request.url_rule is not None else 'unmatched'
+
+
+@REGISTRY.register_collector
+def pool_metrics():
+    """Connection pool state (primary and replicas), read when /metrics is scraped"""
+    all_stats = [pool.stats() for pool in router.pools]
+    families = {
+        'connections': ["# HELP db_pool_connections Connections by state",
+                        "# TYPE db_pool_connections gauge"],
+        'size': ["# HELP db_pool_size Maximum connections per pool",
+                 "# TYPE db_pool_size gauge"],
+        'waiting': ["# HELP db_pool_waiting Requests waiting for a connection",
+                    "# TYPE db_pool_waiting gauge"],
+        'timeouts': ["# HELP db_pool_timeouts_total Checkouts that gave up waiting",
+                     "# TYPE db_pool_timeouts_total counter"],
+        'wait': ["# HELP db_pool_wait_seconds Time spent waiting for a connection",
+                 "# TYPE db_pool_wait_seconds histogram"],
+    }
+    for stats in all_stats:
+        pool = format_labels(('pool',), (stats['name'],))
+        for state in ('checked_out', 'idle'):
+            families['connections'].append(
+                f"db_pool_connections{format_labels(('pool', 'state'), (stats['name'], state))} {stats[state]}")
+        families['size'].append(f"db_pool_size{pool} {stats['size']}")
+        families['waiting'].append(f"db_pool_waiting{pool} {stats['waiting']}")
+        families['timeouts'].append(f"db_pool_timeouts_total{pool} {stats['timeouts']}")
+        for bound, count in stats['wait_histogram'].items():
+            le = format_labels(('pool', 'le'), (stats['name'], bound))
+            families['wait'].append(f"db_pool_wait_seconds_bucket{le} {count}")
+        families['wait'].append(f"db_pool_wait_seconds_sum{pool} {stats['wait_seconds_total']}")
+        families['wait'].append(f"db_pool_wait_seconds_count{pool} {stats['checkouts']}")
+    return [line for lines in families.values() for line in lines]
+
+
+def init_request_metrics(app):
+    """Register the timing hooks and the /metrics endpoint on the app"""
+
+    @app.before_request
+    def start_timer():
+        g.request_started = time.perf_counter()
+        start_request_stats()
+
+    @app.after_request
+    def record_request(response):
+        started = g.pop('request_started', None)
+        stats = finish_request_stats()
+        if started is None:
+            return response
+        route = _route_label()
+        request_duration.observe(time.perf_counter() - started, request.method, route, str(response.status_code))
+        if stats is not None:
+            request_db_time.observe(stats.db_seconds, route)
+            request_queries.observe(stats.queries, route)
+        return response
+
+    @app.route('/metrics')
+    def metrics():
+        return Response(REGISTRY.render(), mimetype='text/plain; version=0.0.4')
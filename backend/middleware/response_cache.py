@@ -0,0 +1,121 @@
+"""
+Read-through cache of serialized JSON responses with strong ETags.
+
+A cached view stores the exact response bytes together with a snapshot of the
+cache_versions it depends on. An entry is served while it is younger than the
+TTL and none of its dependencies moved; requests carrying a matching
+If-None-Match get a 304 without running the view or touching MySQL.
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from flask import Response, g, request
+from db.routing import primary_reads
+
+
+def skip_caching():
+    """Mark the current response as not cacheable (e.g. built from a failed query)"""
+    g.response_cache_skip = True
+
+
+class CacheEntry:
+    __slots__ = ('body', 'etag', 'expires_at', 'dependencies')
+
+    def __init__(self, body, etag, expires_at, dependencies):
+        self.body = body
+        self.etag = etag
+        self.expires_at = expires_at
+        self.dependencies = dependencies
+
+
+class ResponseCache:
+    """Bounded LRU of pre-serialized 200 responses keyed by path and query string"""
+
+    def __init__(self, watcher, ttl, max_entries):
+        self.watcher = watcher
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def cached(self, keys=None, namespaces=()):
+        """
+        Decorator caching a view's 200 responses.
+
+        Args:
+            keys: Callable receiving the view kwargs and returning the
+                  cache_versions keys the response depends on
+            namespaces: cache_versions namespaces (e.g. "doctor") where a change
+                        to any key invalidates the response
+        """
+        def decorator(view):
+            @wraps(view)
+            def wrapper(*args, **kwargs):
+                cache_key = request.full_path
+                dependencies = self._snapshot(keys(**kwargs) if keys else (), namespaces)
+
+                entry = self._get(cache_key, dependencies)
+                if entry is None:
+                    self.misses += 1
+                    # An entry stored under the current versions must not capture replica lag
+                    with primary_reads():
+                        response = view(*args, **kwargs)
+                    status = response[1] if isinstance(response, tuple) else 200
+                    if status != 200 or g.pop('response_cache_skip', False):
+                        return response
+                    body = (response[0] if isinstance(response, tuple) else response).get_data()
+                    entry = self._put(cache_key, body, dependencies)
+                else:
+                    self.hits += 1
+
+                if entry.etag in request.if_none_match:
+                    self.not_modified += 1
+                    return self._respond(entry, 304)
+                return self._respond(entry, 200)
+            return wrapper
+        return decorator
+
+    def invalidate(self):
+        """Drop every entry (used after writes made by this process)"""
+        with self._lock:
+            self._entries.clear()
+
+    def _snapshot(self, keys, namespaces):
+        return (tuple(self.watcher.version(key) for key in keys) +
+                tuple(self.watcher.namespace_generation(namespace) for namespace in namespaces))
+
+    def _get(self, cache_key, dependencies):
+        with self._lock:
+            entry = self._entries.get(cache_key)
+            if entry is None:
+                return None
+            if entry.expires_at < time.monotonic() or entry.dependencies != dependencies:
+                del self._entries[cache_key]
+                return None
+            self._entries.move_to_end(cache_key)
+            return entry
+
+    def _put(self, cache_key, body, dependencies):
+        etag = hashlib.blake2b(body, digest_size=16).hexdigest()
+        entry = CacheEntry(body, etag, time.monotonic() + self.ttl, dependencies)
+        with self._lock:
+            self._entries[cache_key] = entry
+            self._entries.move_to_end(cache_key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    @staticmethod
+    def _respond(entry, status):
+        response = Response(entry.body if status == 200 else b'', status=status,
+                            mimetype='application/json')
+        response.set_etag(entry.etag)
+        # Let browsers keep the body but always revalidate with If-None-Match
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
+
@@ -0,0 +1,280 @@
+"""
+Pluggable login session backends, selected with SESSION_BACKEND.
+
+- "signed": stateless. The session dict is serialized into an HMAC-signed,
+  timestamped token (Flask's cookie format) and sent back as a cookie or as an
+  "Authorization: Bearer <token>" header. Nothing is stored server side, so any
+  host can serve any request; logout only discards the client's copy.
+- "sql": the cookie carries a signed random session id and the data lives in
+  the sessions table, shared by every host. Sessions are cached in an
+  in-process LRU for a few seconds, and last-seen updates (which extend the
+  expiry) are buffered and written in batches by a background thread instead
+  of on every request.
+- "filesystem": the previous Flask-Session pickle files, kept for local setups.
+"""
+import atexit
+import logging
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from flask import session
+from flask.json.tag import TaggedJSONSerializer
+from flask.sessions import SecureCookieSession, SecureCookieSessionInterface, SessionInterface
+from itsdangerous import BadSignature, Signer
+from mysql.connector import Error
+from config import SESSION_CONFIG
+from db.connection import get_db_connection
+from db.pool import PoolTimeout
+
+logger = logging.getLogger(__name__)
+
+serializer = TaggedJSONSerializer()
+
+
+class SignedTokenSessionInterface(SecureCookieSessionInterface):
+    """Flask's signed cookie sessions, also accepting the token as a bearer header"""
+
+    def open_session(self, app, request):
+        signer = self.get_signing_serializer(app)
+        if signer is None:
+            return None
+        token = request.cookies.get(self.get_cookie_name(app))
+        if not token:
+            header = request.headers.get('Authorization', '')
+            if header.startswith('Bearer '):
+                token = header[len('Bearer '):].strip()
+        if not token:
+            return self.session_class()
+        try:
+            data = signer.loads(token, max_age=int(app.permanent_session_lifetime.total_seconds()))
+            return self.session_class(data)
+        except BadSignature:
+            return self.session_class()
+
+
+class SqlSession(SecureCookieSession):
+    def __init__(self, initial=None, sid=None, new=False, unavailable=False):
+        super().__init__(initial)
+        self.sid = sid
+        self.new = new
+        # Identity the session was loaded with; the sid is rotated when it changes
+        self.loaded_user_id = self.get('user_id')
+        # The store could not be reached; the request is refused and the cookie kept
+        self.unavailable = unavailable
+
+
+class SqlSessionStore:
+    """sessions table access with a local LRU and write-behind of last-seen times"""
+
+    def __init__(self, lifetime, cache_size, cache_ttl, flush_interval):
+        self.lifetime = lifetime
+        self.cache_size = cache_size
+        self.cache_ttl = cache_ttl
+        self.flush_interval = flush_interval
+        self._cache = OrderedDict()  # sid -> (data, expires_at, cached_at)
+        self._pending = {}  # sid -> last_seen
+        self._lock = threading.Lock()
+        self._flusher = None
+
+    def get(self, sid):
+        now = datetime.now()
+        with self._lock:
+            entry = self._cache.get(sid)
+            if entry is not None:
+                data, expires_at, cached_at = entry
+                if expires_at > now and time.monotonic() - cached_at < self.cache_ttl:
+                    self._cache.move_to_end(sid)
+                    return dict(data)
+                del self._cache[sid]
+
+        try:
+            with get_db_connection() as connection:
+                cursor = connection.cursor()
+                cursor.execute(
+                    "SELECT data, expires_at FROM sessions WHERE session_id = %s AND expires_at > %s",
+                    (sid, now)
+                )
+                row = cursor.fetchone()
+                cursor.close()
+        except PoolTimeout:
+            raise
+        except Error as e:
+            logger.error(f"Session lookup failed: {e}")
+            return None
+        if row is None:
+            return None
+        data = serializer.loads(row[0])
+        self._remember(sid, data, row[1])
+        return dict(data)
+
+    def save(self, sid, data):
+        now = datetime.now()
+        expires_at = now + self.lifetime
+        with get_db_connection() as connection:
+            cursor = connection.cursor()
+            cursor.execute(
+                """INSERT INTO sessions (session_id, user_id, data, last_seen, expires_at)
+                   VALUES (%s, %s, %s, %s, %s)
+                   ON DUPLICATE KEY UPDATE user_id = VALUES(user_id), data = VALUES(data),
+                       last_seen = VALUES(last_seen), expires_at = VALUES(expires_at)""",
+                (sid, data.get('user_id'), serializer.dumps(data), now, expires_at)
+            )
+            connection.commit()
+            cursor.close()
+        self._remember(sid, data, expires_at)
+
+    def delete(self, sid):
+        with self._lock:
+            self._cache.pop(sid, None)
+            self._pending.pop(sid, None)
+        with get_db_connection() as connection:
+            cursor = connection.cursor()
+            cursor.execute("DELETE FROM sessions WHERE session_id = %s", (sid,))
+            connection.commit()
+            cursor.close()
+
+    def touch(self, sid):
+        """Record activity; the expiry is extended on the next background flush"""
+        now = datetime.now()
+        with self._lock:
+            self._pending[sid] = now
+            entry = self._cache.get(sid)
+            if entry is not None:
+                self._cache[sid] = (entry[0], now + self.lifetime, entry[2])
+            if self._flusher is None:
+                self._flusher = threading.Thread(target=self._flush_loop, name='session-flusher', daemon=True)
+                self._flusher.start()
+
+    def flush(self):
+        """Write buffered last-seen times in one transaction"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return
+        try:
+            with get_db_connection() as connection:
+                cursor = connection.cursor()
+                cursor.executemany(
+                    "UPDATE sessions SET last_seen = %s, expires_at = %s WHERE session_id = %s",
+                    [(seen, seen + self.lifetime, sid) for sid, seen in pending.items()]
+                )
+                cursor.execute("DELETE FROM sessions WHERE expires_at < %s", (datetime.now(),))
+                connection.commit()
+                cursor.close()
+        except Error as e:
+            logger.error(f"Session last-seen flush failed: {e}")
+
+    def _flush_loop(self):
+        while True:
+            time.sleep(self.flush_interval)
+            self.flush()
+
+    def _remember(self, sid, data, expires_at):
+        with self._lock:
+            self._cache[sid] = (dict(data), expires_at, time.monotonic())
+            self._cache.move_to_end(sid)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+
+class SqlSessionInterface(SessionInterface):
+    salt = 'sql-session'
+
+    def __init__(self, store):
+        self.store = store
+
+    def _signer(self, app):
+        return Signer(app.secret_key, salt=self.salt)
+
+    def open_session(self, app, request):
+        cookie = request.cookies.get(self.get_cookie_name(app))
+        if cookie:
+            try:
+                sid = self._signer(app).unsign(cookie).decode('ascii')
+            except BadSignature:
+                sid = None
+            try:
+                data = self.store.get(sid) if sid else None
+            except PoolTimeout:
+                # Raised again from before_request, where the app answers it with 503
+                return SqlSession(sid=sid, unavailable=True)
+            if data is not None:
+                return SqlSession(data, sid=sid)
+        return SqlSession(sid=secrets.token_urlsafe(32), new=True)
+
+    def save_session(self, app, session, response):
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+
+        if session.unavailable:
+            return
+        # The view's own work is already committed, so a failing session write
+        # is logged rather than turned into an error response
+        if not session:
+            if session.modified and not session.new:
+                try:
+                    self.store.delete(session.sid)
+                except (PoolTimeout, Error) as e:
+                    logger.error(f"Session delete failed, row left to expire: {e}")
+                response.delete_cookie(name, domain=domain, path=path)
+            return
+
+        if session.modified or session.new:
+            old_sid = None
+            if not session.new and session.get('user_id') != session.loaded_user_id:
+                # New session id when the identity changes (login) against fixation
+                old_sid, session.sid = session.sid, secrets.token_urlsafe(32)
+            try:
+                self.store.save(session.sid, dict(session))
+            except (PoolTimeout, Error) as e:
+                logger.error(f"Session save failed, keeping the previous cookie: {e}")
+                return
+            if old_sid is not None:
+                try:
+                    self.store.delete(old_sid)
+                except (PoolTimeout, Error) as e:
+                    logger.error(f"Old session delete failed, row left to expire: {e}")
+            response.set_cookie(
+                name,
+                self._signer(app).sign(session.sid).decode('ascii'),
+                expires=self.get_expiration_time(app, session),
+                httponly=self.get_cookie_httponly(app),
+                domain=domain,
+                path=path,
+                secure=self.get_cookie_secure(app),
+                samesite=self.get_cookie_samesite(app)
+            )
+        else:
+            self.store.touch(session.sid)
+
+
+def require_session_store():
+    """Refuse the request if its session could not be loaded, rather than treat the user as logged out"""
+    if getattr(session, 'unavailable', False):
+        raise PoolTimeout("Session store unavailable: connection pool exhausted")
+
+
+def init_sessions(app):
+    """Install the session backend configured by SESSION_BACKEND"""
+    backend = SESSION_CONFIG['backend']
+    if backend == 'signed':
+        app.session_interface = SignedTokenSessionInterface()
+    elif backend == 'sql':
+        store = SqlSessionStore(
+            lifetime=app.permanent_session_lifetime,
+            cache_size=SESSION_CONFIG['cache_size'],
+            cache_ttl=SESSION_CONFIG['cache_ttl'],
+            flush_interval=SESSION_CONFIG['flush_interval']
+        )
+        atexit.register(store.flush)
+        app.session_interface = SqlSessionInterface(store)
+        app.before_request(require_session_store)
+    elif backend == 'filesystem':
+        from flask_session import Session
+        app.config['SESSION_TYPE'] = 'filesystem'
+        Session(app)
+    else:
+        raise ValueError(f"Unknown SESSION_BACKEND: {backend}")
@@ -0,0 +1,68 @@
+from flask import Blueprint, request, jsonify, session
+from functools import wraps
+from config import SCHEDULE_CONFIG
+from db.pool import PoolTimeout
+from services.reports import REPORTS, ReportParamError, run_report
+from services.schedule import ScheduleError, generate_slots, prune_expired_slots
+
+admin_bp = Blueprint('admin', __name__)
+
+# Admin-only decorator
+def require_admin(f):
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if 'user_id' not in session:
+            return jsonify({"error": "Authentication required"}), 401
+        if session.get('user_type') != 'admin':
+            return jsonify({"error": "Admin access required"}), 403
+        return f(*args, **kwargs)
+    return decorated_function
+
+@admin_bp.route('/admin/reports', methods=['GET'])
+@require_admin
+def list_reports():
+    """List the available analytics reports"""
+    reports = [{"name": name, "source": f"sql/{source}.sql"} for name, (source, _) in REPORTS.items()]
+    return jsonify({"reports": reports}), 200
+
+@admin_bp.route('/admin/reports/<name>', methods=['GET'])
+@require_admin
+def get_report(name):
+    """Run one analytics report"""
+    if name not in REPORTS:
+        return jsonify({"error": "Unknown report"}), 404
+    try:
+        rows = run_report(name, request.args)
+    except ReportParamError as e:
+        return jsonify({"error": str(e)}), 400
+
+    if rows is None:
+        return jsonify({"error": "Server error while running report"}), 500
+    return jsonify({"report": name, "rows": rows}), 200
+
+@admin_bp.route('/admin/schedule/generate', methods=['POST'])
+@require_admin
+def generate_schedule():
+    """Create time slots for the coming weeks from doctors' available days"""
+    data = request.get_json(silent=True) or {}
+    try:
+        weeks = int(data.get('weeks', SCHEDULE_CONFIG['weeks']))
+        doctor_ids = [int(doctor_id) for doctor_id in data.get('doctor_ids') or []]
+        result = generate_slots(
+            weeks,
+            doctor_ids=doctor_ids or None,
+            day_start=data.get('day_start'),
+            day_end=data.get('day_end'),
+            slot_minutes=data.get('slot_minutes')
+        )
+        if data.get('prune', True):
+            result['pruned'] = prune_expired_slots()
+    except (ScheduleError, TypeError, ValueError) as e:
+        return jsonify({"error": str(e)}), 400
+    except PoolTimeout:
+        raise  # answered with 503 by the app
+    except Exception as e:
+        print(f"❌ Error generating slots: {e}")  # For backend logs
+        return jsonify({"error": "Server error while generating slots"}), 500
+
+    return jsonify(result), 200
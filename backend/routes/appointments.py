@@ -1,6 +1,13 @@
 from flask import Blueprint, request, jsonify, session
 from datetime import datetime
-from db.connection import execute_query, get_db_connection
+from db.history import history_queries
+from db.loaders import attach_medicines, load_prescriptions
+from routes.listing import list_response
+from db.pool import PoolTimeout
+from services.booking import (
+    MAX_BULK_CANCEL, book_slot, cancel_appointments, cancel_doctor_day, reschedule_appointment,
+    AppointmentNotFoundError, AppointmentStateError, InvalidSlotError, SlotUnavailableError
+)
 
 appointments_bp = Blueprint('appointments', __name__)
 
@@ -27,99 +34,189 @@ def book_appointment():
         if field not in data:
             return jsonify({"error": f"Missing field: {field}"}), 400
     
-    # Get slot details
-    slot = execute_query(
-        """SELECT slot_id, slot_date, start_time, is_available
-           FROM time_slots
-           WHERE slot_id = %s AND doctor_id = %s""",
-        (data['slot_id'], data['doctor_id']),
-        fetch_one=True
-    )
+    try:
+        appointment_id = book_slot(
+            session['user_id'], data['doctor_id'], data['slot_id'], data['reason_for_visit']
+        )
+    except InvalidSlotError:
+        return jsonify({"error": "Invalid slot"}), 400
+    except SlotUnavailableError:
+        return jsonify({"error": "Slot not available"}), 409
+    except PoolTimeout:
+        raise  # answered with 503 by the app
+    except Exception as e:
+        print(f"❌ Error booking appointment: {e}")  # For backend logs
+        return jsonify({"error": "Server error while booking appointment"}), 500
     
-    if not slot:
+    return jsonify({
+        "message": "Appointment booked successfully",
+        "appointment_id": appointment_id
+    }), 201
+
+def appointment_owner():
+    """(patient_id, doctor_id) restriction for changing appointments; admins are unrestricted"""
+    if session['user_type'] == 'patient':
+        return session['user_id'], None
+    if session['user_type'] == 'doctor':
+        return None, session['user_id']
+    return None, None
+
+@appointments_bp.route('/appointments/<int:appointment_id>', methods=['PUT'])
+@require_auth
+def update_appointment(appointment_id):
+    """Move an appointment to another open slot of the same doctor"""
+    data = request.get_json(silent=True) or {}
+    if 'new_slot_id' not in data:
+        return jsonify({"error": "Missing field: new_slot_id"}), 400
+    
+    patient_id, doctor_id = appointment_owner()
+    try:
+        appointment = reschedule_appointment(appointment_id, int(data['new_slot_id']),
+                                             patient_id=patient_id, doctor_id=doctor_id)
+    except (TypeError, ValueError, InvalidSlotError):
         return jsonify({"error": "Invalid slot"}), 400
+    except AppointmentNotFoundError:
+        return jsonify({"error": "Appointment not found"}), 404
+    except (AppointmentStateError, SlotUnavailableError) as e:
+        return jsonify({"error": str(e)}), 409
+    except PoolTimeout:
+        raise  # answered with 503 by the app
+    except Exception as e:
+        print(f"❌ Error rescheduling appointment: {e}")  # For backend logs
+        return jsonify({"error": "Server error while rescheduling appointment"}), 500
     
-    if not slot['is_available']:
-        return jsonify({"error": "Slot not available"}), 400
+    return jsonify({"message": "Appointment rescheduled successfully", "appointment": appointment}), 200
+
+@appointments_bp.route('/appointments/<int:appointment_id>', methods=['DELETE'])
+@require_auth
+def delete_appointment(appointment_id):
+    """Cancel one appointment and release its slot"""
+    patient_id, doctor_id = appointment_owner()
+    try:
+        result = cancel_appointments([appointment_id], patient_id=patient_id, doctor_id=doctor_id)[0]
+    except PoolTimeout:
+        raise  # answered with 503 by the app
+    except Exception as e:
+        print(f"❌ Error cancelling appointment: {e}")  # For backend logs
+        return jsonify({"error": "Server error while cancelling appointment"}), 500
+    
+    if result.get('error') == "Appointment not found":
+        return jsonify({"error": result['error']}), 404
+    if 'error' in result:
+        return jsonify({"error": result['error']}), 409
+    return jsonify({"message": "Appointment cancelled successfully"}), 200
+
+@appointments_bp.route('/appointments/cancel', methods=['POST'])
+@require_auth
+def bulk_cancel_appointments():
+    """Cancel a list of appointments, or all of a doctor's appointments on one day, in one transaction"""
+    if session['user_type'] not in ('doctor', 'admin'):
+        return jsonify({"error": "Only doctors and admins can cancel in bulk"}), 403
+    data = request.get_json(silent=True) or {}
+    release_slots = data.get('release_slots', True)
+    if not isinstance(release_slots, bool):
+        return jsonify({"error": "release_slots must be true or false"}), 400
+    patient_id, doctor_id = appointment_owner()
     
-    connection = get_db_connection()
     try:
-        cursor = connection.cursor()
-        
-        # Check if prescription already exists
-        cursor.execute(
-            "SELECT prescription_id FROM prescriptions WHERE appointment_id = %s",
-            (data['appointment_id'],)
-        )
-        if cursor.fetchone():
-            return jsonify({"error": "Prescription already exists for this appointment"}), 400
-        
-        # Create prescription
-        cursor.execute(
-            """INSERT INTO prescriptions (appointment_id, diagnosis, instructions, follow_up_date)
-               VALUES (%s, %s, %s, %s)""",
-            (data['appointment_id'], data['diagnosis'], 
-             data.get('instructions'), data.get('follow_up_date'))
-        )
-        prescription_id = cursor.lastrowid
-        
-        # Add medicines
-        for medicine in data['medicines']:
-            cursor.execute(
-                """INSERT INTO prescription_medicines 
-                   (prescription_id, medicine_id, dosage, frequency, duration, quantity, instructions)
-                   VALUES (%s, %s, %s, %s, %s, %s, %s)""",
-                (prescription_id, medicine['medicine_id'], medicine['dosage'],
-                 medicine['frequency'], medicine['duration'], medicine['quantity'],
-                 medicine.get('instructions'))
-            )
-        
-        connection.commit()
-        
-        return jsonify({
-            "message": "Prescription uploaded successfully",
-            "prescription_id": prescription_id
-        }), 201
-        
+        if 'date' in data:
+            day = datetime.strptime(data['date'], '%Y-%m-%d').date()
+            if doctor_id is None:
+                doctor_id = int(data['doctor_id'])
+            results = cancel_doctor_day(doctor_id, day, release_slots=release_slots)
+        else:
+            appointment_ids = [int(appointment_id) for appointment_id in data.get('appointment_ids') or []]
+            if not appointment_ids or len(appointment_ids) > MAX_BULK_CANCEL:
+                return jsonify({"error": f"appointment_ids must list 1 to {MAX_BULK_CANCEL} ids"}), 400
+            results = cancel_appointments(appointment_ids, patient_id=patient_id, doctor_id=doctor_id,
+                                          release_slots=release_slots)
+    except (KeyError, TypeError, ValueError):
+        return jsonify({"error": "Pass appointment_ids, or date (YYYY-MM-DD) and, for admins, doctor_id"}), 400
+    except PoolTimeout:
+        raise  # answered with 503 by the app
     except Exception as e:
-        connection.rollback()
-        return jsonify({"error": f"Failed to upload prescription: {str(e)}"}), 500
-    finally:
-        cursor.close()
-        connection.close()
+        print(f"❌ Error cancelling appointments: {e}")  # For backend logs
+        return jsonify({"error": "Server error while cancelling appointments"}), 500
+    
+    cancelled = sum(1 for result in results if 'error' not in result)
+    return jsonify({"cancelled": cancelled, "results": results}), 200
 
-@appointments_bp.route('/prescriptions/<int:prescription_id>', methods=['GET'])
+# Keyset ordering shared by the appointment list endpoints
+APPOINTMENT_ORDER = [('a.appointment_date', 'appointment_date'), ('a.appointment_id', 'appointment_id')]
+
+def appointment_owner_filter():
+    """WHERE clause and params restricting appointments to the logged-in user"""
+    if session['user_type'] == 'doctor':
+        return "a.doctor_id = %s", [session['user_id']]
+    return "a.patient_id = %s", [session['user_id']]
+
+@appointments_bp.route('/appointments', methods=['GET'])
 @require_auth
-def get_prescription(prescription_id):
-    """Get prescription details"""
-    # Get prescription with verification
-    prescription = execute_query(
-        """SELECT 
-            p.prescription_id,
-            p.diagnosis,
-            p.instructions,
-            p.follow_up_date,
-            p.created_at,
+def get_appointments():
+    """List the user's appointments, one keyset page at a time"""
+    owner_clause, params = appointment_owner_filter()
+    query = f"""SELECT 
+            a.appointment_id,
             a.appointment_date,
-            a.patient_id,
-            a.doctor_id,
+            CAST(a.appointment_time AS CHAR) AS appointment_time,
+            a.status,
+            a.reason_for_visit,
             CONCAT(doc_user.first_name, ' ', doc_user.last_name) AS doctor_name,
-            doc.qualification,
-            dept.department_name,
             CONCAT(pat_user.first_name, ' ', pat_user.last_name) AS patient_name,
-            pat.date_of_birth,
-            pat.gender
-        FROM prescriptions p
-        INNER JOIN appointments a ON p.appointment_id = a.appointment_id
+            dept.department_name,
+            doc.consultation_fee,
+            p.prescription_id
+        FROM {{appointments}} a
+        INNER JOIN doctors doc ON a.doctor_id = doc.doctor_id
+        INNER JOIN users doc_user ON doc.doctor_id = doc_user.user_id
+        INNER JOIN departments dept ON doc.department_id = dept.department_id
+        INNER JOIN users pat_user ON a.patient_id = pat_user.user_id
+        LEFT JOIN prescriptions p ON a.appointment_id = p.appointment_id
+        WHERE {owner_clause}"""
+    
+    status = request.args.get('status')
+    if status:
+        query += " AND a.status = %s"
+        params.append(status)
+    
+    # Upcoming appointments read soonest first, everything else newest first.
+    # Scheduled appointments are never archived, so they only need the hot table.
+    return list_response('appointments', history_queries(query, include_archive=status != 'scheduled'),
+                         params, APPOINTMENT_ORDER, descending=status != 'scheduled')
+
+@appointments_bp.route('/appointments/history', methods=['GET'])
+@require_auth
+def get_appointment_history():
+    """List past appointments with their prescriptions, newest first"""
+    owner_clause, params = appointment_owner_filter()
+    query = f"""SELECT 
+            a.appointment_id,
+            a.appointment_date,
+            CAST(a.appointment_time AS CHAR) AS appointment_time,
+            a.status,
+            a.reason_for_visit,
+            CONCAT(doc_user.first_name, ' ', doc_user.last_name) AS doctor_name,
+            dept.department_name,
+            p.prescription_id,
+            p.diagnosis,
+            p.created_at AS prescription_date
+        FROM {{appointments}} a
         INNER JOIN doctors doc ON a.doctor_id = doc.doctor_id
         INNER JOIN users doc_user ON doc.doctor_id = doc_user.user_id
         INNER JOIN departments dept ON doc.department_id = dept.department_id
-        INNER JOIN patients pat ON a.patient_id = pat.patient_id
-        INNER JOIN users pat_user ON pat.patient_id = pat_user.user_id
-        WHERE p.prescription_id = %s""",
-        (prescription_id,),
-        fetch_one=True
-    )
+        LEFT JOIN prescriptions p ON a.appointment_id = p.appointment_id
+        WHERE {owner_clause}
+        AND (a.status IN ('completed', 'cancelled', 'no-show') OR a.appointment_date < CURDATE())"""
+    
+    return list_response('history', history_queries(query), params, APPOINTMENT_ORDER, descending=True)
+
+@appointments_bp.route('/prescriptions/<int:prescription_id>', methods=['GET'])
+@require_auth
+def get_prescription(prescription_id):
+    """Get prescription details"""
+    # Get prescription with verification
+    prescriptions = load_prescriptions([prescription_id])
+    prescription = prescriptions[0] if prescriptions else None
     
     if not prescription:
         return jsonify({"error": "Prescription not found"}), 404
@@ -131,23 +228,6 @@ def get_prescription(prescription_id):
         return jsonify({"error": "Access denied"}), 403
     
     # Get medicines
-    medicines = execute_query(
-        """SELECT 
-            m.medicine_name,
-            m.generic_name,
-            m.medicine_type,
-            pm.dosage,
-            pm.frequency,
-            pm.duration,
-            pm.quantity,
-            pm.instructions
-        FROM prescription_medicines pm
-        INNER JOIN medicines m ON pm.medicine_id = m.medicine_id
-        WHERE pm.prescription_id = %s""",
-        (prescription_id,),
-        fetch_all=True
-    )
-    
-    prescription['medicines'] = medicines or []
+    attach_medicines([prescription])
     
     return jsonify({"prescription": prescription}), 200
\ No newline at end of file
@@ -1,6 +1,6 @@
 from flask import Blueprint, request, jsonify, session
-import bcrypt
-from db.connection import execute_query
+from db.connection import LAST_ID, execute_query, execute_transaction
+from services.passwords import password_hasher
 
 auth_bp = Blueprint('auth', __name__)
 
@@ -16,10 +16,7 @@ def register():
         if field not in data:
             return jsonify({"error": f"Missing field: {field}"}), 400
     
-    # Hash password
-    password_hash = bcrypt.hashpw(data['password'].encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
-    
-    # Check if email exists
+    # Check if email exists (before hashing, so duplicates cost no bcrypt work)
     existing_user = execute_query(
         "SELECT user_id FROM users WHERE email = %s",
         (data['email'],),
@@ -29,28 +26,25 @@ def register():
     if existing_user:
         return jsonify({"error": "Email already registered"}), 400
     
-    # Insert user
-    user_id = execute_query(
-        """INSERT INTO users (email, password_hash, user_type, first_name, last_name, phone)
-           VALUES (%s, %s, 'patient', %s, %s, %s)""",
-        (data['email'], password_hash, data['first_name'], data['last_name'], data['phone'])
-    )
-    
-    if not user_id:
+    # Hash password (HasherBusy is answered with 503 by the app)
+    password_hash = password_hasher.hash(data['password'])
+    
+    # User and patient rows in one transaction on one connection; LAST_ID chains the new user_id
+    row_ids = execute_transaction([
+        ("""INSERT INTO users (email, password_hash, user_type, first_name, last_name, phone)
+            VALUES (%s, %s, 'patient', %s, %s, %s)""",
+         (data['email'], password_hash, data['first_name'], data['last_name'], data['phone'])),
+        ("""INSERT INTO patients (patient_id, date_of_birth, gender, blood_group, 
+            emergency_contact, address, medical_history)
+            VALUES (%s, %s, %s, %s, %s, %s, %s)""",
+         (LAST_ID, data['date_of_birth'], data['gender'], 
+          data.get('blood_group'), data.get('emergency_contact'),
+          data.get('address'), data.get('medical_history')))
+    ])
+    
+    if not row_ids:
         return jsonify({"error": "Failed to create user"}), 500
-    
-    # Insert patient details
-    patient_result = execute_query(
-        """INSERT INTO patients (patient_id, date_of_birth, gender, blood_group, 
-           emergency_contact, address, medical_history)
-           VALUES (%s, %s, %s, %s, %s, %s, %s)""",
-        (user_id, data['date_of_birth'], data['gender'], 
-         data.get('blood_group'), data.get('emergency_contact'),
-         data.get('address'), data.get('medical_history'))
-    )
-    
-    if patient_result is None:
-        return jsonify({"error": "Failed to create patient record"}), 500
+    user_id = row_ids[0]
     
     return jsonify({"message": "Registration successful", "user_id": user_id}), 201
 
@@ -74,9 +68,13 @@ def login():
         return jsonify({"error": "Invalid credentials"}), 401
     
     # Verify password
-    if not bcrypt.checkpw(data['password'].encode('utf-8'), user['password_hash'].encode('utf-8')):
+    if not password_hasher.verify(data['password'], user['password_hash']):
         return jsonify({"error": "Invalid credentials"}), 401
     
+    # Upgrade hashes made with a different work factor
+    if password_hasher.needs_rehash(user['password_hash']):
+        password_hasher.rehash_in_background(user['user_id'], data['password'])
+    
     # Set session
     session['user_id'] = user['user_id']
     session['user_type'] = user['user_type']
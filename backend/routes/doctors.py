@@ -1,160 +1,277 @@
-from flask import Blueprint, request, jsonify, session
+from flask import Blueprint, Response, request, jsonify, session
+from functools import wraps
+from datetime import date, datetime, timedelta
+from config import AVAILABILITY_CONFIG, CACHE_CONFIG
 from db.connection import execute_query
+from db.pagination import fetch_page, page_size
+from db.pool import PoolTimeout
+from db.rows import json_response
+from db.versions import version_watcher
+from middleware.response_cache import ResponseCache, skip_caching
+from services.availability import availability_index
+from services.search import doctor_search, doctor_cache_key
+from services.profiles import DOCTOR_LIST_ORDER, DOCTOR_LIST_QUERY, load_doctor_list, load_doctor_profiles
+from services.ratings import create_review, rating_cache_key, ReviewError
+from services.slot_events import slot_events, stream_slot_changes, StreamLimitError
 
 doctors_bp = Blueprint('doctors', __name__)
 
+# Bounds for GET /slots/earliest
+MAX_SLOT_SEARCH_DAYS = 90
+MAX_SLOT_SEARCH_RESULTS = 100
+
+# Serialized directory responses, invalidated through cache_versions
+directory_cache = ResponseCache(
+    version_watcher, CACHE_CONFIG['response_ttl'], CACHE_CONFIG['response_max_entries']
+)
+
+# Authentication decorator
+def require_auth(f):
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if 'user_id' not in session:
+            return jsonify({"error": "Authentication required"}), 401
+        return f(*args, **kwargs)
+    return decorated_function
+
 @doctors_bp.route('/doctors', methods=['GET'])
+@directory_cache.cached(namespaces=('doctor', 'rating'))
 def get_doctors():
     """Get all doctors with optional filters"""
     # Get query parameters
+    search_text = request.args.get('q')
     specialization = request.args.get('specialization')
     department = request.args.get('department')
     name = request.args.get('name')
+    limit = request.args.get('limit', type=int)
     
-    # Build query
-    query = """
-        SELECT DISTINCT
-            d.doctor_id,
-            CONCAT(u.first_name, ' ', u.last_name) AS doctor_name,
-            u.email,
-            u.phone,
-            dept.department_name,
-            d.qualification,
-            d.experience_years,
-            d.consultation_fee,
-            d.bio,
-            d.available_days,
-            GROUP_CONCAT(DISTINCT s.specialization_name) AS specializations,
-            COALESCE(AVG(r.rating), 0) AS average_rating,
-            COUNT(DISTINCT r.review_id) AS review_count
-        FROM doctors d
-        INNER JOIN users u ON d.doctor_id = u.user_id
-        INNER JOIN departments dept ON d.department_id = dept.department_id
-        LEFT JOIN doctor_specializations ds ON d.doctor_id = ds.doctor_id
-        LEFT JOIN specializations s ON ds.specialization_id = s.specialization_id
-        LEFT JOIN reviews r ON d.doctor_id = r.doctor_id
-        WHERE 1=1
-    """
-    
-    params = []
-    
-    if specialization:
-        query += " AND s.specialization_name LIKE %s"
-        params.append(f"%{specialization}%")
-    
-    if department:
-        query += " AND dept.department_name LIKE %s"
-        params.append(f"%{department}%")
+    if not (search_text or specialization or department or name):
+        cursor = request.args.get('cursor')
+        if limit is None and not cursor:
+            doctors = execute_query(DOCTOR_LIST_QUERY + " ORDER BY average_rating DESC",
+                                    fetch_all=True, compact=True)
+            if doctors is None:
+                skip_caching()
+            return json_response({"doctors": doctors or []}), 200
+        
+        # Paged listing: keyset on (average_rating, doctor_id), best rated first
+        try:
+            doctors, next_cursor = fetch_page(
+                DOCTOR_LIST_QUERY, (), DOCTOR_LIST_ORDER, cursor=cursor,
+                limit=page_size(limit), descending=True
+            )
+        except ValueError:
+            return jsonify({"error": "Invalid cursor"}), 400
+        if doctors is None:
+            skip_caching()
+            return jsonify({"error": "Server error while loading doctors"}), 500
+        return jsonify({"doctors": doctors, "next_cursor": next_cursor}), 200
     
-    if name:
-        query += " AND (u.first_name LIKE %s OR u.last_name LIKE %s)"
-        params.extend([f"%{name}%", f"%{name}%"])
-    
-    query += " GROUP BY d.doctor_id ORDER BY average_rating DESC"
+    # Filters are resolved by the in-memory search index, ranked by relevance
+    doctor_ids = doctor_search.search(
+        query=search_text, name=name, specialization=specialization,
+        department=department, limit=limit
+    )
+    if doctor_ids is None:
+        skip_caching()
+        return jsonify({"error": "Server error while searching doctors"}), 500
+    if not doctor_ids:
+        return jsonify({"doctors": []}), 200
     
-    doctors = execute_query(query, tuple(params), fetch_all=True)
+    doctors = load_doctor_list(doctor_ids)
+    if doctors is None:
+        skip_caching()
     
     return jsonify({"doctors": doctors or []}), 200
 
 @doctors_bp.route('/doctors/<int:doctor_id>', methods=['GET'])
+@directory_cache.cached(keys=lambda doctor_id: (doctor_cache_key(doctor_id), rating_cache_key(doctor_id)))
 def get_doctor_details(doctor_id):
     """Get detailed information about a specific doctor"""
-    doctor = execute_query(
-        """SELECT 
-            d.doctor_id,
-            CONCAT(u.first_name, ' ', u.last_name) AS doctor_name,
-            u.email,
-            u.phone,
-            dept.department_name,
-            dept.location AS department_location,
-            d.license_number,
-            d.qualification,
-            d.experience_years,
-            d.consultation_fee,
-            d.bio,
-            d.available_days
-        FROM doctors d
-        INNER JOIN users u ON d.doctor_id = u.user_id
-        INNER JOIN departments dept ON d.department_id = dept.department_id
-        WHERE d.doctor_id = %s""",
-        (doctor_id,),
-        fetch_one=True
-    )
-    
-    if not doctor:
+    # Doctor, rating summary and specializations in one round trip
+    profiles = load_doctor_profiles([doctor_id])
+    if profiles is None:
+        skip_caching()
+        return jsonify({"error": "Server error while loading doctor"}), 500
+    if not profiles:
         return jsonify({"error": "Doctor not found"}), 404
     
-    # Get specializations
-    specializations = execute_query(
-        """SELECT s.specialization_name, s.description
-           FROM doctor_specializations ds
-           INNER JOIN specializations s ON ds.specialization_id = s.specialization_id
-           WHERE ds.doctor_id = %s""",
-        (doctor_id,),
-        fetch_all=True
-    )
+    return jsonify({"doctor": profiles[0]}), 200
+
+@doctors_bp.route('/doctors/<int:doctor_id>/reviews', methods=['POST'])
+@require_auth
+def review_doctor(doctor_id):
+    """Review a doctor after a completed appointment (patients only)"""
+    if session['user_type'] != 'patient':
+        return jsonify({"error": "Only patients can review doctors"}), 403
     
-    doctor['specializations'] = specializations or []
+    data = request.get_json()
+    for field in ['appointment_id', 'rating']:
+        if field not in data:
+            return jsonify({"error": f"Missing field: {field}"}), 400
     
-    # Get reviews summary
-    reviews = execute_query(
-        """SELECT 
-            AVG(rating) AS average_rating,
-            COUNT(*) AS total_reviews,
-            SUM(CASE WHEN rating = 5 THEN 1 ELSE 0 END) AS five_star,
-            SUM(CASE WHEN rating = 4 THEN 1 ELSE 0 END) AS four_star,
-            SUM(CASE WHEN rating = 3 THEN 1 ELSE 0 END) AS three_star,
-            SUM(CASE WHEN rating = 2 THEN 1 ELSE 0 END) AS two_star,
-            SUM(CASE WHEN rating = 1 THEN 1 ELSE 0 END) AS one_star
-        FROM reviews
-        WHERE doctor_id = %s""",
-        (doctor_id,),
-        fetch_one=True
-    )
+    try:
+        review_id = create_review(
+            session['user_id'], doctor_id, data['appointment_id'],
+            data['rating'], data.get('review_text')
+        )
+    except ReviewError as e:
+        return jsonify({"error": str(e)}), 400
+    except PoolTimeout:
+        raise  # answered with 503 by the app
+    except Exception as e:
+        print(f"❌ Error saving review: {e}")  # For backend logs
+        return jsonify({"error": "Server error while saving review"}), 500
     
-    doctor['reviews'] = reviews
+    # Other workers notice the rating:<id> version bump; this one drops its copies now
+    directory_cache.invalidate()
     
-    return jsonify({"doctor": doctor}), 200
+    return jsonify({"message": "Review submitted successfully", "review_id": review_id}), 201
+
+def slot_date_range():
+    """(start, end) from ?date= (one day) or ?days= (from today, default 7); raises ValueError"""
+    date_param = request.args.get('date')
+    days = int(request.args.get('days', 7))  # Default to next 7 days
+    if date_param:
+        start_date = end_date = datetime.strptime(date_param, '%Y-%m-%d').date()
+    else:
+        start_date = date.today()
+        end_date = start_date + timedelta(days=days)
+    return start_date, end_date
 
 @doctors_bp.route('/doctors/<int:doctor_id>/timeslots', methods=['GET'])
 def get_doctor_timeslots(doctor_id):
     """Get available time slots for a doctor"""
-    date = request.args.get('date')
-    days = int(request.args.get('days', 7))  # Default to next 7 days
+    try:
+        start_date, end_date = slot_date_range()
+    except ValueError:
+        return jsonify({"error": "Invalid date or days parameter"}), 400
     
-    if date:
-        start_date = date
-        end_date = date
-    else:
-        start_date = 'CURDATE()'
-        end_date = f'DATE_ADD(CURDATE(), INTERVAL {days} DAY)'
+    # Hot path: served from the in-memory index without touching the database
+    slots_by_date = availability_index.get_available_slots(doctor_id, start_date, end_date)
+    if slots_by_date is not None:
+        return json_response({"slots": slots_by_date}), 200
     
     slots = execute_query(
-        f"""SELECT 
+        """SELECT 
             slot_id,
             slot_date,
             start_time,
-            end_time,
-            is_available
+            end_time
         FROM time_slots
         WHERE doctor_id = %s
-        AND slot_date BETWEEN {start_date} AND {end_date}
+        AND slot_date BETWEEN %s AND %s
         AND is_available = TRUE
         ORDER BY slot_date, start_time""",
-        (doctor_id,),
-        fetch_all=True
+        (doctor_id, start_date, end_date),
+        fetch_all=True,
+        compact=True
     )
     
     # Group slots by date
     slots_by_date = {}
-    for slot in (slots or []):
-        date_str = str(slot['slot_date'])
-        if date_str not in slots_by_date:
-            slots_by_date[date_str] = []
-        slots_by_date[date_str].append({
-            'slot_id': slot['slot_id'],
-            'start_time': str(slot['start_time']),
-            'end_time': str(slot['end_time'])
-        })
-    
-    return jsonify({"slots": slots_by_date}), 200
\ No newline at end of file
+    for slot_id, slot_date, start_time, end_time in (slots or []):
+        slots_by_date.setdefault(slot_date.isoformat(), []).append(
+            {'slot_id': slot_id, 'start_time': str(start_time), 'end_time': str(end_time)}
+        )
+    
+    return json_response({"slots": slots_by_date}), 200
+
+@doctors_bp.route('/doctors/<int:doctor_id>/timeslots/stream', methods=['GET'])
+def stream_doctor_timeslots(doctor_id):
+    """Stream a doctor's open slots, then claimed/released changes, as server-sent events"""
+    try:
+        start_date, end_date = slot_date_range()
+    except ValueError:
+        return jsonify({"error": "Invalid date or days parameter"}), 400
+    if not availability_index.covers(start_date, end_date):
+        return jsonify({
+            "error": f"Streams cover today through the next {AVAILABILITY_CONFIG['horizon_days'] - 1} days"
+        }), 400
+
+    try:
+        subscription = slot_events.subscribe(doctor_id)
+    except StreamLimitError:
+        response = jsonify({"error": "Too many open slot streams, try again shortly"})
+        response.headers['Retry-After'] = '5'
+        return response, 503
+    response = Response(
+        stream_slot_changes(subscription, start_date, end_date),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+    # The generator's finally never runs if the server drops the response before
+    # iterating it; closing the response releases the subscription either way
+    response.call_on_close(subscription.close)
+    return response
+
+@doctors_bp.route('/slots/earliest', methods=['GET'])
+def get_earliest_slots():
+    """Earliest open slots across every doctor matching the filters, soonest first"""
+    try:
+        start_date = date.today()
+        if request.args.get('date'):
+            start_date = datetime.strptime(request.args['date'], '%Y-%m-%d').date()
+        days = max(0, min(int(request.args.get('days', 14)), MAX_SLOT_SEARCH_DAYS))
+        end_date = start_date + timedelta(days=days)
+        limit = max(1, min(int(request.args.get('limit', 10)), MAX_SLOT_SEARCH_RESULTS))
+        after = datetime.strptime(request.args['after'], '%H:%M').time() if request.args.get('after') else None
+        before = datetime.strptime(request.args['before'], '%H:%M').time() if request.args.get('before') else None
+    except ValueError:
+        return jsonify({"error": "Invalid date, days, limit or time-of-day parameter"}), 400
+    
+    query = """
+        SELECT
+            ts.slot_id,
+            ts.doctor_id,
+            CONCAT(u.first_name, ' ', u.last_name) AS doctor_name,
+            dept.department_name,
+            d.consultation_fee,
+            CAST(ts.slot_date AS CHAR) AS slot_date,
+            CAST(ts.start_time AS CHAR) AS start_time,
+            CAST(ts.end_time AS CHAR) AS end_time
+        FROM time_slots ts
+        INNER JOIN doctors d ON ts.doctor_id = d.doctor_id
+        INNER JOIN users u ON d.doctor_id = u.user_id
+        INNER JOIN departments dept ON d.department_id = dept.department_id
+        WHERE ts.is_available = TRUE
+        AND ts.slot_date BETWEEN %s AND %s
+        AND (ts.slot_date > %s OR ts.start_time >= %s)
+    """
+    now = datetime.now()
+    params = [start_date, end_date, now.date(), now.time()]
+    # A doctor IN list varies in length, so such statements skip the prepared statement cache
+    cached = True
+    
+    # Doctor filters use the same in-memory search index as GET /doctors
+    search_text = request.args.get('q')
+    name = request.args.get('name')
+    specialization = request.args.get('specialization')
+    department = request.args.get('department')
+    if search_text or name or specialization or department:
+        doctor_ids = doctor_search.search(
+            query=search_text, name=name, specialization=specialization, department=department
+        )
+        if doctor_ids is None:
+            return jsonify({"error": "Server error while searching doctors"}), 500
+        if not doctor_ids:
+            return jsonify({"slots": []}), 200
+        query += f" AND ts.doctor_id IN ({', '.join(['%s'] * len(doctor_ids))})"
+        params.extend(doctor_ids)
+        cached = False
+    if after:
+        query += " AND ts.start_time >= %s"
+        params.append(after)
+    if before:
+        query += " AND ts.end_time <= %s"
+        params.append(before)
+    
+    # idx_availability (is_available, slot_date, start_time) returns rows already in
+    # this order, so the scan stops after `limit` matches instead of sorting the window
+    query += " ORDER BY ts.slot_date, ts.start_time, ts.slot_id LIMIT %s"
+    params.append(limit)
+    
+    slots = execute_query(query, tuple(params), fetch_all=True, cached=cached)
+    if slots is None:
+        return jsonify({"error": "Server error while searching slots"}), 500
+    return jsonify({"slots": slots}), 200
@@ -0,0 +1,35 @@
+from flask import Response, current_app, jsonify, request, stream_with_context
+from db.pagination import decode_cursor, fetch_page, page_size, stream_rows
+
+
+def list_response(result_key, query, params, order_columns, descending=False, transform=None):
+    """
+    Respond with one keyset page ({result_key: [...], "next_cursor": ...}), or
+    with every remaining row as JSON lines when ?format=jsonl is requested.
+
+    transform, if given, is applied to the rows of a page before serializing.
+    It needs the whole page, so requests that ask for one (e.g.
+    ?include=medicines) cannot be streamed and get a 400 with format=jsonl.
+    """
+    cursor = request.args.get('cursor')
+    try:
+        if cursor:
+            decode_cursor(cursor, order_columns)
+        limit = page_size(request.args.get('limit'))
+    except ValueError:
+        return jsonify({"error": "Invalid cursor or limit"}), 400
+
+    if request.args.get('format') == 'jsonl':
+        if transform:
+            return jsonify({"error": "format=jsonl cannot be combined with include"}), 400
+        lines = stream_rows(query, params, order_columns, current_app.json.dumps,
+                            cursor=cursor, descending=descending)
+        return Response(stream_with_context(lines), mimetype='application/x-ndjson')
+
+    rows, next_cursor = fetch_page(query, params, order_columns, cursor=cursor,
+                                   limit=limit, descending=descending)
+    if rows is None:
+        return jsonify({"error": f"Server error while loading {result_key}"}), 500
+    if rows and transform:
+        rows = transform(rows)
+    return jsonify({result_key: rows, "next_cursor": next_cursor}), 200
@@ -1,7 +1,14 @@
 from flask import Blueprint, request, jsonify, session
-from db.connection import execute_query, get_db_connection
 from functools import wraps
-from datetime import datetime
+from db.history import history_queries
+from db.loaders import attach_medicines, load_prescriptions
+from db.pagination import MAX_PAGE_SIZE
+from db.pool import PoolTimeout
+from routes.listing import list_response
+from services.prescriptions import (
+    create_prescription, import_prescriptions, PrescriptionError,
+    DEFAULT_IMPORT_BATCH_SIZE, MAX_IMPORT_BATCH_SIZE
+)
 
 prescriptions_bp = Blueprint('prescriptions', __name__)
 
@@ -14,6 +21,48 @@ def require_auth(f):
         return f(*args, **kwargs)
     return decorated_function
 
+@prescriptions_bp.route('/prescriptions', methods=['GET'])
+@require_auth
+def list_prescriptions():
+    """List the user's prescriptions, newest appointment first, or fetch many by ?ids="""
+    owner_column = 'a.doctor_id' if session['user_type'] == 'doctor' else 'a.patient_id'
+
+    # Bulk fetch: full prescriptions with medicines in two queries total
+    if request.args.get('ids'):
+        try:
+            prescription_ids = list(dict.fromkeys(int(i) for i in request.args['ids'].split(',')))
+        except ValueError:
+            return jsonify({"error": "ids must be a comma-separated list of integers"}), 400
+        if len(prescription_ids) > MAX_PAGE_SIZE:
+            return jsonify({"error": f"At most {MAX_PAGE_SIZE} ids per request"}), 400
+        if session['user_type'] == 'admin':
+            prescriptions = load_prescriptions(prescription_ids)
+        else:
+            prescriptions = load_prescriptions(prescription_ids, owner_column, session['user_id'])
+        if prescriptions is None:
+            return jsonify({"error": "Server error while loading prescriptions"}), 500
+        return jsonify({"prescriptions": attach_medicines(prescriptions)}), 200
+    query = f"""SELECT 
+            p.prescription_id,
+            p.diagnosis,
+            p.created_at,
+            a.appointment_id,
+            a.appointment_date,
+            CONCAT(doc_user.first_name, ' ', doc_user.last_name) AS doctor_name,
+            dept.department_name
+        FROM prescriptions p
+        INNER JOIN {{appointments}} a ON p.appointment_id = a.appointment_id
+        INNER JOIN doctors doc ON a.doctor_id = doc.doctor_id
+        INNER JOIN users doc_user ON doc.doctor_id = doc_user.user_id
+        INNER JOIN departments dept ON doc.department_id = dept.department_id
+        WHERE {owner_column} = %s"""
+
+    order_columns = [('a.appointment_date', 'appointment_date'), ('a.appointment_id', 'appointment_id')]
+    # ?include=medicines adds each prescription's medicines with one extra query per page
+    transform = attach_medicines if request.args.get('include') == 'medicines' else None
+    return list_response('prescriptions', history_queries(query), [session['user_id']], order_columns,
+                         descending=True, transform=transform)
+
 @prescriptions_bp.route('/prescriptions', methods=['POST'])
 @require_auth
 def upload_prescription():
@@ -22,95 +71,53 @@ def upload_prescription():
         return jsonify({"error": "Only doctors can upload prescriptions"}), 403
 
     data = request.get_json()
-    required_fields = ['appointment_id', 'diagnosis', 'medicines']
-
-    # Basic field validation
-    for field in required_fields:
-        if field not in data:
-            return jsonify({"error": f"Missing field: {field}"}), 400
-
-    # Validate follow-up date format if provided
-    follow_up_date = data.get('follow_up_date')
-    if follow_up_date:
-        try:
-            follow_up_date = datetime.strptime(follow_up_date, '%Y-%m-%d').date()
-        except ValueError:
-            return jsonify({"error": "Invalid follow-up date format. Expected YYYY-MM-DD"}), 400
-
-    # Validate medicines array and inner fields
-    if not isinstance(data['medicines'], list) or not data['medicines']:
-        return jsonify({"error": "Medicines must be a non-empty list"}), 400
-
-    for med in data['medicines']:
-        for key in ['medicine_id', 'dosage', 'frequency', 'duration', 'quantity']:
-            if key not in med:
-                return jsonify({"error": f"Missing field in medicine: {key}"}), 400
-
-    # Verify that the appointment exists and belongs to this doctor
-    appointment = execute_query(
-        """SELECT appointment_id FROM appointments 
-           WHERE appointment_id = %s AND doctor_id = %s AND status = 'completed'""",
-        (data['appointment_id'], session['user_id']),
-        fetch_one=True
-    )
 
-    if not appointment:
-        return jsonify({"error": "Invalid or unauthorized appointment"}), 400
-
-    connection = get_db_connection()
+    # Validation, appointment check and all inserts share one connection and transaction
     try:
-        cursor = connection.cursor(dictionary=True, prepared=True)
-
-        # Prevent duplicate prescription uploads
-        cursor.execute(
-            "SELECT prescription_id FROM prescriptions WHERE appointment_id = %s",
-            (data['appointment_id'],)
-        )
-        if cursor.fetchone():
-            return jsonify({"error": "Prescription already exists for this appointment"}), 400
+        prescription_id = create_prescription(session['user_id'], data)
+    except PrescriptionError as e:
+        return jsonify({"error": str(e)}), 400
+    except PoolTimeout:
+        raise  # answered with 503 by the app
+    except Exception as e:
+        print(f"❌ Error uploading prescription: {e}")  # For backend logs
+        return jsonify({"error": "Server error while uploading prescription"}), 500
 
-        # Insert prescription record
-        cursor.execute(
-            """INSERT INTO prescriptions (appointment_id, diagnosis, instructions, follow_up_date)
-               VALUES (%s, %s, %s, %s)""",
-            (
-                data['appointment_id'],
-                data['diagnosis'],
-                data.get('instructions'),
-                follow_up_date  # already parsed to date object
-            )
-        )
-        prescription_id = cursor.lastrowid
+    return jsonify({
+        "message": "Prescription uploaded successfully",
+        "prescription_id": prescription_id
+    }), 201
 
-        # Insert each prescribed medicine
-        for medicine in data['medicines']:
-            cursor.execute(
-                """INSERT INTO prescription_medicines 
-                   (prescription_id, medicine_id, dosage, frequency, duration, quantity, instructions)
-                   VALUES (%s, %s, %s, %s, %s, %s, %s)""",
-                (
-                    prescription_id,
-                    medicine['medicine_id'],
-                    medicine['dosage'],
-                    medicine['frequency'],
-                    medicine['duration'],
-                    medicine['quantity'],
-                    medicine.get('instructions')  # optional
-                )
-            )
+@prescriptions_bp.route('/prescriptions/import', methods=['POST'])
+@require_auth
+def bulk_import_prescriptions():
+    """Bulk-load prescriptions, e.g. from an EHR export (admins, or doctors for their own appointments)"""
+    if session['user_type'] not in ('doctor', 'admin'):
+        return jsonify({"error": "Only doctors and admins can import prescriptions"}), 403
 
-        connection.commit()
+    data = request.get_json()
+    records = data.get('prescriptions') if isinstance(data, dict) else None
+    if not isinstance(records, list) or not records:
+        return jsonify({"error": "prescriptions must be a non-empty list"}), 400
 
-        return jsonify({
-            "message": "Prescription uploaded successfully",
-            "prescription_id": prescription_id
-        }), 201
+    try:
+        batch_size = int(data.get('batch_size', DEFAULT_IMPORT_BATCH_SIZE))
+    except (TypeError, ValueError):
+        return jsonify({"error": "batch_size must be an integer"}), 400
+    batch_size = max(1, min(batch_size, MAX_IMPORT_BATCH_SIZE))
 
+    doctor_id = session['user_id'] if session['user_type'] == 'doctor' else None
+    try:
+        results = import_prescriptions(records, doctor_id=doctor_id, batch_size=batch_size)
+    except PoolTimeout:
+        raise  # answered with 503 by the app
     except Exception as e:
-        connection.rollback()
-        print(f"❌ Error uploading prescription: {e}")  # For backend logs
-        return jsonify({"error": "Server error while uploading prescription"}), 500
-
-    finally:
-        cursor.close()
-        connection.close()
\ No newline at end of file
+        print(f"❌ Error importing prescriptions: {e}")  # For backend logs
+        return jsonify({"error": "Server error while importing prescriptions"}), 500
+
+    imported = sum(1 for result in results if 'prescription_id' in result)
+    return jsonify({
+        "imported": imported,
+        "failed": len(results) - imported,
+        "results": results
+    }), 200
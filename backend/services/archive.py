@@ -0,0 +1,147 @@
+"""
+Moves finished appointment history out of the hot tables.
+
+A past slot is archived, together with every appointment booked on it, once
+it is older than the cutoff and none of its appointments is still
+'scheduled'. Rows move to time_slots_archive / appointments_archive with
+their ids unchanged, so prescriptions, reviews and medical records keep
+pointing at them, and list endpoints read both tables (db/history.py). The
+hot tables, and the date indexes that slot and schedule lookups scan, then
+hold only recent and upcoming rows.
+
+Slots are visited in slot_id order and moved batch_size at a time, one short
+transaction per batch (scan, lock, copy, then delete; re-run on deadlocks),
+with a pause between batches so replicas and concurrent bookings keep up.
+Each batch sets @archiving on its connection so the appointment delete
+trigger leaves the analytics rollups alone: archived appointments still
+count. Unbooked expired slots carry no history and are deleted by
+schedule.prune_expired_slots() instead.
+
+Archived history is read-only: new prescriptions and reviews can only be
+added to appointments that are still in the hot table.
+"""
+import logging
+import time
+from contextlib import contextmanager
+from datetime import date, timedelta
+from mysql.connector import Error
+from config import ARCHIVE_CONFIG
+from db.connection import run_in_transaction
+from db.loaders import placeholders
+
+logger = logging.getLogger(__name__)
+
+SLOT_COLUMNS = "slot_id, doctor_id, slot_date, start_time, end_time, is_available"
+APPOINTMENT_COLUMNS = """appointment_id, patient_id, doctor_id, slot_id, appointment_date, appointment_time,
+    status, reason_for_visit, notes, created_at, updated_at"""
+
+CANDIDATE_SLOTS = """SELECT ts.slot_id
+    FROM time_slots ts
+    WHERE ts.slot_id > %s AND ts.slot_date < %s
+    AND EXISTS (SELECT 1 FROM appointments a WHERE a.slot_id = ts.slot_id)
+    AND NOT EXISTS (SELECT 1 FROM appointments a WHERE a.slot_id = ts.slot_id AND a.status = 'scheduled')
+    ORDER BY ts.slot_id
+    LIMIT %s"""
+
+
+def archive_cutoff(after_days=None):
+    """First date that stays hot"""
+    return date.today() - timedelta(days=ARCHIVE_CONFIG['after_days'] if after_days is None else after_days)
+
+
+def archive_history(before=None, batch_size=None, pause_ms=None):
+    """
+    Move finished appointments dated before `before`, and their slots, to the archive tables.
+
+    Args:
+        before: Cutoff date (default: today minus ARCHIVE_CONFIG['after_days'])
+        batch_size: Slots per transaction
+        pause_ms: Sleep between batches
+
+    Returns:
+        {"time_slots": slots moved, "appointments": appointments moved}
+    """
+    before = before or archive_cutoff()
+    batch_size = batch_size or ARCHIVE_CONFIG['batch_size']
+    pause_ms = ARCHIVE_CONFIG['pause_ms'] if pause_ms is None else pause_ms
+    moved = {"time_slots": 0, "appointments": 0}
+    last_slot_id = 0
+
+    while True:
+        # One unit of work per batch, re-run on deadlocks with the appointment locks it takes
+        slot_ids, slots, appointments = run_in_transaction(
+            lambda unit: _archive_batch(unit, last_slot_id, before, batch_size),
+            f"Archiving slots after {last_slot_id}"
+        )
+        if not slot_ids:
+            break
+        last_slot_id = slot_ids[-1]
+        moved["time_slots"] += slots
+        moved["appointments"] += appointments
+        if len(slot_ids) < batch_size:
+            break
+        if pause_ms:
+            time.sleep(pause_ms / 1000)
+
+    logger.info(f"Archived {moved['appointments']} appointments and {moved['time_slots']} slots before {before}")
+    return moved
+
+
+@contextmanager
+def _archiving(unit):
+    """Set @archiving on the unit's connection for the block; a connection that cannot be reset is closed"""
+    unit.execute("SET @archiving = 1", cached=False)
+    try:
+        yield
+    finally:
+        try:
+            unit.execute("SET @archiving = NULL", cached=False)
+        except Error as e:
+            # A pooled connection left with @archiving = 1 would skip the rollup triggers for its next user
+            logger.error(f"Could not reset @archiving, discarding the connection: {e}")
+            try:
+                unit.connection.close()
+            except Error:
+                pass
+
+
+def _archive_batch(unit, last_slot_id, before, batch_size):
+    """
+    Archive the next batch of candidate slots after last_slot_id in the caller's unit of work.
+
+    Returns:
+        (candidate slot_ids scanned, slots moved, appointments moved)
+    """
+    with _archiving(unit):
+        unit.execute(CANDIDATE_SLOTS, (last_slot_id, before, batch_size))
+        scanned = [row[0] for row in unit.fetchall()]
+        if not scanned:
+            return scanned, 0, 0
+
+        # IN lists vary in length, so these statements bypass the prepared statement cache.
+        # Lock the batch's appointments; a slot booked again since the candidate scan stays hot.
+        unit.execute(
+            f"SELECT slot_id, status FROM appointments WHERE slot_id IN ({placeholders(scanned)}) FOR UPDATE",
+            tuple(scanned), cached=False
+        )
+        active = {slot_id for slot_id, status in unit.fetchall() if status == 'scheduled'}
+        slot_ids = [slot_id for slot_id in scanned if slot_id not in active]
+        if not slot_ids:
+            return scanned, 0, 0
+        in_list = placeholders(slot_ids)
+        params = tuple(slot_ids)
+
+        unit.execute(
+            f"""INSERT INTO time_slots_archive ({SLOT_COLUMNS})
+                SELECT {SLOT_COLUMNS} FROM time_slots WHERE slot_id IN ({in_list})""",
+            params, cached=False
+        )
+        unit.execute(
+            f"""INSERT INTO appointments_archive ({APPOINTMENT_COLUMNS})
+                SELECT {APPOINTMENT_COLUMNS} FROM appointments WHERE slot_id IN ({in_list})""",
+            params, cached=False
+        )
+        appointments = unit.rowcount
+        unit.execute(f"DELETE FROM appointments WHERE slot_id IN ({in_list})", params, cached=False)
+        unit.execute(f"DELETE FROM time_slots WHERE slot_id IN ({in_list})", params, cached=False)
+        return scanned, unit.rowcount, appointments
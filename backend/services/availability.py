@@ -0,0 +1,188 @@
+"""
+Process-local availability index for doctor time slots.
+
+Each doctor entry holds every slot in [today, today + horizon) grouped by day,
+with one integer bitmap per day where bit i is set when the i-th slot of that
+day (ordered by start_time) is still available. Reads are served entirely from
+memory; an entry is rebuilt when its day window rolls over or when the shared
+`slots:<doctor_id>` version in cache_versions moves past the one it was built at.
+Listeners registered with add_listener() are told about every committed change
+applied in this process (services/slot_events.py streams them to clients).
+"""
+import logging
+import threading
+from datetime import date, timedelta
+from config import AVAILABILITY_CONFIG
+from db.connection import execute_query
+from db.versions import version_watcher
+
+logger = logging.getLogger(__name__)
+
+
+def slots_cache_key(doctor_id):
+    """cache_versions key bumped whenever a doctor's slots change"""
+    return f"slots:{doctor_id}"
+
+
+class DoctorSlots:
+    """Slots of one doctor for a fixed window of days"""
+
+    __slots__ = ('window_start', 'window_end', 'version', 'days', 'positions')
+
+    def __init__(self, window_start, window_end, version):
+        self.window_start = window_start
+        self.window_end = window_end
+        self.version = version
+        # date -> [slot tuples, availability bitmap]
+        self.days = {}
+        # slot_id -> (date, bit position)
+        self.positions = {}
+
+    def add(self, slot_id, slot_date, start_time, end_time, is_available):
+        day = self.days.setdefault(slot_date, [[], 0])
+        position = len(day[0])
+        day[0].append((slot_id, str(start_time), str(end_time)))
+        if is_available:
+            day[1] |= 1 << position
+        self.positions[slot_id] = (slot_date, position)
+
+    def set_available(self, slot_id, available):
+        located = self.positions.get(slot_id)
+        if located is None:
+            return False
+        day = self.days[located[0]]
+        if available:
+            day[1] |= 1 << located[1]
+        else:
+            day[1] &= ~(1 << located[1])
+        return True
+
+    def slot(self, slot_id):
+        """(date, slot_id, start_time, end_time) of a loaded slot, or None"""
+        located = self.positions.get(slot_id)
+        if located is None:
+            return None
+        return (located[0],) + self.days[located[0]][0][located[1]]
+
+    def covers(self, start_date, end_date):
+        return self.window_start <= start_date and end_date < self.window_end
+
+    def available_slots(self, start_date, end_date):
+        """Return {date_str: [slot dicts]} for open slots in the inclusive range"""
+        slots_by_date = {}
+        current = start_date
+        while current <= end_date:
+            day = self.days.get(current)
+            if day and day[1]:
+                slots, bitmap = day
+                slots_by_date[str(current)] = [
+                    {'slot_id': slot_id, 'start_time': start_time, 'end_time': end_time}
+                    for i, (slot_id, start_time, end_time) in enumerate(slots)
+                    if bitmap >> i & 1
+                ]
+            current += timedelta(days=1)
+        return slots_by_date
+
+
+class AvailabilityIndex:
+    """Per-doctor slot bitmaps kept coherent across workers via cache_versions"""
+
+    def __init__(self, horizon_days, watcher):
+        self.horizon_days = horizon_days
+        self.watcher = watcher
+        self._entries = {}
+        self._listeners = []
+        self._lock = threading.Lock()
+
+    def add_listener(self, listener):
+        """
+        Call listener(doctor_id, slot_id, slot, available) after each local change.
+
+        slot is (date, slot_id, start_time, end_time), or None when the slot is
+        not in this worker's loaded window.
+        """
+        self._listeners.append(listener)
+
+    def covers(self, start_date, end_date):
+        """True if the range lies inside the window every entry is built for"""
+        today = date.today()
+        return today <= start_date <= end_date < today + timedelta(days=self.horizon_days)
+
+    def get_available_slots(self, doctor_id, start_date, end_date):
+        """
+        Look up open slots for a doctor between two dates (inclusive).
+
+        Returns None when the range falls outside the indexed window or the
+        index could not be loaded, so the caller can fall back to the database.
+        """
+        entry = self._entry(doctor_id)
+        if entry is None or not entry.covers(start_date, end_date):
+            return None
+        return entry.available_slots(start_date, end_date)
+
+    def mark_booked(self, doctor_id, slot_id):
+        """Apply a committed booking to this worker's copy of the index"""
+        self._set_available(doctor_id, slot_id, False)
+
+    def mark_released(self, doctor_id, slot_id):
+        """Apply a committed cancellation to this worker's copy of the index"""
+        self._set_available(doctor_id, slot_id, True)
+
+    def invalidate(self, doctor_id=None):
+        """Drop one doctor's entry, or the whole index"""
+        with self._lock:
+            if doctor_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(doctor_id, None)
+
+    def _set_available(self, doctor_id, slot_id, available):
+        doctor_id, slot_id = int(doctor_id), int(slot_id)
+        slot = None
+        with self._lock:
+            entry = self._entries.get(doctor_id)
+            if entry is not None:
+                if entry.set_available(slot_id, available):
+                    slot = entry.slot(slot_id)
+                else:
+                    # Slot outside the loaded window or created after the load
+                    self._entries.pop(doctor_id, None)
+        for listener in self._listeners:
+            listener(doctor_id, slot_id, slot, available)
+
+    def _entry(self, doctor_id):
+        today = date.today()
+        version = self.watcher.version(slots_cache_key(doctor_id))
+        entry = self._entries.get(doctor_id)
+        if entry is not None and entry.window_start == today and entry.version == version:
+            return entry
+
+        # Loads run outside the lock; a concurrent duplicate load is harmless
+        entry = self._load(doctor_id, today, version)
+        if entry is not None:
+            with self._lock:
+                self._entries[doctor_id] = entry
+        return entry
+
+    def _load(self, doctor_id, today, version):
+        window_end = today + timedelta(days=self.horizon_days)
+        rows = execute_query(
+            """SELECT slot_id, slot_date, start_time, end_time, is_available
+               FROM time_slots
+               WHERE doctor_id = %s AND slot_date >= %s AND slot_date < %s
+               ORDER BY slot_date, start_time""",
+            (doctor_id, today, window_end),
+            fetch_all=True,
+            replica=False  # cached until the next slots:<id> bump, so never read a lagging copy
+        )
+        if rows is None:
+            return None
+        entry = DoctorSlots(today, window_end, version)
+        for row in rows:
+            entry.add(row['slot_id'], row['slot_date'], row['start_time'],
+                      row['end_time'], row['is_available'])
+        logger.debug(f"Loaded {len(rows)} slots for doctor {doctor_id} at version {version}")
+        return entry
+
+
+availability_index = AvailabilityIndex(AVAILABILITY_CONFIG['horizon_days'], version_watcher)
@@ -0,0 +1,258 @@
+import logging
+from db.connection import run_in_transaction
+from db.loaders import placeholders
+from db.versions import bump_version, bump_versions
+from services.availability import availability_index, slots_cache_key
+
+logger = logging.getLogger(__name__)
+
+# Most appointments one bulk cancellation may name (each one is locked in the same transaction)
+MAX_BULK_CANCEL = 200
+
+
+class BookingError(Exception):
+    """Base class for booking failures that map to a client error"""
+
+
+class InvalidSlotError(BookingError):
+    """The slot does not exist or does not belong to the requested doctor"""
+
+
+class SlotUnavailableError(BookingError):
+    """The slot has already been claimed by another booking"""
+
+
+class AppointmentNotFoundError(BookingError):
+    """The appointment does not exist or belongs to someone else"""
+
+
+class AppointmentStateError(BookingError):
+    """The appointment is no longer scheduled"""
+
+
+def _claim_and_insert(unit, patient_id, doctor_id, slot_id, reason_for_visit):
+    """Claim the slot and create the appointment in the caller's unit of work"""
+    # Conditional claim: InnoDB serializes concurrent updates of the same row,
+    # and the loser re-evaluates is_available after the winner commits.
+    unit.execute(
+        """UPDATE time_slots SET is_available = FALSE
+           WHERE slot_id = %s AND doctor_id = %s AND is_available = TRUE""",
+        (slot_id, doctor_id)
+    )
+    if unit.rowcount != 1:
+        unit.execute(
+            "SELECT slot_id FROM time_slots WHERE slot_id = %s AND doctor_id = %s",
+            (slot_id, doctor_id)
+        )
+        if unit.fetchone() is None:
+            raise InvalidSlotError("Invalid slot")
+        raise SlotUnavailableError("Slot not available")
+
+    unit.execute(
+        """INSERT INTO appointments
+           (patient_id, doctor_id, slot_id, appointment_date, appointment_time, reason_for_visit)
+           SELECT %s, doctor_id, slot_id, slot_date, start_time, %s
+           FROM time_slots WHERE slot_id = %s""",
+        (patient_id, reason_for_visit, slot_id)
+    )
+    appointment_id = unit.lastrowid
+    bump_version(unit, slots_cache_key(doctor_id))
+    return appointment_id
+
+
+def book_slot(patient_id, doctor_id, slot_id, reason_for_visit):
+    """
+    Atomically claim a time slot and create the appointment for it.
+
+    Args:
+        patient_id: Patient making the booking
+        doctor_id: Doctor that owns the slot
+        slot_id: Slot to claim
+        reason_for_visit: Free-text reason stored on the appointment
+
+    Returns:
+        The new appointment_id
+
+    Raises:
+        InvalidSlotError: slot does not exist for this doctor
+        SlotUnavailableError: slot was already booked
+        mysql.connector.Error: database failure after retries are exhausted
+    """
+    appointment_id = run_in_transaction(
+        lambda unit: _claim_and_insert(unit, patient_id, doctor_id, slot_id, reason_for_visit),
+        f"Booking slot {slot_id}"
+    )
+    availability_index.mark_booked(doctor_id, slot_id)
+    return appointment_id
+
+
+# Lock order shared by every transaction that changes existing appointments:
+# appointments rows first, then time_slots rows, each in ascending id order.
+# Booking only locks its slot before inserting a new appointment row, so it
+# never waits on a lock these transactions hold while holding one they need.
+
+def _owned(row_patient_id, row_doctor_id, patient_id, doctor_id):
+    return (patient_id is None or row_patient_id == patient_id) and (doctor_id is None or row_doctor_id == doctor_id)
+
+
+def _reschedule(unit, appointment_id, new_slot_id, patient_id, doctor_id):
+    """Move a scheduled appointment to another slot of the same doctor in the caller's unit of work"""
+    unit.execute(
+        """SELECT patient_id, doctor_id, slot_id, status FROM appointments
+           WHERE appointment_id = %s FOR UPDATE""",
+        (appointment_id,)
+    )
+    appointment = unit.fetchone()
+    if appointment is None or not _owned(appointment[0], appointment[1], patient_id, doctor_id):
+        raise AppointmentNotFoundError("Appointment not found")
+    _, owner_doctor_id, old_slot_id, status = appointment
+    if status != 'scheduled':
+        raise AppointmentStateError("Only scheduled appointments can be rescheduled")
+
+    # Both slots, lowest id first: two reschedules between the same pair cannot deadlock
+    unit.execute(
+        """SELECT slot_id, doctor_id, is_available, slot_date, start_time FROM time_slots
+           WHERE slot_id IN (%s, %s) ORDER BY slot_id FOR UPDATE""",
+        (min(old_slot_id, new_slot_id), max(old_slot_id, new_slot_id))
+    )
+    slots = {row[0]: row for row in unit.fetchall()}
+    new_slot = slots.get(new_slot_id)
+    if new_slot is None or new_slot[1] != owner_doctor_id:
+        raise InvalidSlotError("Invalid slot")
+    if new_slot_id != old_slot_id:
+        if not new_slot[2]:
+            raise SlotUnavailableError("Slot not available")
+        unit.execute("UPDATE time_slots SET is_available = FALSE WHERE slot_id = %s", (new_slot_id,))
+        unit.execute("UPDATE time_slots SET is_available = TRUE WHERE slot_id = %s", (old_slot_id,))
+        unit.execute(
+            """UPDATE appointments SET slot_id = %s, appointment_date = %s, appointment_time = %s
+               WHERE appointment_id = %s""",
+            (new_slot_id, new_slot[3], new_slot[4], appointment_id)
+        )
+        bump_version(unit, slots_cache_key(owner_doctor_id))
+    return owner_doctor_id, old_slot_id, {
+        "appointment_id": appointment_id,
+        "slot_id": new_slot_id,
+        "appointment_date": str(new_slot[3]),
+        "appointment_time": str(new_slot[4]),
+    }
+
+
+def reschedule_appointment(appointment_id, new_slot_id, patient_id=None, doctor_id=None):
+    """
+    Move a scheduled appointment to another open slot of the same doctor in one transaction.
+
+    The new slot is claimed, the old one released and the appointment updated
+    together, so a failure leaves the original booking untouched.
+
+    Args:
+        appointment_id: Appointment to move
+        new_slot_id: Open slot to move it to
+        patient_id, doctor_id: Restrict to appointments of this patient / doctor
+                               (both None for admins)
+
+    Returns:
+        {"appointment_id", "slot_id", "appointment_date", "appointment_time"}
+
+    Raises:
+        AppointmentNotFoundError: unknown or someone else's appointment
+        AppointmentStateError: appointment is not scheduled
+        InvalidSlotError: slot does not exist for the appointment's doctor
+        SlotUnavailableError: slot is already booked
+    """
+    owner_doctor_id, old_slot_id, result = run_in_transaction(
+        lambda unit: _reschedule(unit, appointment_id, new_slot_id, patient_id, doctor_id),
+        f"Rescheduling appointment {appointment_id}"
+    )
+    if old_slot_id != new_slot_id:
+        availability_index.mark_booked(owner_doctor_id, new_slot_id)
+        availability_index.mark_released(owner_doctor_id, old_slot_id)
+    return result
+
+
+def _cancel(unit, select_sql, params, appointment_ids, patient_id, doctor_id, release_slots):
+    """Cancel the scheduled appointments select_sql locks (in the caller's unit); returns (results, released slots)"""
+    # IN lists vary in length, so these statements bypass the prepared statement cache
+    unit.execute(select_sql + " ORDER BY appointment_id FOR UPDATE", params, cached=False)
+    found = {row[0]: row for row in unit.fetchall()}
+    if appointment_ids is None:
+        appointment_ids = list(found)
+
+    results = []
+    cancel_ids = []
+    slots = []
+    for appointment_id in appointment_ids:
+        row = found.get(appointment_id)
+        if row is None or not _owned(row[1], row[2], patient_id, doctor_id):
+            results.append({"appointment_id": appointment_id, "error": "Appointment not found"})
+        elif row[4] != 'scheduled':
+            results.append({"appointment_id": appointment_id,
+                            "error": "Only scheduled appointments can be cancelled"})
+        else:
+            results.append({"appointment_id": appointment_id, "status": "cancelled"})
+            cancel_ids.append(appointment_id)
+            slots.append((row[2], row[3]))
+    if not cancel_ids:
+        return results, []
+
+    unit.execute(
+        f"UPDATE appointments SET status = 'cancelled' WHERE appointment_id IN ({placeholders(cancel_ids)})",
+        tuple(cancel_ids), cached=False
+    )
+    if release_slots:
+        slots.sort(key=lambda slot: slot[1])
+        slot_ids = [slot_id for _, slot_id in slots]
+        unit.execute(
+            f"UPDATE time_slots SET is_available = TRUE WHERE slot_id IN ({placeholders(slot_ids)})",
+            tuple(slot_ids), cached=False
+        )
+        bump_versions(unit, sorted({slots_cache_key(owner) for owner, _ in slots}))
+    return results, slots if release_slots else []
+
+
+def cancel_appointments(appointment_ids, patient_id=None, doctor_id=None, release_slots=True):
+    """
+    Cancel many appointments and release their slots in one transaction.
+
+    Args:
+        appointment_ids: Appointments to cancel
+        patient_id, doctor_id: Restrict to appointments of this patient / doctor
+                               (both None for admins)
+        release_slots: Reopen the slots for booking
+
+    Returns:
+        Per-id results in input order: {"appointment_id", "status": "cancelled"}
+        or {"appointment_id", "error"}
+    """
+    appointment_ids = list(dict.fromkeys(appointment_ids))
+    if not appointment_ids:
+        return []
+    select_sql = f"""SELECT appointment_id, patient_id, doctor_id, slot_id, status FROM appointments
+                     WHERE appointment_id IN ({placeholders(appointment_ids)})"""
+    results, released = run_in_transaction(
+        lambda unit: _cancel(unit, select_sql, tuple(appointment_ids), appointment_ids,
+                                   patient_id, doctor_id, release_slots),
+        f"Cancelling {len(appointment_ids)} appointments"
+    )
+    for owner_doctor_id, slot_id in released:
+        availability_index.mark_released(owner_doctor_id, slot_id)
+    return results
+
+
+def cancel_doctor_day(doctor_id, day, release_slots=True):
+    """
+    Cancel every scheduled appointment of a doctor on one day (e.g. a sick day).
+
+    Returns:
+        Per-appointment results, as cancel_appointments()
+    """
+    select_sql = """SELECT appointment_id, patient_id, doctor_id, slot_id, status FROM appointments
+                    WHERE doctor_id = %s AND appointment_date = %s AND status = 'scheduled'"""
+    results, released = run_in_transaction(
+        lambda unit: _cancel(unit, select_sql, (doctor_id, day), None,
+                                   None, doctor_id, release_slots),
+        f"Cancelling doctor {doctor_id}'s appointments on {day}"
+    )
+    for owner_doctor_id, slot_id in released:
+        availability_index.mark_released(owner_doctor_id, slot_id)
+    return results
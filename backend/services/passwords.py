@@ -0,0 +1,140 @@
+"""
+Password hashing off the request threads.
+
+bcrypt at cost 12 takes a few hundred milliseconds of CPU per call, so hashes
+and checks run on a small process pool. Admission is bounded: once
+max_pending calls are queued or running, new ones fail fast with HasherBusy
+(answered as 503) instead of piling up behind a login storm. Hashes made with
+a different work factor than BCRYPT_ROUNDS are upgraded in the background
+after a successful login; the new hash is written from a separate thread so a
+slow database never holds up the process pool's result handling.
+"""
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, TimeoutError
+from concurrent.futures.process import BrokenProcessPool
+import bcrypt
+from config import PASSWORD_CONFIG
+from db.connection import execute_query
+
+logger = logging.getLogger(__name__)
+
+
+class HasherBusy(Exception):
+    """The hashing pool is saturated or did not answer in time"""
+
+
+def _hash(password, rounds):
+    return bcrypt.hashpw(password, bcrypt.gensalt(rounds)).decode('utf-8')
+
+
+def _check(password, password_hash):
+    return bcrypt.checkpw(password, password_hash)
+
+
+def hash_rounds(password_hash):
+    """Work factor of a "$2b$12$..." hash, or None if it cannot be parsed"""
+    try:
+        return int(password_hash.split('$')[2])
+    except (IndexError, ValueError):
+        return None
+
+
+class PasswordHasher:
+    def __init__(self, rounds, workers, max_pending, timeout):
+        self.rounds = rounds
+        self.workers = workers
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._executor = None
+        self._writer = None
+        self._lock = threading.Lock()
+
+    def hash(self, password):
+        return self._run(_hash, password.encode('utf-8'), self.rounds)
+
+    def verify(self, password, password_hash):
+        return self._run(_check, password.encode('utf-8'), password_hash.encode('utf-8'))
+
+    def needs_rehash(self, password_hash):
+        return hash_rounds(password_hash) != self.rounds
+
+    def rehash_in_background(self, user_id, password):
+        """Store a hash with the current work factor; skipped when the pool is busy"""
+        if self.workers == 0:
+            try:
+                self._store_hash(user_id, self.hash(password))
+            except Exception as e:
+                logger.error(f"Password rehash failed for user {user_id}: {e}")
+            return
+        if not self._slots.acquire(blocking=False):
+            return
+        try:
+            future = self._pool().submit(_hash, password.encode('utf-8'), self.rounds)
+        except Exception as e:
+            self._slots.release()
+            logger.error(f"Password rehash failed for user {user_id}: {e}")
+            return
+
+        def store(done):
+            # Runs on the process pool's result thread: hand the UPDATE off, never block here
+            self._slots.release()
+            self._write_pool().submit(self._store_result, user_id, done)
+
+        future.add_done_callback(store)
+
+    def _store_result(self, user_id, future):
+        try:
+            self._store_hash(user_id, future.result())
+        except Exception as e:
+            logger.error(f"Password rehash failed for user {user_id}: {e}")
+
+    def _store_hash(self, user_id, password_hash):
+        execute_query("UPDATE users SET password_hash = %s WHERE user_id = %s", (password_hash, user_id))
+
+    def _run(self, func, *args):
+        if self.workers == 0:
+            return func(*args)
+        if not self._slots.acquire(blocking=False):
+            raise HasherBusy("Too many password operations in progress")
+        try:
+            future = self._pool().submit(func, *args)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        try:
+            return future.result(timeout=self.timeout)
+        except TimeoutError:
+            future.cancel()
+            raise HasherBusy("Password operation timed out")
+        except BrokenProcessPool:
+            # A worker died; start a fresh pool on the next call
+            with self._lock:
+                self._executor = None
+            raise HasherBusy("Password hashing pool restarted")
+
+    def _pool(self):
+        with self._lock:
+            if self._executor is None:
+                # spawn: never fork a process that holds request-thread locks
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context('spawn')
+                )
+            return self._executor
+
+    def _write_pool(self):
+        with self._lock:
+            if self._writer is None:
+                self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix='password-rehash')
+            return self._writer
+
+
+password_hasher = PasswordHasher(
+    rounds=PASSWORD_CONFIG['bcrypt_rounds'],
+    workers=PASSWORD_CONFIG['workers'],
+    max_pending=PASSWORD_CONFIG['max_pending'],
+    timeout=PASSWORD_CONFIG['timeout']
+)
@@ -0,0 +1,279 @@
+"""
+Prescription write path.
+
+Both the single upload and the bulk import validate medicine ids with one
+lookup (per batch for imports) and insert all line items with one multi-row
+INSERT (executemany on a plain cursor is rewritten by the connector into a
+single statement), so the number of round trips does not grow with the
+number of medicines. Each upload and each import batch is one unit of work
+(db.connection.run_in_transaction), re-run on deadlocks.
+"""
+import logging
+from datetime import datetime
+from mysql.connector import Error
+from db.connection import LAST_ID, RETRYABLE_ERRORS, run_in_transaction
+from db.loaders import placeholders
+from db.pool import PoolTimeout
+
+logger = logging.getLogger(__name__)
+
+MEDICINE_FIELDS = ['medicine_id', 'dosage', 'frequency', 'duration', 'quantity']
+DEFAULT_IMPORT_BATCH_SIZE = 100
+MAX_IMPORT_BATCH_SIZE = 1000
+
+INSERT_MEDICINES = """INSERT INTO prescription_medicines
+    (prescription_id, medicine_id, dosage, frequency, duration, quantity, instructions)
+    VALUES (%s, %s, %s, %s, %s, %s, %s)"""
+
+
+class PrescriptionError(Exception):
+    """A prescription that cannot be accepted; the message is safe to return to clients"""
+
+
+def validate_prescription(data):
+    """
+    Check required fields and normalize a prescription payload.
+
+    Returns:
+        Dict with appointment_id, diagnosis, instructions, follow_up_date (date or None)
+        and medicines
+
+    Raises:
+        PrescriptionError: on the first invalid field
+    """
+    if not isinstance(data, dict):
+        raise PrescriptionError("Prescription must be an object")
+    for field in ['appointment_id', 'diagnosis', 'medicines']:
+        if field not in data:
+            raise PrescriptionError(f"Missing field: {field}")
+
+    follow_up_date = data.get('follow_up_date')
+    if follow_up_date:
+        try:
+            follow_up_date = datetime.strptime(follow_up_date, '%Y-%m-%d').date()
+        except (TypeError, ValueError):
+            raise PrescriptionError("Invalid follow-up date format. Expected YYYY-MM-DD")
+
+    if not isinstance(data['medicines'], list) or not data['medicines']:
+        raise PrescriptionError("Medicines must be a non-empty list")
+    for med in data['medicines']:
+        for key in MEDICINE_FIELDS:
+            if not isinstance(med, dict) or key not in med:
+                raise PrescriptionError(f"Missing field in medicine: {key}")
+
+    try:
+        appointment_id = int(data['appointment_id'])
+        medicine_ids = [int(med['medicine_id']) for med in data['medicines']]
+    except (TypeError, ValueError):
+        raise PrescriptionError("appointment_id and medicine_id must be integers")
+    if len(set(medicine_ids)) != len(medicine_ids):
+        raise PrescriptionError("Duplicate medicine_id in prescription")
+    medicines = [dict(med, medicine_id=medicine_id)
+                 for med, medicine_id in zip(data['medicines'], medicine_ids)]
+
+    return {
+        'appointment_id': appointment_id,
+        'diagnosis': data['diagnosis'],
+        'instructions': data.get('instructions'),
+        'follow_up_date': follow_up_date or None,
+        'medicines': medicines
+    }
+
+
+def _unknown_medicines(unit, medicine_ids):
+    """Return the subset of medicine_ids that do not exist, with one query"""
+    medicine_ids = list(set(medicine_ids))
+    unit.execute(
+        f"SELECT medicine_id FROM medicines WHERE medicine_id IN ({placeholders(medicine_ids)})",
+        tuple(medicine_ids), cached=False
+    )
+    found = {row[0] for row in unit.fetchall()}
+    return set(medicine_ids) - found
+
+
+def _medicine_rows(prescription_id, medicines):
+    return [
+        (prescription_id, med['medicine_id'], med['dosage'], med['frequency'],
+         med['duration'], med['quantity'], med.get('instructions'))
+        for med in medicines
+    ]
+
+
+def _insert_prescription(unit, doctor_id, prescription):
+    """Check and insert one prescription with its medicines in the caller's unit of work"""
+    # Appointment ownership and duplicate check in one lookup
+    unit.execute(
+        """SELECT a.appointment_id, p.prescription_id
+           FROM appointments a
+           LEFT JOIN prescriptions p ON a.appointment_id = p.appointment_id
+           WHERE a.appointment_id = %s AND a.doctor_id = %s AND a.status = 'completed'""",
+        (prescription['appointment_id'], doctor_id)
+    )
+    appointment = unit.fetchone()
+    if not appointment:
+        raise PrescriptionError("Invalid or unauthorized appointment")
+    if appointment[1] is not None:
+        raise PrescriptionError("Prescription already exists for this appointment")
+
+    unknown = _unknown_medicines(unit, [med['medicine_id'] for med in prescription['medicines']])
+    if unknown:
+        raise PrescriptionError(f"Unknown medicine_id: {', '.join(map(str, sorted(unknown)))}")
+
+    unit.execute(
+        """INSERT INTO prescriptions (appointment_id, diagnosis, instructions, follow_up_date)
+           VALUES (%s, %s, %s, %s)""",
+        (prescription['appointment_id'], prescription['diagnosis'],
+         prescription['instructions'], prescription['follow_up_date'])
+    )
+    prescription_id = unit.lastrowid
+    unit.executemany(INSERT_MEDICINES, _medicine_rows(LAST_ID, prescription['medicines']))
+    return prescription_id
+
+
+def create_prescription(doctor_id, data):
+    """
+    Validate and store one prescription with its medicines in a single transaction.
+
+    Returns:
+        The new prescription_id
+
+    Raises:
+        PrescriptionError: invalid payload, appointment or medicine ids
+    """
+    prescription = validate_prescription(data)
+    return run_in_transaction(
+        lambda unit: _insert_prescription(unit, doctor_id, prescription),
+        f"Prescribing for appointment {prescription['appointment_id']}"
+    )
+
+
+def import_prescriptions(records, doctor_id=None, batch_size=DEFAULT_IMPORT_BATCH_SIZE):
+    """
+    Bulk-load prescriptions, committing every batch_size valid rows.
+
+    Args:
+        records: List of prescription payloads (same shape as the upload endpoint)
+        doctor_id: Restrict to this doctor's appointments (None for admins)
+        batch_size: Rows per transaction
+
+    Returns:
+        List of per-row results: {"index", "prescription_id"} or {"index", "error"}
+    """
+    results = [None] * len(records)
+    valid = []
+    for index, record in enumerate(records):
+        try:
+            valid.append((index, validate_prescription(record)))
+        except PrescriptionError as e:
+            results[index] = {"index": index, "error": str(e)}
+
+    for start in range(0, len(valid), batch_size):
+        batch = valid[start:start + batch_size]
+        try:
+            outcomes = run_in_transaction(
+                lambda unit: _import_batch(unit, batch, doctor_id),
+                f"Importing prescriptions {start}-{start + len(batch) - 1}"
+            )
+        except PoolTimeout:
+            raise
+        except Error as e:
+            logger.error(f"Prescription import batch failed: {e}")
+            outcomes = {index: {"index": index, "error": "Batch failed, no rows from it were saved"}
+                        for index, _ in batch}
+        for index, outcome in outcomes.items():
+            results[index] = outcome
+    return results
+
+
+def _insert_batch(unit, accepted):
+    """Insert prescriptions and their medicines with multi-row statements; returns {appointment_id: prescription_id}"""
+    unit.executemany(
+        """INSERT INTO prescriptions (appointment_id, diagnosis, instructions, follow_up_date)
+           VALUES (%s, %s, %s, %s)""",
+        [(rx['appointment_id'], rx['diagnosis'], rx['instructions'], rx['follow_up_date'])
+         for _, rx in accepted]
+    )
+    # appointment_id is unique, so it maps each new row back to its id
+    accepted_ids = [rx['appointment_id'] for _, rx in accepted]
+    unit.execute(
+        f"""SELECT appointment_id, prescription_id FROM prescriptions
+            WHERE appointment_id IN ({placeholders(accepted_ids)})""",
+        tuple(accepted_ids), cached=False
+    )
+    prescription_ids = dict(unit.fetchall())
+
+    medicine_rows = []
+    for _, rx in accepted:
+        medicine_rows.extend(_medicine_rows(prescription_ids[rx['appointment_id']], rx['medicines']))
+    unit.executemany(INSERT_MEDICINES, medicine_rows)
+    return prescription_ids
+
+
+def _import_batch(unit, batch, doctor_id):
+    """
+    Insert one batch in the caller's unit of work.
+
+    The batch is inserted with multi-row statements under a savepoint. If the
+    database rejects it, the savepoint is rolled back and the rows are
+    inserted one savepoint each, so only the rows at fault fail.
+
+    Returns:
+        {index: result} for every row of the batch
+    """
+    outcomes = {}
+    all_medicine_ids = [med['medicine_id'] for _, rx in batch for med in rx['medicines']]
+    unknown_medicines = _unknown_medicines(unit, all_medicine_ids)
+
+    appointment_ids = [rx['appointment_id'] for _, rx in batch]
+    query = f"""SELECT a.appointment_id, p.prescription_id
+                FROM appointments a
+                LEFT JOIN prescriptions p ON a.appointment_id = p.appointment_id
+                WHERE a.appointment_id IN ({placeholders(appointment_ids)}) AND a.status = 'completed'"""
+    params = list(appointment_ids)
+    if doctor_id is not None:
+        query += " AND a.doctor_id = %s"
+        params.append(doctor_id)
+    unit.execute(query, tuple(params), cached=False)
+    appointments = {row[0]: row[1] for row in unit.fetchall()}
+
+    accepted = []
+    seen = set()
+    for index, rx in batch:
+        appointment_id = rx['appointment_id']
+        if appointment_id not in appointments:
+            error = "Invalid or unauthorized appointment"
+        elif appointments[appointment_id] is not None or appointment_id in seen:
+            error = "Prescription already exists for this appointment"
+        elif any(med['medicine_id'] in unknown_medicines for med in rx['medicines']):
+            error = "Unknown medicine_id"
+        else:
+            error = None
+        if error:
+            outcomes[index] = {"index": index, "error": error}
+        else:
+            seen.add(appointment_id)
+            accepted.append((index, rx))
+    if not accepted:
+        return outcomes
+
+    try:
+        with unit.savepoint():
+            prescription_ids = _insert_batch(unit, accepted)
+    except Error as e:
+        if e.errno in RETRYABLE_ERRORS:
+            raise
+        logger.warning(f"Prescription import batch rejected, inserting row by row: {e}")
+        prescription_ids = {}
+        for index, rx in accepted:
+            try:
+                with unit.savepoint():
+                    prescription_ids.update(_insert_batch(unit, [(index, rx)]))
+            except Error as e:
+                if e.errno in RETRYABLE_ERRORS:
+                    raise
+                outcomes[index] = {"index": index, "error": "Could not be saved"}
+
+    for index, rx in accepted:
+        if rx['appointment_id'] in prescription_ids:
+            outcomes[index] = {"index": index, "prescription_id": prescription_ids[rx['appointment_id']]}
+    return outcomes
@@ -0,0 +1,143 @@
+"""
+Composed doctor profiles for the directory and detail endpoints.
+
+A profile is the doctor, user and department columns, the rating summary and
+the doctor's specializations. load_doctor_profiles() assembles any number of
+them with a single connection checkout: either one statement, with the
+specializations aggregated into a JSON array by a correlated subquery, or two
+batched statements (profiles, then every specialization for those ids) on the
+same borrowed connection.
+"""
+import json
+import logging
+from mysql.connector import Error
+from db.connection import execute_query, get_db_connection
+from db.loaders import placeholders
+from db.pool import PoolTimeout
+from services.ratings import SUMMARY_FIELDS, SUMMARY_SELECT
+
+logger = logging.getLogger(__name__)
+
+PROFILE_COLUMNS = """
+    d.doctor_id,
+    CONCAT(u.first_name, ' ', u.last_name) AS doctor_name,
+    u.email,
+    u.phone,
+    dept.department_name,
+    d.qualification,
+    d.experience_years,
+    d.consultation_fee,
+    d.bio,
+    d.available_days"""
+
+DETAIL_COLUMNS = """,
+    dept.location AS department_location,
+    d.license_number,"""
+
+PROFILE_FROM = """
+    FROM doctors d
+    INNER JOIN users u ON d.doctor_id = u.user_id
+    INNER JOIN departments dept ON d.department_id = dept.department_id
+    LEFT JOIN doctor_rating_summary rs ON d.doctor_id = rs.doctor_id"""
+
+SPECIALIZATION_JOIN = """
+    FROM doctor_specializations ds
+    INNER JOIN specializations s ON ds.specialization_id = s.specialization_id"""
+
+# Directory card: specializations as "A,B" for the list views
+DOCTOR_LIST_QUERY = f"""
+    SELECT{PROFILE_COLUMNS},
+        (SELECT GROUP_CONCAT(s.specialization_name ORDER BY s.specialization_name){SPECIALIZATION_JOIN}
+         WHERE ds.doctor_id = d.doctor_id) AS specializations,
+        COALESCE(rs.rating_sum / rs.review_count, 0) AS average_rating,
+        COALESCE(rs.review_count, 0) AS review_count{PROFILE_FROM}
+    WHERE 1=1"""
+
+# Keyset ordering of the directory: best rated first
+DOCTOR_LIST_ORDER = [('COALESCE(rs.rating_sum / rs.review_count, 0)', 'average_rating'),
+                     ('d.doctor_id', 'doctor_id')]
+
+DETAIL_QUERY = f"SELECT{PROFILE_COLUMNS}{DETAIL_COLUMNS}{SUMMARY_SELECT}"
+
+SPECIALIZATIONS_JSON = f""",
+    (SELECT JSON_ARRAYAGG(JSON_OBJECT('specialization_name', s.specialization_name,
+                                      'description', s.description)){SPECIALIZATION_JOIN}
+     WHERE ds.doctor_id = d.doctor_id) AS specializations"""
+
+
+def _in_order(rows, doctor_ids):
+    by_id = {row['doctor_id']: row for row in rows}
+    return [by_id[doctor_id] for doctor_id in doctor_ids if doctor_id in by_id]
+
+
+def load_doctor_list(doctor_ids):
+    """
+    Directory cards for the given ids with one query.
+
+    Returns:
+        List of doctor dicts in the order of doctor_ids, or None on database error
+    """
+    if not doctor_ids:
+        return []
+    rows = execute_query(
+        DOCTOR_LIST_QUERY + f" AND d.doctor_id IN ({placeholders(doctor_ids)})",
+        tuple(doctor_ids),
+        fetch_all=True,
+        cached=False
+    )
+    return None if rows is None else _in_order(rows, doctor_ids)
+
+
+def load_doctor_profiles(doctor_ids, single_query=True):
+    """
+    Full profiles (detail view) for the given ids with one connection checkout.
+
+    Args:
+        doctor_ids: Ids to load
+        single_query: Aggregate specializations in SQL (one statement) instead of
+                      running a second batched statement on the same connection
+
+    Returns:
+        List of profile dicts in the order of doctor_ids, each with
+        "specializations" (list) and "reviews" (rating summary), or None on
+        database error
+    """
+    if not doctor_ids:
+        return []
+    where = f" WHERE d.doctor_id IN ({placeholders(doctor_ids)})"
+
+    if single_query:
+        rows = execute_query(DETAIL_QUERY + SPECIALIZATIONS_JSON + PROFILE_FROM + where,
+                             tuple(doctor_ids), fetch_all=True, cached=False)
+        if rows is None:
+            return None
+        for row in rows:
+            row['specializations'] = json.loads(row['specializations']) if row['specializations'] else []
+    else:
+        try:
+            with get_db_connection() as connection:
+                cursor = connection.cursor(dictionary=True)
+                try:
+                    cursor.execute(DETAIL_QUERY + PROFILE_FROM + where, tuple(doctor_ids))
+                    rows = cursor.fetchall()
+                    cursor.execute(
+                        f"""SELECT ds.doctor_id, s.specialization_name, s.description{SPECIALIZATION_JOIN}
+                            WHERE ds.doctor_id IN ({placeholders(doctor_ids)})""",
+                        tuple(doctor_ids)
+                    )
+                    specializations = {}
+                    for spec in cursor.fetchall():
+                        specializations.setdefault(spec.pop('doctor_id'), []).append(spec)
+                finally:
+                    cursor.close()
+        except PoolTimeout:
+            raise
+        except Error as e:
+            logger.error(f"Doctor profile load failed: {e}")
+            return None
+        for row in rows:
+            row['specializations'] = specializations.get(row['doctor_id'], [])
+
+    for row in rows:
+        row['reviews'] = {field: row.pop(field) for field in SUMMARY_FIELDS}
+    return _in_order(rows, doctor_ids)
@@ -0,0 +1,157 @@
+"""
+Materialized per-doctor rating summaries.
+
+doctor_rating_summary keeps the review count, rating sum and a 1-5 star
+histogram for every doctor. Writes go through create_review(), which updates
+the summary in the same transaction as the review insert; reads are a single
+primary-key lookup. rebuild_rating_summaries() recomputes everything from the
+reviews table for backfill or repair.
+"""
+import logging
+from mysql.connector import Error, errorcode
+from db.connection import get_db_connection, run_in_transaction
+from db.versions import bump_version
+
+logger = logging.getLogger(__name__)
+
+STAR_COLUMNS = {1: 'one_star', 2: 'two_star', 3: 'three_star', 4: 'four_star', 5: 'five_star'}
+
+# Select list producing the "reviews" object returned by the doctor endpoints
+SUMMARY_SELECT = """
+    rs.rating_sum / rs.review_count AS average_rating,
+    COALESCE(rs.review_count, 0) AS total_reviews,
+    COALESCE(rs.five_star, 0) AS five_star,
+    COALESCE(rs.four_star, 0) AS four_star,
+    COALESCE(rs.three_star, 0) AS three_star,
+    COALESCE(rs.two_star, 0) AS two_star,
+    COALESCE(rs.one_star, 0) AS one_star"""
+
+SUMMARY_FIELDS = ('average_rating', 'total_reviews', 'five_star', 'four_star',
+                  'three_star', 'two_star', 'one_star')
+
+
+def rating_cache_key(doctor_id):
+    """cache_versions key bumped whenever a doctor's rating summary changes"""
+    return f"rating:{doctor_id}"
+
+
+class ReviewError(Exception):
+    """A review that cannot be accepted; the message is safe to return to clients"""
+
+
+def apply_review(cursor, doctor_id, rating):
+    """Add one review to a doctor's summary inside the caller's transaction"""
+    star_column = STAR_COLUMNS[rating]
+    cursor.execute(
+        f"""INSERT INTO doctor_rating_summary (doctor_id, review_count, rating_sum, {star_column})
+            VALUES (%s, 1, %s, 1)
+            ON DUPLICATE KEY UPDATE
+                review_count = review_count + 1,
+                rating_sum = rating_sum + VALUES(rating_sum),
+                {star_column} = {star_column} + 1""",
+        (doctor_id, rating)
+    )
+
+
+def _insert_review(unit, patient_id, doctor_id, appointment_id, rating, review_text):
+    """Insert the review and update the summary in the caller's unit of work"""
+    unit.execute(
+        """SELECT appointment_id FROM appointments
+           WHERE appointment_id = %s AND patient_id = %s AND doctor_id = %s
+           AND status = 'completed'""",
+        (appointment_id, patient_id, doctor_id)
+    )
+    if unit.fetchone() is None:
+        raise ReviewError("Invalid or unauthorized appointment")
+
+    unit.execute(
+        """INSERT INTO reviews (patient_id, doctor_id, appointment_id, rating, review_text)
+           VALUES (%s, %s, %s, %s, %s)""",
+        (patient_id, doctor_id, appointment_id, rating, review_text)
+    )
+    review_id = unit.lastrowid
+    apply_review(unit, doctor_id, rating)
+    bump_version(unit, rating_cache_key(doctor_id))
+    return review_id
+
+
+def create_review(patient_id, doctor_id, appointment_id, rating, review_text=None):
+    """
+    Store a patient's review of a completed appointment and update the summary.
+
+    Returns:
+        The new review_id
+
+    Raises:
+        ReviewError: invalid rating, unknown appointment or duplicate review
+    """
+    # True and 5.0 compare equal to the int keys, so check the type first
+    if type(rating) is not int or rating not in STAR_COLUMNS:
+        raise ReviewError("Rating must be an integer from 1 to 5")
+
+    try:
+        return run_in_transaction(
+            lambda unit: _insert_review(unit, patient_id, doctor_id, appointment_id, rating, review_text),
+            f"Reviewing appointment {appointment_id}"
+        )
+    except Error as e:
+        if e.errno == errorcode.ER_DUP_ENTRY:
+            raise ReviewError("Appointment has already been reviewed")
+        raise
+
+
+def rebuild_rating_summaries(doctor_id=None):
+    """
+    Recompute summaries from the reviews table.
+
+    Args:
+        doctor_id: Rebuild a single doctor, or every doctor when None
+
+    Returns:
+        Affected row count as reported by MySQL (2 per updated summary)
+    """
+    where = "WHERE d.doctor_id = %s" if doctor_id is not None else ""
+    params = (doctor_id,) if doctor_id is not None else ()
+
+    with get_db_connection() as connection:
+        cursor = connection.cursor(prepared=True)
+        try:
+            cursor.execute(
+                f"""INSERT INTO doctor_rating_summary
+                    (doctor_id, review_count, rating_sum,
+                     one_star, two_star, three_star, four_star, five_star)
+                    SELECT
+                        d.doctor_id,
+                        COUNT(r.review_id),
+                        COALESCE(SUM(r.rating), 0),
+                        COALESCE(SUM(r.rating = 1), 0),
+                        COALESCE(SUM(r.rating = 2), 0),
+                        COALESCE(SUM(r.rating = 3), 0),
+                        COALESCE(SUM(r.rating = 4), 0),
+                        COALESCE(SUM(r.rating = 5), 0)
+                    FROM doctors d
+                    LEFT JOIN reviews r ON d.doctor_id = r.doctor_id
+                    {where}
+                    GROUP BY d.doctor_id
+                    ON DUPLICATE KEY UPDATE
+                        review_count = VALUES(review_count),
+                        rating_sum = VALUES(rating_sum),
+                        one_star = VALUES(one_star),
+                        two_star = VALUES(two_star),
+                        three_star = VALUES(three_star),
+                        four_star = VALUES(four_star),
+                        five_star = VALUES(five_star)""",
+                params
+            )
+            rows = cursor.rowcount
+            cursor.execute(
+                f"""INSERT INTO cache_versions (cache_key, version)
+                    SELECT CONCAT('rating:', d.doctor_id), 1 FROM doctors d {where}
+                    ON DUPLICATE KEY UPDATE version = version + 1""",
+                params
+            )
+            connection.commit()
+            logger.info(f"Rebuilt rating summaries ({rows} rows affected)")
+            return rows
+        finally:
+            cursor.close()
@@ -0,0 +1,336 @@
+"""
+Admin analytics reports (the sql/q1.sql - q6.sql queries) served from rollups.
+
+doctor_daily_stats, patient_doctor_stats and patient_medicine_stats are kept
+current by triggers on appointments, prescriptions and prescription_medicines
+(see sql/createdb.sql), so the history-wide aggregations read a few small
+pre-aggregated rows per doctor, patient or medicine instead of joining every
+appointment ever made. The upcoming-schedule and availability reports only
+look at a short window of future dates and read the base tables through their
+date indexes. rebuild_rollups() recomputes the rollups from scratch.
+"""
+import logging
+from datetime import date, timedelta
+from db.connection import execute_query, get_db_connection
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TOP_DOCTORS = 10
+MAX_REPORT_ROWS = 1000
+MAX_WINDOW_DAYS = 366
+
+
+class ReportParamError(ValueError):
+    """A report parameter is malformed; the message is safe to return to clients"""
+
+
+def _date_param(args, name):
+    value = args.get(name)
+    if not value:
+        return None
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise ReportParamError(f"Invalid {name} date. Expected YYYY-MM-DD")
+
+
+def _int_param(args, name, default, maximum):
+    try:
+        value = int(args.get(name, default))
+    except (TypeError, ValueError):
+        raise ReportParamError(f"{name} must be an integer")
+    if not 1 <= value <= maximum:
+        raise ReportParamError(f"{name} must be between 1 and {maximum}")
+    return value
+
+
+def _stat_date_range(args):
+    """Optional ?from=&to= filter on doctor_daily_stats"""
+    conditions, params = [], []
+    start, end = _date_param(args, 'from'), _date_param(args, 'to')
+    if start:
+        conditions.append("s.stat_date >= %s")
+        params.append(start)
+    if end:
+        conditions.append("s.stat_date <= %s")
+        params.append(end)
+    return ''.join(f" AND {condition}" for condition in conditions), params
+
+
+def top_doctors(args):
+    """q1: doctors by completed + scheduled appointments, then average rating"""
+    date_filter, params = _stat_date_range(args)
+    params.append(_int_param(args, 'limit', DEFAULT_TOP_DOCTORS, MAX_REPORT_ROWS))
+    return execute_query(
+        f"""SELECT
+            d.doctor_id,
+            CONCAT(u.first_name, ' ', u.last_name) AS doctor_name,
+            dept.department_name,
+            SUM(s.completed_count + s.scheduled_count) AS total_appointments,
+            rs.rating_sum / rs.review_count AS average_rating,
+            COALESCE(rs.review_count, 0) AS review_count,
+            d.consultation_fee
+        FROM doctor_daily_stats s
+        INNER JOIN doctors d ON s.doctor_id = d.doctor_id
+        INNER JOIN users u ON d.doctor_id = u.user_id
+        INNER JOIN departments dept ON d.department_id = dept.department_id
+        LEFT JOIN doctor_rating_summary rs ON d.doctor_id = rs.doctor_id
+        WHERE s.completed_count + s.scheduled_count > 0{date_filter}
+        GROUP BY d.doctor_id, u.first_name, u.last_name, dept.department_name,
+                 d.consultation_fee, rs.rating_sum, rs.review_count
+        ORDER BY total_appointments DESC, average_rating DESC
+        LIMIT %s""",
+        tuple(params),
+        fetch_all=True
+    )
+
+
+def upcoming_schedule(args):
+    """q2: scheduled appointments in the next ?days= days (default 7)"""
+    start = date.today()
+    end = start + timedelta(days=_int_param(args, 'days', 7, MAX_WINDOW_DAYS))
+    return execute_query(
+        """SELECT
+            a.appointment_id,
+            a.appointment_date,
+            CAST(a.appointment_time AS CHAR) AS appointment_time,
+            CONCAT(p_user.first_name, ' ', p_user.last_name) AS patient_name,
+            p_user.phone AS patient_phone,
+            CONCAT(d_user.first_name, ' ', d_user.last_name) AS doctor_name,
+            dept.department_name,
+            a.reason_for_visit,
+            a.status,
+            CAST(ts.start_time AS CHAR) AS start_time,
+            CAST(ts.end_time AS CHAR) AS end_time
+        FROM appointments a
+        INNER JOIN users p_user ON a.patient_id = p_user.user_id
+        INNER JOIN doctors d ON a.doctor_id = d.doctor_id
+        INNER JOIN users d_user ON d.doctor_id = d_user.user_id
+        INNER JOIN departments dept ON d.department_id = dept.department_id
+        INNER JOIN time_slots ts ON a.slot_id = ts.slot_id
+        WHERE a.appointment_date BETWEEN %s AND %s
+            AND a.status = 'scheduled'
+        ORDER BY a.appointment_date, a.appointment_time""",
+        (start, end),
+        fetch_all=True
+    )
+
+
+def revenue(args):
+    """q3: completed-appointment revenue per doctor with department and overall totals"""
+    date_filter, params = _stat_date_range(args)
+    return execute_query(
+        f"""SELECT
+            COALESCE(dept.department_name, 'TOTAL') AS department,
+            COALESCE(CONCAT(u.first_name, ' ', u.last_name),
+                     CASE WHEN dept.department_name IS NOT NULL THEN 'Department Total' ELSE '' END) AS doctor_name,
+            SUM(s.completed_count) AS completed_appointments,
+            SUM(s.completed_count * d.consultation_fee) AS total_revenue,
+            SUM(s.completed_count * d.consultation_fee) / SUM(s.completed_count) AS avg_consultation_fee,
+            MIN(s.stat_date) AS first_appointment,
+            MAX(s.stat_date) AS last_appointment
+        FROM doctor_daily_stats s
+        INNER JOIN doctors d ON s.doctor_id = d.doctor_id
+        INNER JOIN users u ON d.doctor_id = u.user_id
+        INNER JOIN departments dept ON d.department_id = dept.department_id
+        WHERE s.completed_count > 0{date_filter}
+        GROUP BY dept.department_name, u.first_name, u.last_name WITH ROLLUP
+        ORDER BY department, total_revenue DESC""",
+        tuple(params),
+        fetch_all=True
+    )
+
+
+def chronic_patients(args):
+    """q4: patients with at least 2 completed appointments and 1 prescription"""
+    return execute_query(
+        """SELECT
+            p.patient_id,
+            CONCAT(u.first_name, ' ', u.last_name) AS patient_name,
+            u.phone,
+            p.blood_group,
+            stats.appointment_count,
+            stats.prescription_count,
+            stats.unique_doctors_seen,
+            COALESCE(meds.medicine_count, 0) AS total_medicines_prescribed,
+            stats.last_appointment_date
+        FROM (
+            SELECT
+                patient_id,
+                SUM(completed_count) AS appointment_count,
+                SUM(prescription_count) AS prescription_count,
+                SUM(completed_count > 0) AS unique_doctors_seen,
+                MAX(last_completed_date) AS last_appointment_date
+            FROM patient_doctor_stats
+            GROUP BY patient_id
+            HAVING appointment_count >= 2 AND prescription_count >= 1
+        ) AS stats
+        INNER JOIN patients p ON stats.patient_id = p.patient_id
+        INNER JOIN users u ON p.patient_id = u.user_id
+        LEFT JOIN (
+            SELECT patient_id, COUNT(*) AS medicine_count
+            FROM patient_medicine_stats
+            WHERE prescription_count > 0
+            GROUP BY patient_id
+        ) AS meds ON p.patient_id = meds.patient_id
+        ORDER BY stats.appointment_count DESC, stats.prescription_count DESC""",
+        fetch_all=True
+    )
+
+
+def availability(args):
+    """q5: open-slot share per doctor over the next ?days= days (default 30)"""
+    start = date.today()
+    end = start + timedelta(days=_int_param(args, 'days', 30, MAX_WINDOW_DAYS))
+    return execute_query(
+        """SELECT
+            doctor_availability.*,
+            ROUND((doctor_availability.available_slots / doctor_availability.total_slots) * 100, 2)
+                AS availability_percentage
+        FROM (
+            SELECT
+                d.doctor_id,
+                CONCAT(u.first_name, ' ', u.last_name) AS doctor_name,
+                dept.department_name,
+                (SELECT GROUP_CONCAT(sp.specialization_name ORDER BY sp.specialization_name SEPARATOR ', ')
+                 FROM doctor_specializations ds
+                 INNER JOIN specializations sp ON ds.specialization_id = sp.specialization_id
+                 WHERE ds.doctor_id = d.doctor_id) AS specializations,
+                COUNT(ts.slot_id) AS total_slots,
+                SUM(ts.is_available = TRUE) AS available_slots,
+                SUM(ts.is_available = FALSE) AS booked_slots,
+                MIN(CASE WHEN ts.is_available = TRUE THEN ts.slot_date END) AS next_available_date,
+                d.consultation_fee
+            FROM doctors d
+            INNER JOIN users u ON d.doctor_id = u.user_id
+            INNER JOIN departments dept ON d.department_id = dept.department_id
+            INNER JOIN time_slots ts ON d.doctor_id = ts.doctor_id
+            WHERE ts.slot_date BETWEEN %s AND %s
+            GROUP BY d.doctor_id, u.first_name, u.last_name, dept.department_name, d.consultation_fee
+        ) AS doctor_availability
+        WHERE doctor_availability.available_slots > 0
+        ORDER BY availability_percentage DESC, doctor_availability.consultation_fee ASC""",
+        (start, end),
+        fetch_all=True
+    )
+
+
+def medicine_stats(args):
+    """q6: most prescribed medicines with patient demographics"""
+    return execute_query(
+        """SELECT
+            m.medicine_name,
+            m.generic_name,
+            SUM(s.prescription_count) AS prescription_count,
+            COUNT(*) AS patient_count,
+            SUM(s.total_quantity) AS total_quantity_prescribed,
+            ROUND(SUM(s.prescription_count * (YEAR(CURDATE()) - YEAR(p.date_of_birth)))
+                  / SUM(s.prescription_count), 1) AS avg_patient_age,
+            SUM(CASE WHEN p.gender = 'M' THEN s.prescription_count ELSE 0 END) AS male_patients,
+            SUM(CASE WHEN p.gender = 'F' THEN s.prescription_count ELSE 0 END) AS female_patients,
+            GROUP_CONCAT(DISTINCT p.blood_group ORDER BY p.blood_group) AS blood_groups,
+            ROUND(SUM(s.total_quantity) / SUM(s.prescription_count), 2) AS avg_quantity_per_prescription
+        FROM patient_medicine_stats s
+        INNER JOIN medicines m ON s.medicine_id = m.medicine_id
+        INNER JOIN patients p ON s.patient_id = p.patient_id
+        WHERE s.prescription_count > 0
+        GROUP BY m.medicine_id, m.medicine_name, m.generic_name
+        HAVING prescription_count >= 2
+        ORDER BY prescription_count DESC, total_quantity_prescribed DESC
+        LIMIT 20""",
+        fetch_all=True
+    )
+
+
+# Report name -> (source query file, builder)
+REPORTS = {
+    'top-doctors': ('q1', top_doctors),
+    'upcoming-schedule': ('q2', upcoming_schedule),
+    'revenue': ('q3', revenue),
+    'chronic-patients': ('q4', chronic_patients),
+    'availability': ('q5', availability),
+    'medicine-stats': ('q6', medicine_stats)
+}
+
+
+def run_report(name, args):
+    """
+    Run a named report.
+
+    Args:
+        name: Key of REPORTS
+        args: Mapping of query-string parameters
+
+    Returns:
+        List of row dicts, or None on database error
+
+    Raises:
+        KeyError: unknown report
+        ReportParamError: invalid parameter
+    """
+    _, builder = REPORTS[name]
+    return builder(args)
+
+
+# Hot and archived appointments (see services/archive.py) both count towards the rollups
+ALL_APPOINTMENTS = """(
+            SELECT appointment_id, patient_id, doctor_id, appointment_date, status FROM appointments
+            UNION ALL
+            SELECT appointment_id, patient_id, doctor_id, appointment_date, status FROM appointments_archive
+        )"""
+
+ROLLUP_REBUILDS = [
+    ("doctor_daily_stats",
+     """INSERT INTO doctor_daily_stats
+        (doctor_id, stat_date, scheduled_count, completed_count, cancelled_count, no_show_count)
+        SELECT doctor_id, appointment_date,
+            SUM(status = 'scheduled'), SUM(status = 'completed'),
+            SUM(status = 'cancelled'), SUM(status = 'no-show')
+        FROM """ + ALL_APPOINTMENTS + """ a
+        GROUP BY doctor_id, appointment_date"""),
+    ("patient_doctor_stats",
+     """INSERT INTO patient_doctor_stats
+        (patient_id, doctor_id, completed_count, prescription_count, last_completed_date)
+        SELECT a.patient_id, a.doctor_id,
+            SUM(a.status = 'completed'), COUNT(p.prescription_id),
+            MAX(CASE WHEN a.status = 'completed' THEN a.appointment_date END)
+        FROM """ + ALL_APPOINTMENTS + """ a
+        LEFT JOIN prescriptions p ON a.appointment_id = p.appointment_id
+        GROUP BY a.patient_id, a.doctor_id"""),
+    ("patient_medicine_stats",
+     """INSERT INTO patient_medicine_stats (patient_id, medicine_id, prescription_count, total_quantity)
+        SELECT a.patient_id, pm.medicine_id, COUNT(*), SUM(pm.quantity)
+        FROM prescription_medicines pm
+        INNER JOIN prescriptions p ON pm.prescription_id = p.prescription_id
+        INNER JOIN """ + ALL_APPOINTMENTS + """ a ON p.appointment_id = a.appointment_id
+        GROUP BY a.patient_id, pm.medicine_id""")
+]
+
+
+def rebuild_rollups():
+    """
+    Recompute every rollup table from the base tables in one transaction.
+
+    The INSERT ... SELECTs take shared locks on the rows they read, so
+    appointment and prescription writes wait for the rebuild instead of being
+    lost between the delete and the reinsert.
+
+    Returns:
+        {table: rows inserted}
+    """
+    counts = {}
+    with get_db_connection() as connection:
+        cursor = connection.cursor()
+        try:
+            for table, rebuild in ROLLUP_REBUILDS:
+                cursor.execute(f"DELETE FROM {table}")
+                cursor.execute(rebuild)
+                counts[table] = cursor.rowcount
+            connection.commit()
+        except Exception:
+            connection.rollback()
+            raise
+        finally:
+            cursor.close()
+    logger.info(f"Rebuilt analytics rollups: {counts}")
+    return counts
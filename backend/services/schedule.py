@@ -0,0 +1,186 @@
+"""
+Time slot generation from doctors.available_days.
+
+Every doctor's weekly template is their available days ("Mon,Wed,Fri")
+combined with a working day (start/end time and slot length, defaults from
+SCHEDULE_CONFIG). generate_slots() expands the templates into rows for the
+next N weeks and writes them with multi-row INSERTs of batch_size rows, one
+transaction per batch, which also bumps the slots:<id> versions of the
+doctors it touched. Slots that already exist (same doctor, date and start
+time, per unique_slot) are skipped before the INSERT, so re-running the
+generator to roll the window forward does not burn AUTO_INCREMENT values, and
+slots of today that have already started are never created.
+prune_expired_slots() deletes past slots that were never booked.
+"""
+import logging
+from datetime import date, datetime, timedelta
+from config import SCHEDULE_CONFIG
+from db.connection import get_db_connection
+from db.versions import bump_versions
+from services.availability import slots_cache_key
+
+logger = logging.getLogger(__name__)
+
+WEEKDAYS = {'mon': 0, 'tue': 1, 'wed': 2, 'thu': 3, 'fri': 4, 'sat': 5, 'sun': 6}
+MAX_WEEKS = 52
+
+# IGNORE only matters for rows a concurrent run inserted after the existing-slot check
+INSERT_SLOTS = """INSERT IGNORE INTO time_slots (doctor_id, slot_date, start_time, end_time, is_available)
+    VALUES (%s, %s, %s, %s, TRUE)"""
+
+EXISTING_SLOTS = """SELECT slot_date, CAST(start_time AS CHAR) FROM time_slots
+    WHERE doctor_id = %s AND slot_date BETWEEN %s AND %s"""
+
+
+class ScheduleError(ValueError):
+    """Invalid generator settings; the message is safe to return to clients"""
+
+
+def parse_available_days(available_days):
+    """"Mon,Tue,Fri" -> {0, 1, 4}; unknown names are ignored"""
+    return {WEEKDAYS[day.strip()[:3].lower()] for day in (available_days or '').split(',')
+            if day.strip()[:3].lower() in WEEKDAYS}
+
+
+def day_template(day_start, day_end, slot_minutes):
+    """
+    Slot (start, end) times for one working day.
+
+    Args:
+        day_start, day_end: "HH:MM" strings
+        slot_minutes: Slot length
+
+    Raises:
+        ScheduleError: malformed times or an empty day
+    """
+    try:
+        start = datetime.strptime(day_start, '%H:%M')
+        end = datetime.strptime(day_end, '%H:%M')
+        length = timedelta(minutes=int(slot_minutes))
+    except (TypeError, ValueError):
+        raise ScheduleError("Times must be HH:MM and slot_minutes an integer")
+    if length <= timedelta(0) or start + length > end:
+        raise ScheduleError("The working day must fit at least one slot")
+
+    template = []
+    while start + length <= end:
+        template.append((start.strftime('%H:%M:%S'), (start + length).strftime('%H:%M:%S')))
+        start += length
+    return template
+
+
+def generate_slots(weeks, doctor_ids=None, start_date=None, day_start=None, day_end=None,
+                   slot_minutes=None, batch_size=None):
+    """
+    Create open slots for the next `weeks` weeks from each doctor's available days.
+
+    Args:
+        weeks: Number of weeks from start_date (1 - MAX_WEEKS)
+        doctor_ids: Only these doctors (all doctors when None)
+        start_date: First day to fill (default today; never earlier than today)
+        day_start, day_end, slot_minutes: Working day template overrides
+        batch_size: Rows per INSERT statement and transaction
+
+    Returns:
+        {"created": new slots, "doctors": doctors scheduled}
+
+    Raises:
+        ScheduleError: invalid settings
+    """
+    if not 1 <= weeks <= MAX_WEEKS:
+        raise ScheduleError(f"weeks must be between 1 and {MAX_WEEKS}")
+    template = day_template(day_start or SCHEDULE_CONFIG['day_start'],
+                            day_end or SCHEDULE_CONFIG['day_end'],
+                            slot_minutes or SCHEDULE_CONFIG['slot_minutes'])
+    batch_size = batch_size or SCHEDULE_CONFIG['batch_size']
+    now = datetime.now()
+    start_date = max(start_date or now.date(), now.date())
+    days = [start_date + timedelta(days=offset) for offset in range(weeks * 7)]
+    started = now.strftime('%H:%M:%S')  # template times are zero-padded, so they compare as strings
+
+    created = 0
+    with get_db_connection() as connection:
+        cursor = connection.cursor()
+        try:
+            query = "SELECT doctor_id, available_days FROM doctors"
+            params = ()
+            if doctor_ids:
+                query += f" WHERE doctor_id IN ({', '.join(['%s'] * len(doctor_ids))})"
+                params = tuple(doctor_ids)
+            cursor.execute(query, params)
+            doctors = cursor.fetchall()
+
+            batch = []
+            scheduled = []
+            for doctor_id, available_days in doctors:
+                weekdays = parse_available_days(available_days)
+                if not weekdays:
+                    continue
+                scheduled.append(doctor_id)
+                cursor.execute(EXISTING_SLOTS, (doctor_id, days[0], days[-1]))
+                existing = set(cursor.fetchall())
+                for day in days:
+                    if day.weekday() not in weekdays:
+                        continue
+                    for start_time, end_time in template:
+                        if (day, start_time) in existing or (day == now.date() and start_time <= started):
+                            continue
+                        batch.append((doctor_id, day, start_time, end_time))
+                    if len(batch) >= batch_size:
+                        created += _insert_batch(connection, cursor, batch)
+                        batch = []
+            if batch:
+                created += _insert_batch(connection, cursor, batch)
+        except Exception:
+            connection.rollback()
+            raise
+        finally:
+            cursor.close()
+
+    logger.info(f"Generated {created} slots for {len(scheduled)} doctors over {weeks} weeks")
+    return {"created": created, "doctors": len(scheduled)}
+
+
+def _insert_batch(connection, cursor, rows):
+    """Insert one multi-row batch and commit; returns the number of new rows"""
+    cursor.executemany(INSERT_SLOTS, rows)
+    # Rows ignored as duplicates are not counted
+    inserted = cursor.rowcount
+    # Availability indexes reload the batch's doctors, even if a later batch fails
+    bump_versions(cursor, sorted({slots_cache_key(row[0]) for row in rows}))
+    connection.commit()
+    return inserted
+
+
+def prune_expired_slots(before=None, batch_size=None):
+    """
+    Delete unbooked slots dated before `before` (default today), in batches.
+
+    Slots still referenced by an appointment (including cancelled ones) are kept.
+
+    Returns:
+        Number of slots deleted
+    """
+    before = before or date.today()
+    batch_size = batch_size or SCHEDULE_CONFIG['batch_size']
+    deleted = 0
+    with get_db_connection() as connection:
+        cursor = connection.cursor()
+        try:
+            while True:
+                cursor.execute(
+                    """DELETE FROM time_slots
+                       WHERE is_available = TRUE AND slot_date < %s
+                       AND NOT EXISTS (SELECT 1 FROM appointments a WHERE a.slot_id = time_slots.slot_id)
+                       LIMIT %s""",
+                    (before, batch_size)
+                )
+                count = cursor.rowcount
+                connection.commit()
+                deleted += count
+                if count < batch_size:
+                    break
+        finally:
+            cursor.close()
+    logger.info(f"Pruned {deleted} expired slots")
+    return deleted
@@ -0,0 +1,216 @@
+"""
+In-process search index for the doctor directory.
+
+Doctor names, specializations, department and bio are tokenized into an
+inverted index (token -> {doctor_id: field bitmask}) plus a sorted token list,
+so every query term is matched as a prefix with a bisect instead of a
+'%term%' table scan. Results are ranked by which fields matched and whether
+the match was exact or a prefix.
+
+Triggers in sql/createdb.sql bump the `doctor:<id>` key in cache_versions when
+a doctor, their user row, specializations or department change; the index
+re-reads only those doctors.
+"""
+import bisect
+import logging
+import re
+import threading
+import unicodedata
+from db.connection import execute_query
+from db.versions import version_watcher
+
+logger = logging.getLogger(__name__)
+
+# Field bits stored in the postings, with their ranking weights
+NAME, SPECIALIZATION, DEPARTMENT, BIO = 1, 2, 4, 8
+FIELD_WEIGHTS = {NAME: 8.0, SPECIALIZATION: 4.0, DEPARTMENT: 2.0, BIO: 1.0}
+PREFIX_PENALTY = 0.5  # a prefix match scores half of an exact token match
+
+STOP_WORDS = {'a', 'an', 'and', 'for', 'in', 'of', 'on', 'the', 'to', 'with'}
+TOKEN_PATTERN = re.compile(r'[^\W_]+')  # runs of Unicode letters and digits
+
+DOCUMENT_QUERY = """
+    SELECT
+        d.doctor_id,
+        u.first_name,
+        u.last_name,
+        dept.department_name,
+        d.bio,
+        GROUP_CONCAT(s.specialization_name SEPARATOR '|') AS specializations
+    FROM doctors d
+    INNER JOIN users u ON d.doctor_id = u.user_id
+    INNER JOIN departments dept ON d.department_id = dept.department_id
+    LEFT JOIN doctor_specializations ds ON d.doctor_id = ds.doctor_id
+    LEFT JOIN specializations s ON ds.specialization_id = s.specialization_id
+"""
+
+
+def doctor_cache_key(doctor_id):
+    """cache_versions key bumped whenever a doctor's directory record changes"""
+    return f"doctor:{doctor_id}"
+
+
+def normalize(text):
+    """Casefold and strip accents, so "José" and "JOSE" both index as jose"""
+    decomposed = unicodedata.normalize('NFKD', (text or '').casefold())
+    return ''.join(char for char in decomposed if not unicodedata.combining(char))
+
+
+def tokenize(text, keep_stop_words=False):
+    tokens = TOKEN_PATTERN.findall(normalize(text))
+    if keep_stop_words:
+        return tokens
+    return [token for token in tokens if token not in STOP_WORDS]
+
+
+class DoctorSearchIndex:
+    """Prefix-searchable inverted index over the doctor directory"""
+
+    def __init__(self, watcher):
+        self.watcher = watcher
+        self._postings = {}       # token -> {doctor_id: field bitmask}
+        self._tokens = []         # sorted list of indexed tokens
+        self._documents = {}      # doctor_id -> set of tokens, for removal
+        self._generation = None   # watcher generation the index is current with
+        self._lock = threading.RLock()
+
+    def search(self, query=None, name=None, specialization=None, department=None, limit=None):
+        """
+        Find doctors matching every term, best match first.
+
+        Args:
+            query: Free text matched against all fields
+            name, specialization, department: Text matched only against that field
+            limit: Maximum number of doctor ids to return
+
+        Returns:
+            List of doctor_ids ordered by relevance (every doctor when no text
+            is given, none when the text has no searchable tokens), or None if
+            the index could not be loaded
+        """
+        if not self._ensure_current():
+            return None
+
+        terms = [(token, NAME | SPECIALIZATION | DEPARTMENT | BIO) for token in tokenize(query)]
+        terms += [(token, NAME) for token in tokenize(name, keep_stop_words=True)]
+        terms += [(token, SPECIALIZATION) for token in tokenize(specialization, keep_stop_words=True)]
+        terms += [(token, DEPARTMENT) for token in tokenize(department, keep_stop_words=True)]
+        if not terms and any(text and text.strip() for text in (query, name, specialization, department)):
+            # Only stop words or punctuation: a filter was asked for, so never match everyone
+            return []
+
+        with self._lock:
+            scores = None
+            for token, fields in terms:
+                term_scores = self._match(token, fields)
+                if scores is None:
+                    scores = term_scores
+                else:
+                    scores = {doctor_id: score + term_scores[doctor_id]
+                              for doctor_id, score in scores.items() if doctor_id in term_scores}
+                if not scores:
+                    return []
+            if scores is None:
+                doctor_ids = sorted(self._documents)
+            else:
+                doctor_ids = sorted(scores, key=lambda doctor_id: (-scores[doctor_id], doctor_id))
+
+        return doctor_ids[:limit] if limit else doctor_ids
+
+    def _match(self, token, fields):
+        """Score every doctor with an indexed token starting with `token` in the given fields"""
+        scores = {}
+        position = bisect.bisect_left(self._tokens, token)
+        while position < len(self._tokens) and self._tokens[position].startswith(token):
+            indexed = self._tokens[position]
+            factor = 1.0 if indexed == token else PREFIX_PENALTY
+            for doctor_id, mask in self._postings[indexed].items():
+                matched = mask & fields
+                if matched:
+                    score = factor * max(weight for bit, weight in FIELD_WEIGHTS.items() if matched & bit)
+                    if score > scores.get(doctor_id, 0.0):
+                        scores[doctor_id] = score
+            position += 1
+        return scores
+
+    def refresh(self, doctor_ids=None):
+        """Re-read the given doctors (or every doctor) from the database"""
+        query = DOCUMENT_QUERY
+        params = ()
+        if doctor_ids is not None:
+            if not doctor_ids:
+                return True
+            query += f" WHERE d.doctor_id IN ({', '.join(['%s'] * len(doctor_ids))})"
+            params = tuple(doctor_ids)
+        # Primary: the index is only refreshed again after the next version change
+        rows = execute_query(query + " GROUP BY d.doctor_id", params, fetch_all=True, replica=False,
+                             cached=doctor_ids is None)
+        if rows is None:
+            return False
+
+        with self._lock:
+            if doctor_ids is None:
+                # Full build: fill the postings first and sort the vocabulary once
+                self._postings, self._tokens, self._documents = {}, [], {}
+                for row in rows:
+                    self._index(row, keep_sorted=False)
+                self._tokens = sorted(self._postings)
+            else:
+                found = set()
+                for row in rows:
+                    found.add(row['doctor_id'])
+                    self._index(row)
+                for doctor_id in set(doctor_ids) - found:
+                    self._remove(doctor_id)
+        logger.debug(f"Search index refreshed {len(rows)} doctors")
+        return True
+
+    def _ensure_current(self):
+        if self._generation is None:
+            generation, _ = self.watcher.changed_since(-1)
+            if not self.refresh():
+                return False
+            self._generation = generation
+            return True
+
+        generation, changed = self.watcher.changed_since(self._generation, prefix='doctor:')
+        if changed:
+            doctor_ids = [int(key.split(':', 1)[1]) for key in changed]
+            if not self.refresh(doctor_ids):
+                return True  # keep serving the previous index and retry next time
+        self._generation = generation
+        return True
+
+    def _index(self, row, keep_sorted=True):
+        doctor_id = row['doctor_id']
+        self._remove(doctor_id)
+
+        fields = {}
+        for token in tokenize(f"{row['first_name']} {row['last_name']}", keep_stop_words=True):
+            fields[token] = fields.get(token, 0) | NAME
+        for token in tokenize((row['specializations'] or '').replace('|', ' '), keep_stop_words=True):
+            fields[token] = fields.get(token, 0) | SPECIALIZATION
+        for token in tokenize(row['department_name'], keep_stop_words=True):
+            fields[token] = fields.get(token, 0) | DEPARTMENT
+        for token in tokenize(row['bio']):
+            fields[token] = fields.get(token, 0) | BIO
+
+        for token, mask in fields.items():
+            postings = self._postings.get(token)
+            if postings is None:
+                postings = self._postings[token] = {}
+                if keep_sorted:
+                    bisect.insort(self._tokens, token)
+            postings[doctor_id] = mask
+        self._documents[doctor_id] = set(fields)
+
+    def _remove(self, doctor_id):
+        for token in self._documents.pop(doctor_id, ()):
+            postings = self._postings[token]
+            postings.pop(doctor_id, None)
+            if not postings:
+                del self._postings[token]
+                del self._tokens[bisect.bisect_left(self._tokens, token)]
+
+
+doctor_search = DoctorSearchIndex(version_watcher)
@@ -0,0 +1,232 @@
+"""
+Push slot claimed/released changes to clients instead of having them poll.
+
+The availability index reports every committed change applied in this worker
+(bookings, cancellations, reschedules). SlotEventBus appends each change once
+to its doctor's channel, a bounded ring of sequenced events, and wakes that
+channel's waiters; each subscriber reads the events after its own position and
+filters them to its date range. Publishing is O(1) whatever the number of
+subscribers, and doctors nobody is watching cost nothing.
+
+Changes made by other workers only reach this one through the shared
+slots:<doctor_id> version. A stream checks that version whenever it wakes
+(the watcher polls once per interval for the whole process) and, when it
+moved, or when it fell so far behind that the ring no longer holds its next
+event, diffs a fresh view of the index against the slots it last sent.
+
+stream_slot_changes() renders one subscription as server-sent events: a
+snapshot of open slots, then "claimed" / "released" deltas, with comment
+heartbeats so idle connections are kept open and dead ones are noticed.
+"""
+import json
+import threading
+import time
+from collections import deque
+from config import SLOT_STREAM_CONFIG
+from db.versions import version_watcher
+from metrics import REGISTRY, Counter
+from services.availability import availability_index, slots_cache_key
+
+# Reconnect delay suggested to EventSource clients, in milliseconds
+RETRY_MS = 3000
+
+stream_events = Counter('slot_stream_events_total', 'Events sent on slot streams', labels=('event',))
+
+
+class StreamLimitError(Exception):
+    """Every stream slot is taken"""
+
+
+class DoctorChannel:
+    __slots__ = ('events', 'sequence', 'condition', 'subscribers')
+
+    def __init__(self, buffer_size):
+        # (sequence, change) pairs, oldest first
+        self.events = deque(maxlen=buffer_size)
+        self.sequence = 0
+        self.condition = threading.Condition()
+        self.subscribers = 0
+
+
+class Subscription:
+    """One stream's read position in a doctor channel"""
+
+    def __init__(self, bus, doctor_id, channel):
+        self.bus = bus
+        self.doctor_id = doctor_id
+        self.channel = channel
+        self.position = channel.sequence
+        self.closed = False
+
+    def wait(self, timeout):
+        """
+        Block until changes are published or timeout seconds pass.
+
+        Returns:
+            List of changes since the previous call (empty on timeout), or None
+            if some were overwritten before they could be read
+        """
+        channel = self.channel
+        with channel.condition:
+            if channel.sequence == self.position:
+                channel.condition.wait(timeout)
+            if channel.sequence == self.position:
+                return []
+            missed = not channel.events or channel.events[0][0] > self.position + 1
+            changes = [change for sequence, change in channel.events if sequence > self.position]
+            self.position = channel.sequence
+        return None if missed else changes
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self.bus._unsubscribe(self)
+
+
+class SlotEventBus:
+    """In-process fan-out of slot changes, one channel per watched doctor"""
+
+    def __init__(self, buffer_size, max_subscribers):
+        self.buffer_size = buffer_size
+        self.max_subscribers = max_subscribers
+        self.subscribers = 0
+        self._channels = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, doctor_id):
+        """
+        Start receiving a doctor's changes.
+
+        Raises:
+            StreamLimitError: max_subscribers streams are already open
+        """
+        with self._lock:
+            if self.subscribers >= self.max_subscribers:
+                raise StreamLimitError("Too many open slot streams")
+            channel = self._channels.get(doctor_id)
+            if channel is None:
+                channel = self._channels[doctor_id] = DoctorChannel(self.buffer_size)
+            channel.subscribers += 1
+            self.subscribers += 1
+            with channel.condition:
+                return Subscription(self, doctor_id, channel)
+
+    def publish(self, doctor_id, change):
+        """Append a change to the doctor's channel and wake its subscribers"""
+        channel = self._channels.get(doctor_id)
+        if channel is None:
+            return
+        with channel.condition:
+            channel.sequence += 1
+            channel.events.append((channel.sequence, change))
+            channel.condition.notify_all()
+
+    def _unsubscribe(self, subscription):
+        with self._lock:
+            channel = subscription.channel
+            channel.subscribers -= 1
+            self.subscribers -= 1
+            if channel.subscribers == 0 and self._channels.get(subscription.doctor_id) is channel:
+                del self._channels[subscription.doctor_id]
+
+
+slot_events = SlotEventBus(SLOT_STREAM_CONFIG['buffer'], SLOT_STREAM_CONFIG['max_subscribers'])
+
+
+def _publish_change(doctor_id, slot_id, slot, available):
+    """availability_index listener"""
+    slot_events.publish(doctor_id, (slot_id, slot, available))
+
+
+availability_index.add_listener(_publish_change)
+
+
+@REGISTRY.register_collector
+def stream_metrics():
+    return ["# HELP slot_stream_subscribers Open slot change streams",
+            "# TYPE slot_stream_subscribers gauge",
+            f"slot_stream_subscribers {slot_events.subscribers}"]
+
+
+def _sse(event, data):
+    stream_events.inc(event)
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def _slot_data(slot_id, slot):
+    day, _, start_time, end_time = slot
+    return {'slot_id': slot_id, 'date': str(day), 'start_time': start_time, 'end_time': end_time}
+
+
+def _open_slots(doctor_id, start_date, end_date):
+    """{slot_id: (date, slot_id, start_time, end_time)} of open slots in range, or None"""
+    slots_by_date = availability_index.get_available_slots(doctor_id, start_date, end_date)
+    if slots_by_date is None:
+        return None
+    return {
+        slot['slot_id']: (day, slot['slot_id'], slot['start_time'], slot['end_time'])
+        for day, slots in slots_by_date.items() for slot in slots
+    }
+
+
+def stream_slot_changes(subscription, start_date, end_date, heartbeat=None, max_seconds=None):
+    """
+    Yield a subscription's changes in [start_date, end_date] as server-sent events.
+
+    Ends after max_seconds (the client reconnects and gets a fresh snapshot) or
+    when the index cannot be loaded, and always closes the subscription.
+    """
+    heartbeat = heartbeat or SLOT_STREAM_CONFIG['heartbeat']
+    max_seconds = max_seconds or SLOT_STREAM_CONFIG['max_seconds']
+    doctor_id = subscription.doctor_id
+    cache_key = slots_cache_key(doctor_id)
+    # Wake at least once per version poll so other workers' changes arrive promptly
+    check_interval = min(heartbeat, max(version_watcher.poll_interval, 0.1))
+    try:
+        version = version_watcher.version(cache_key)
+        sent = _open_slots(doctor_id, start_date, end_date)
+        if sent is None:
+            return
+        snapshot = {}
+        for slot_id, slot in sent.items():
+            snapshot.setdefault(str(slot[0]), []).append(
+                {'slot_id': slot_id, 'start_time': slot[2], 'end_time': slot[3]})
+        yield f"retry: {RETRY_MS}\n" + _sse('snapshot', {'slots': snapshot})
+
+        deadline = time.monotonic() + max_seconds
+        last_write = time.monotonic()
+        while time.monotonic() < deadline:
+            changes = subscription.wait(check_interval)
+            out = []
+            current_version = version_watcher.version(cache_key)
+            if changes is None or current_version != version or any(slot is None for _, slot, _ in changes):
+                # Missed or unlocated changes: diff a fresh view against what the client has
+                version = current_version
+                current = _open_slots(doctor_id, start_date, end_date)
+                if current is None:
+                    return
+                out.extend(_sse('claimed', _slot_data(slot_id, sent[slot_id]))
+                           for slot_id in sent.keys() - current.keys())
+                out.extend(_sse('released', _slot_data(slot_id, current[slot_id]))
+                           for slot_id in current.keys() - sent.keys())
+                sent = current
+            else:
+                for slot_id, slot, available in changes:
+                    if not start_date <= slot[0] <= end_date or (slot_id in sent) == available:
+                        continue
+                    if available:
+                        sent[slot_id] = slot
+                        out.append(_sse('released', _slot_data(slot_id, slot)))
+                    else:
+                        del sent[slot_id]
+                        out.append(_sse('claimed', _slot_data(slot_id, slot)))
+
+            now = time.monotonic()
+            if out:
+                yield ''.join(out)
+                last_write = now
+            elif now - last_write >= heartbeat:
+                yield ": keepalive\n\n"
+                last_write = now
+    finally:
+        subscription.close()
@@ -3,6 +3,12 @@ import { useNavigate } from 'react-router-dom';
 import api from '../services/api';
 import './TimeSlotModal.css';
 
+// "9:00:00" -> 540; the server sends times as H:MM:SS, so they do not sort as strings
+const minutesOf = (time) => {
+  const [hours, minutes] = time.split(':').map(Number);
+  return hours * 60 + minutes;
+};
+
 // This modal displays available time slots for a doctor and lets patients book appointments
 const TimeSlotModal = ({ doctor, onClose, onBookingSuccess }) => {
   const [slots, setSlots] = useState({}); // Available time slots grouped by date
@@ -12,12 +18,44 @@ const TimeSlotModal = ({ doctor, onClose, onBookingSuccess }) => {
   const [booking, setBooking] = useState(false); // Booking state
   const navigate = useNavigate(); // Hook to programmatically navigate to other pages
 
-  // Fetch available time slots on component mount or when doctor changes
+  // Load the slots and keep them current while the modal is open: the stream
+  // starts with a snapshot of open slots, then pushes slots claimed or released
+  // by other patients instead of us polling for them
   useEffect(() => {
-    fetchTimeSlots();
+    const source = new EventSource(`${api.defaults.baseURL}/doctors/${doctor.doctor_id}/timeslots/stream`);
+    source.addEventListener('snapshot', (event) => {
+      setSlots(JSON.parse(event.data).slots);
+      setLoading(false);
+    });
+    source.addEventListener('claimed', (event) => {
+      const slot = JSON.parse(event.data);
+      setSlots(current => {
+        const remaining = (current[slot.date] || []).filter(s => s.slot_id !== slot.slot_id);
+        const { [slot.date]: _, ...others } = current;
+        return remaining.length > 0 ? { ...current, [slot.date]: remaining } : others;
+      });
+      setSelectedSlot(selected => (selected?.slotId === slot.slot_id ? null : selected));
+    });
+    source.addEventListener('released', (event) => {
+      const { date, ...slot } = JSON.parse(event.data);
+      setSlots(current => {
+        const daySlots = (current[date] || []).filter(s => s.slot_id !== slot.slot_id).concat(slot);
+        daySlots.sort((a, b) => minutesOf(a.start_time) - minutesOf(b.start_time));
+        // Keep the dates in order when a slot reopens on a day that had none left
+        return Object.fromEntries(Object.entries({ ...current, [date]: daySlots }).sort());
+      });
+    });
+    // The server refused the stream (too many open, or dates it does not cover):
+    // load the slots once instead of retrying the stream
+    source.onerror = () => {
+      if (source.readyState === EventSource.CLOSED) {
+        fetchTimeSlots();
+      }
+    };
+    return () => source.close();
   }, [doctor]);
 
-  // Call backend API to get available slots
+  // Fallback when the slot stream is unavailable
   const fetchTimeSlots = async () => {
     try {
       const response = await api.get(`/doctors/${doctor.doctor_id}/timeslots`);
@@ -83,7 +83,7 @@ CREATE TABLE time_slots (
     FOREIGN KEY (doctor_id) REFERENCES doctors(doctor_id) ON DELETE CASCADE,
     UNIQUE KEY unique_slot (doctor_id, slot_date, start_time),
     INDEX idx_doctor_date (doctor_id, slot_date),
-    INDEX idx_availability (is_available, slot_date)
+    INDEX idx_availability (is_available, slot_date, start_time) -- earliest-slot search reads it in order
 );
 
 -- Table 8: appointments
@@ -105,7 +105,9 @@ CREATE TABLE appointments (
     INDEX idx_patient (patient_id),
     INDEX idx_doctor (doctor_id),
     INDEX idx_date (appointment_date),
-    INDEX idx_status (status)
+    INDEX idx_status (status),
+    INDEX idx_patient_date (patient_id, appointment_date), -- keyset pagination of patient lists
+    INDEX idx_doctor_date (doctor_id, appointment_date)    -- keyset pagination of doctor lists
 );
 
 -- Table 9: prescriptions
@@ -117,7 +119,7 @@ CREATE TABLE prescriptions (
     follow_up_date DATE,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
-    FOREIGN KEY (appointment_id) REFERENCES appointments(appointment_id),
+    -- No foreign key on appointment_id: the appointment may live in appointments_archive
     UNIQUE KEY unique_appointment (appointment_id)
 );
 
@@ -156,9 +158,9 @@ CREATE TABLE medical_records (
     uploaded_by INT NOT NULL,
     uploaded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     FOREIGN KEY (patient_id) REFERENCES patients(patient_id),
-    FOREIGN KEY (appointment_id) REFERENCES appointments(appointment_id),
     FOREIGN KEY (uploaded_by) REFERENCES users(user_id),
-    INDEX idx_patient_records (patient_id, record_date)
+    INDEX idx_patient_records (patient_id, record_date),
+    INDEX idx_appointment (appointment_id) -- appointment may be archived, so no foreign key
 );
 
 -- Table 13: reviews
@@ -172,11 +174,122 @@ CREATE TABLE reviews (
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     FOREIGN KEY (patient_id) REFERENCES patients(patient_id),
     FOREIGN KEY (doctor_id) REFERENCES doctors(doctor_id),
-    FOREIGN KEY (appointment_id) REFERENCES appointments(appointment_id),
-    UNIQUE KEY unique_review (appointment_id),
+    UNIQUE KEY unique_review (appointment_id), -- appointment may be archived, so no foreign key
     INDEX idx_doctor_rating (doctor_id, rating)
 );
 
+-- Table 14: doctor_rating_summary (maintained incrementally when reviews are written)
+CREATE TABLE doctor_rating_summary (
+    doctor_id INT PRIMARY KEY,
+    review_count INT NOT NULL DEFAULT 0,
+    rating_sum INT NOT NULL DEFAULT 0,
+    one_star INT NOT NULL DEFAULT 0,
+    two_star INT NOT NULL DEFAULT 0,
+    three_star INT NOT NULL DEFAULT 0,
+    four_star INT NOT NULL DEFAULT 0,
+    five_star INT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    FOREIGN KEY (doctor_id) REFERENCES doctors(doctor_id) ON DELETE CASCADE
+);
+
+-- Table 15: cache_versions (shared invalidation counters for in-process caches)
+CREATE TABLE cache_versions (
+    cache_key VARCHAR(100) PRIMARY KEY, -- e.g., "slots:4"
+    version BIGINT UNSIGNED NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP(6) DEFAULT CURRENT_TIMESTAMP(6) ON UPDATE CURRENT_TIMESTAMP(6),
+    INDEX idx_updated (updated_at)
+);
+
+-- Table 16: sessions (server-side login sessions when SESSION_BACKEND=sql)
+CREATE TABLE sessions (
+    session_id CHAR(43) PRIMARY KEY,
+    user_id INT NULL,
+    data TEXT NOT NULL, -- JSON-serialized session dict
+    last_seen DATETIME NOT NULL,
+    expires_at DATETIME NOT NULL,
+    FOREIGN KEY (user_id) REFERENCES users(user_id) ON DELETE CASCADE,
+    INDEX idx_user (user_id),
+    INDEX idx_expires (expires_at)
+);
+
+-- Analytics rollups (maintained by the triggers at the end of this file; rebuilt with
+-- `flask rebuild-reports`). Prescriptions only exist for completed appointments, so the
+-- prescription counters below follow prescription writes, not appointment status.
+
+-- Table 17: doctor_daily_stats (appointments per doctor, day and status)
+CREATE TABLE doctor_daily_stats (
+    doctor_id INT NOT NULL,
+    stat_date DATE NOT NULL,
+    scheduled_count INT NOT NULL DEFAULT 0,
+    completed_count INT NOT NULL DEFAULT 0,
+    cancelled_count INT NOT NULL DEFAULT 0,
+    no_show_count INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (doctor_id, stat_date),
+    INDEX idx_date (stat_date),
+    FOREIGN KEY (doctor_id) REFERENCES doctors(doctor_id) ON DELETE CASCADE
+);
+
+-- Table 18: patient_doctor_stats (completed visits and prescriptions per patient and doctor)
+CREATE TABLE patient_doctor_stats (
+    patient_id INT NOT NULL,
+    doctor_id INT NOT NULL,
+    completed_count INT NOT NULL DEFAULT 0,
+    prescription_count INT NOT NULL DEFAULT 0,
+    last_completed_date DATE,
+    PRIMARY KEY (patient_id, doctor_id),
+    FOREIGN KEY (patient_id) REFERENCES patients(patient_id) ON DELETE CASCADE,
+    FOREIGN KEY (doctor_id) REFERENCES doctors(doctor_id) ON DELETE CASCADE
+);
+
+-- Table 19: patient_medicine_stats (prescription line items per patient and medicine)
+CREATE TABLE patient_medicine_stats (
+    patient_id INT NOT NULL,
+    medicine_id INT NOT NULL,
+    prescription_count INT NOT NULL DEFAULT 0,
+    total_quantity INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (patient_id, medicine_id),
+    INDEX idx_medicine (medicine_id),
+    FOREIGN KEY (patient_id) REFERENCES patients(patient_id) ON DELETE CASCADE,
+    FOREIGN KEY (medicine_id) REFERENCES medicines(medicine_id) ON DELETE CASCADE
+);
+
+-- Archive of finished history (moved in batches by `flask archive-history`, see
+-- services/archive.py). Rows keep their ids, so prescriptions, reviews and records
+-- still find their appointment; list endpoints read both tables.
+
+-- Table 20: time_slots_archive (past slots whose appointments are all finished)
+CREATE TABLE time_slots_archive (
+    slot_id INT PRIMARY KEY,
+    doctor_id INT NOT NULL,
+    slot_date DATE NOT NULL,
+    start_time TIME NOT NULL,
+    end_time TIME NOT NULL,
+    is_available BOOLEAN,
+    FOREIGN KEY (doctor_id) REFERENCES doctors(doctor_id) ON DELETE CASCADE,
+    INDEX idx_doctor_date (doctor_id, slot_date)
+);
+
+-- Table 21: appointments_archive (completed, cancelled and no-show appointments)
+CREATE TABLE appointments_archive (
+    appointment_id INT PRIMARY KEY,
+    patient_id INT NOT NULL,
+    doctor_id INT NOT NULL,
+    slot_id INT NOT NULL,
+    appointment_date DATE NOT NULL,
+    appointment_time TIME NOT NULL,
+    status ENUM('scheduled', 'completed', 'cancelled', 'no-show') NOT NULL,
+    reason_for_visit TEXT,
+    notes TEXT,
+    created_at TIMESTAMP NULL,
+    updated_at TIMESTAMP NULL,
+    archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (patient_id) REFERENCES patients(patient_id),
+    FOREIGN KEY (doctor_id) REFERENCES doctors(doctor_id),
+    FOREIGN KEY (slot_id) REFERENCES time_slots_archive(slot_id),
+    INDEX idx_patient_date (patient_id, appointment_date),
+    INDEX idx_doctor_date (doctor_id, appointment_date)
+);
+
 -- Insert sample data
 
 -- Insert users (3 patients, 5 doctors, 1 admin)
@@ -289,4 +402,272 @@ INSERT INTO medical_records (patient_id, appointment_id, record_type, record_dat
 -- Insert reviews
 INSERT INTO reviews (patient_id, doctor_id, appointment_id, rating, review_text) VALUES
 (1, 4, 1, 5, 'Dr. Johnson is very thorough and caring. Highly recommend!'),
-(3, 5, 3, 4, 'Good doctor, but wait time was a bit long.');
\ No newline at end of file
+(3, 5, 3, 4, 'Good doctor, but wait time was a bit long.');
+
+-- Backfill rating summaries from the seeded reviews (same as `flask rebuild-ratings`)
+INSERT INTO doctor_rating_summary
+    (doctor_id, review_count, rating_sum, one_star, two_star, three_star, four_star, five_star)
+SELECT
+    d.doctor_id,
+    COUNT(r.review_id),
+    COALESCE(SUM(r.rating), 0),
+    COALESCE(SUM(r.rating = 1), 0),
+    COALESCE(SUM(r.rating = 2), 0),
+    COALESCE(SUM(r.rating = 3), 0),
+    COALESCE(SUM(r.rating = 4), 0),
+    COALESCE(SUM(r.rating = 5), 0)
+FROM doctors d
+LEFT JOIN reviews r ON d.doctor_id = r.doctor_id
+GROUP BY d.doctor_id;
+
+-- Backfill analytics rollups from the seeded appointments (same as `flask rebuild-reports`)
+INSERT INTO doctor_daily_stats
+    (doctor_id, stat_date, scheduled_count, completed_count, cancelled_count, no_show_count)
+SELECT doctor_id, appointment_date,
+    SUM(status = 'scheduled'), SUM(status = 'completed'),
+    SUM(status = 'cancelled'), SUM(status = 'no-show')
+FROM appointments
+GROUP BY doctor_id, appointment_date;
+
+INSERT INTO patient_doctor_stats
+    (patient_id, doctor_id, completed_count, prescription_count, last_completed_date)
+SELECT a.patient_id, a.doctor_id,
+    SUM(a.status = 'completed'), COUNT(p.prescription_id),
+    MAX(CASE WHEN a.status = 'completed' THEN a.appointment_date END)
+FROM appointments a
+LEFT JOIN prescriptions p ON a.appointment_id = p.appointment_id
+GROUP BY a.patient_id, a.doctor_id;
+
+INSERT INTO patient_medicine_stats (patient_id, medicine_id, prescription_count, total_quantity)
+SELECT a.patient_id, pm.medicine_id, COUNT(*), SUM(pm.quantity)
+FROM prescription_medicines pm
+INNER JOIN prescriptions p ON pm.prescription_id = p.prescription_id
+INNER JOIN appointments a ON p.appointment_id = a.appointment_id
+GROUP BY a.patient_id, pm.medicine_id;
+
+-- Directory change tracking: bump cache_versions "doctor:<id>" whenever a doctor's
+-- searchable record changes, so in-process caches (doctor search index) reload it
+DELIMITER //
+
+CREATE PROCEDURE bump_cache_version(IN p_cache_key VARCHAR(100))
+BEGIN
+    INSERT INTO cache_versions (cache_key, version) VALUES (p_cache_key, 1)
+    ON DUPLICATE KEY UPDATE version = version + 1;
+END//
+
+CREATE TRIGGER trg_doctors_after_insert AFTER INSERT ON doctors
+FOR EACH ROW
+BEGIN
+    CALL bump_cache_version(CONCAT('doctor:', NEW.doctor_id));
+END//
+
+CREATE TRIGGER trg_doctors_after_update AFTER UPDATE ON doctors
+FOR EACH ROW
+BEGIN
+    CALL bump_cache_version(CONCAT('doctor:', NEW.doctor_id));
+END//
+
+CREATE TRIGGER trg_doctors_after_delete AFTER DELETE ON doctors
+FOR EACH ROW
+BEGIN
+    CALL bump_cache_version(CONCAT('doctor:', OLD.doctor_id));
+END//
+
+CREATE TRIGGER trg_users_after_update AFTER UPDATE ON users
+FOR EACH ROW
+BEGIN
+    IF NEW.user_type = 'doctor' AND (NOT (NEW.first_name <=> OLD.first_name)
+            OR NOT (NEW.last_name <=> OLD.last_name) OR NOT (NEW.email <=> OLD.email)
+            OR NOT (NEW.phone <=> OLD.phone)) THEN
+        CALL bump_cache_version(CONCAT('doctor:', NEW.user_id));
+    END IF;
+END//
+
+CREATE TRIGGER trg_doctor_specializations_after_insert AFTER INSERT ON doctor_specializations
+FOR EACH ROW
+BEGIN
+    CALL bump_cache_version(CONCAT('doctor:', NEW.doctor_id));
+END//
+
+CREATE TRIGGER trg_doctor_specializations_after_delete AFTER DELETE ON doctor_specializations
+FOR EACH ROW
+BEGIN
+    CALL bump_cache_version(CONCAT('doctor:', OLD.doctor_id));
+END//
+
+CREATE TRIGGER trg_departments_after_update AFTER UPDATE ON departments
+FOR EACH ROW
+BEGIN
+    INSERT INTO cache_versions (cache_key, version)
+    SELECT CONCAT('doctor:', doctor_id), 1 FROM doctors WHERE department_id = NEW.department_id
+    ON DUPLICATE KEY UPDATE version = version + 1;
+END//
+
+CREATE TRIGGER trg_specializations_after_update AFTER UPDATE ON specializations
+FOR EACH ROW
+BEGIN
+    INSERT INTO cache_versions (cache_key, version)
+    SELECT CONCAT('doctor:', doctor_id), 1 FROM doctor_specializations
+    WHERE specialization_id = NEW.specialization_id
+    ON DUPLICATE KEY UPDATE version = version + 1;
+END//
+
+-- Analytics rollup maintenance
+CREATE PROCEDURE adjust_doctor_daily_stats(IN p_doctor_id INT, IN p_date DATE,
+                                           IN p_status VARCHAR(20), IN p_delta INT)
+BEGIN
+    INSERT INTO doctor_daily_stats
+        (doctor_id, stat_date, scheduled_count, completed_count, cancelled_count, no_show_count)
+    VALUES (p_doctor_id, p_date,
+        (p_status = 'scheduled') * p_delta, (p_status = 'completed') * p_delta,
+        (p_status = 'cancelled') * p_delta, (p_status = 'no-show') * p_delta)
+    ON DUPLICATE KEY UPDATE
+        scheduled_count = scheduled_count + VALUES(scheduled_count),
+        completed_count = completed_count + VALUES(completed_count),
+        cancelled_count = cancelled_count + VALUES(cancelled_count),
+        no_show_count = no_show_count + VALUES(no_show_count);
+END//
+
+CREATE PROCEDURE adjust_patient_doctor_stats(IN p_patient_id INT, IN p_doctor_id INT, IN p_date DATE,
+                                             IN p_completed_delta INT, IN p_prescription_delta INT)
+BEGIN
+    INSERT INTO patient_doctor_stats
+        (patient_id, doctor_id, completed_count, prescription_count, last_completed_date)
+    VALUES (p_patient_id, p_doctor_id, p_completed_delta, p_prescription_delta,
+        IF(p_completed_delta > 0, p_date, NULL))
+    ON DUPLICATE KEY UPDATE
+        completed_count = completed_count + VALUES(completed_count),
+        prescription_count = prescription_count + VALUES(prescription_count),
+        last_completed_date = GREATEST(COALESCE(last_completed_date, VALUES(last_completed_date)),
+                                       COALESCE(VALUES(last_completed_date), last_completed_date));
+END//
+
+-- Patient and doctor of an appointment, whether it is still hot or already archived
+CREATE PROCEDURE appointment_parties(IN p_appointment_id INT, OUT p_patient_id INT, OUT p_doctor_id INT)
+BEGIN
+    SET p_patient_id = NULL, p_doctor_id = NULL;
+    SELECT patient_id, doctor_id INTO p_patient_id, p_doctor_id
+    FROM appointments WHERE appointment_id = p_appointment_id;
+    IF p_patient_id IS NULL THEN
+        SELECT patient_id, doctor_id INTO p_patient_id, p_doctor_id
+        FROM appointments_archive WHERE appointment_id = p_appointment_id;
+    END IF;
+END//
+
+CREATE TRIGGER trg_appointments_after_insert AFTER INSERT ON appointments
+FOR EACH ROW
+BEGIN
+    CALL adjust_doctor_daily_stats(NEW.doctor_id, NEW.appointment_date, NEW.status, 1);
+    IF NEW.status = 'completed' THEN
+        CALL adjust_patient_doctor_stats(NEW.patient_id, NEW.doctor_id, NEW.appointment_date, 1, 0);
+    END IF;
+END//
+
+CREATE TRIGGER trg_appointments_after_update AFTER UPDATE ON appointments
+FOR EACH ROW
+BEGIN
+    IF NEW.status <> OLD.status OR NEW.appointment_date <> OLD.appointment_date
+            OR NEW.doctor_id <> OLD.doctor_id OR NEW.patient_id <> OLD.patient_id THEN
+        CALL adjust_doctor_daily_stats(OLD.doctor_id, OLD.appointment_date, OLD.status, -1);
+        CALL adjust_doctor_daily_stats(NEW.doctor_id, NEW.appointment_date, NEW.status, 1);
+        IF OLD.status = 'completed' THEN
+            CALL adjust_patient_doctor_stats(OLD.patient_id, OLD.doctor_id, OLD.appointment_date, -1, 0);
+        END IF;
+        IF NEW.status = 'completed' THEN
+            CALL adjust_patient_doctor_stats(NEW.patient_id, NEW.doctor_id, NEW.appointment_date, 1, 0);
+        END IF;
+    END IF;
+END//
+
+-- The archiver sets @archiving = 1: moved rows still count towards the rollups
+CREATE TRIGGER trg_appointments_after_delete AFTER DELETE ON appointments
+FOR EACH ROW
+BEGIN
+    IF COALESCE(@archiving, 0) = 0 THEN
+        CALL adjust_doctor_daily_stats(OLD.doctor_id, OLD.appointment_date, OLD.status, -1);
+        IF OLD.status = 'completed' THEN
+            CALL adjust_patient_doctor_stats(OLD.patient_id, OLD.doctor_id, OLD.appointment_date, -1, 0);
+        END IF;
+    END IF;
+END//
+
+CREATE TRIGGER trg_prescriptions_after_insert AFTER INSERT ON prescriptions
+FOR EACH ROW
+BEGIN
+    DECLARE v_patient_id INT;
+    DECLARE v_doctor_id INT;
+    CALL appointment_parties(NEW.appointment_id, v_patient_id, v_doctor_id);
+    CALL adjust_patient_doctor_stats(v_patient_id, v_doctor_id, NULL, 0, 1);
+END//
+
+-- BEFORE: line items removed by ON DELETE CASCADE do not fire their own triggers
+CREATE TRIGGER trg_prescriptions_before_delete BEFORE DELETE ON prescriptions
+FOR EACH ROW
+BEGIN
+    DECLARE v_patient_id INT;
+    DECLARE v_doctor_id INT;
+    CALL appointment_parties(OLD.appointment_id, v_patient_id, v_doctor_id);
+    CALL adjust_patient_doctor_stats(v_patient_id, v_doctor_id, NULL, 0, -1);
+    UPDATE patient_medicine_stats s
+    INNER JOIN prescription_medicines pm
+        ON pm.prescription_id = OLD.prescription_id AND pm.medicine_id = s.medicine_id
+    SET s.prescription_count = s.prescription_count - 1,
+        s.total_quantity = s.total_quantity - pm.quantity
+    WHERE s.patient_id = v_patient_id;
+END//
+
+-- Patient of a prescription, whether its appointment is still hot or already archived
+CREATE PROCEDURE prescription_patient(IN p_prescription_id INT, OUT p_patient_id INT)
+BEGIN
+    DECLARE v_appointment_id INT;
+    DECLARE v_doctor_id INT;
+    SELECT appointment_id INTO v_appointment_id FROM prescriptions WHERE prescription_id = p_prescription_id;
+    CALL appointment_parties(v_appointment_id, p_patient_id, v_doctor_id);
+END//
+
+CREATE TRIGGER trg_prescription_medicines_after_insert AFTER INSERT ON prescription_medicines
+FOR EACH ROW
+BEGIN
+    DECLARE v_patient_id INT;
+    CALL prescription_patient(NEW.prescription_id, v_patient_id);
+    IF v_patient_id IS NOT NULL THEN
+        INSERT INTO patient_medicine_stats (patient_id, medicine_id, prescription_count, total_quantity)
+        VALUES (v_patient_id, NEW.medicine_id, 1, NEW.quantity)
+        ON DUPLICATE KEY UPDATE
+            prescription_count = prescription_count + 1,
+            total_quantity = total_quantity + NEW.quantity;
+    END IF;
+END//
+
+CREATE TRIGGER trg_prescription_medicines_after_update AFTER UPDATE ON prescription_medicines
+FOR EACH ROW
+BEGIN
+    DECLARE v_patient_id INT;
+    IF NEW.medicine_id <> OLD.medicine_id OR NEW.quantity <> OLD.quantity THEN
+        CALL prescription_patient(OLD.prescription_id, v_patient_id);
+        UPDATE patient_medicine_stats
+        SET prescription_count = prescription_count - 1,
+            total_quantity = total_quantity - OLD.quantity
+        WHERE patient_id = v_patient_id AND medicine_id = OLD.medicine_id;
+        IF v_patient_id IS NOT NULL THEN
+            INSERT INTO patient_medicine_stats (patient_id, medicine_id, prescription_count, total_quantity)
+            VALUES (v_patient_id, NEW.medicine_id, 1, NEW.quantity)
+            ON DUPLICATE KEY UPDATE
+                prescription_count = prescription_count + 1,
+                total_quantity = total_quantity + NEW.quantity;
+        END IF;
+    END IF;
+END//
+
+CREATE TRIGGER trg_prescription_medicines_after_delete AFTER DELETE ON prescription_medicines
+FOR EACH ROW
+BEGIN
+    DECLARE v_patient_id INT;
+    CALL prescription_patient(OLD.prescription_id, v_patient_id);
+    UPDATE patient_medicine_stats
+    SET prescription_count = prescription_count - 1,
+        total_quantity = total_quantity - OLD.quantity
+    WHERE patient_id = v_patient_id AND medicine_id = OLD.medicine_id;
+END//
+
+DELIMITER ;
@@ -4,7 +4,22 @@
 
 USE clinic_booking_system;
 
+-- Triggers are dropped with their tables; stored procedures are not
+DROP PROCEDURE IF EXISTS bump_cache_version;
+DROP PROCEDURE IF EXISTS adjust_doctor_daily_stats;
+DROP PROCEDURE IF EXISTS adjust_patient_doctor_stats;
+DROP PROCEDURE IF EXISTS appointment_parties;
+DROP PROCEDURE IF EXISTS prescription_patient;
+
 -- Drop tables with foreign key dependencies first
+DROP TABLE IF EXISTS appointments_archive;
+DROP TABLE IF EXISTS time_slots_archive;
+DROP TABLE IF EXISTS patient_medicine_stats;
+DROP TABLE IF EXISTS patient_doctor_stats;
+DROP TABLE IF EXISTS doctor_daily_stats;
+DROP TABLE IF EXISTS sessions;
+DROP TABLE IF EXISTS cache_versions;
+DROP TABLE IF EXISTS doctor_rating_summary;
 DROP TABLE IF EXISTS reviews;
 DROP TABLE IF EXISTS medical_records;
 DROP TABLE IF EXISTS prescription_medicines;
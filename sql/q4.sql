@@ -1,4 +1,4 @@
-- q4.sql: Find patients with chronic conditions (multiple appointments and prescriptions)
+-- q4.sql: Find patients with chronic conditions (multiple appointments and prescriptions)
 -- Concepts demonstrated:
 -- 1. Complex subquery in FROM clause
 -- 2. Multiple aggregate functions in subquery